@@ -1,9 +1,13 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Request
+from fastapi.responses import StreamingResponse
 from typing import Dict, Any, Optional
 from app.models.schemas import ChatRequest, ChatResponse, SourceDocument
-from app.services.chat_service import get_chat_response
-from app.workflows.workflows import create_direct_document_workflow
+from app.services.chat_service import attach_timings, get_chat_response, stream_chat_response
+from app.services.metrics import track_request
+from app.services.llm_scheduler import llm_request_scope
+from app.workflows.registry import get_direct_document_workflow
 from app.vectorstore.store import get_vectorstore
+from app.services.document_sessions import aget_document_session, document_sessions
 import uuid
 from datetime import datetime
 import logging
@@ -17,12 +21,28 @@ async def chat(request: ChatRequest):
     """Process a chat request and generate a response."""
     try:
         # Normal chat processing - use existing service
-        return get_chat_response(request)
+        return await get_chat_response(request)
         
     except Exception as e:
         logger.error(f"Error in chat endpoint: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Failed to process chat: {str(e)}")
 
+@router.post("/chat/stream")
+async def chat_stream(request: ChatRequest, http_request: Request):
+    """
+    Stream workflow progress and answer tokens for a chat request.
+    Server-sent events by default; NDJSON when the client sends Accept: application/x-ndjson.
+    """
+    ndjson = "application/x-ndjson" in http_request.headers.get("accept", "")
+    return StreamingResponse(
+        stream_chat_response(request, ndjson=ndjson),
+        media_type="application/x-ndjson" if ndjson else "text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",  # Disable proxy buffering so events arrive immediately
+        },
+    )
+
 @router.post("/document", response_model=ChatResponse)
 async def document_chat(request: ChatRequest):
     """Handle document-focused chat using the direct document workflow."""
@@ -43,27 +63,37 @@ async def document_chat(request: ChatRequest):
         # Get model name with fallback
         model_name = request.model_name or "meta-llama/llama-4-scout-17b-16e-instruct"
         
-        # Create the direct document workflow
-        workflow = create_direct_document_workflow(
+        # Get the compiled direct document workflow (cached across requests)
+        workflow = get_direct_document_workflow(
             full_vectorstore=full_vectorstore,
             generator_name=model_name,
-            generator_temperature=0.0,
-            document_uuid=request.document_id
+            generator_temperature=0.0
         )
         
-        # Set up initial state with the message and document ID
-        initial_state = {
-            "messages": [{"role": "user", "content": request.message}],
-            "context": {},
-            "steps": [],
-            "question": request.message,
-            "generation_count": 0,
-            "document_uuids": [request.document_id]  # Pre-populate with the document ID
-        }
-        
-        # Invoke workflow
-        final_state = workflow.invoke(initial_state)
+        with track_request() as timings, llm_request_scope(conversation_id):
+            # The document, its rendered prompt context and recent Q&A come from the session cache
+            session = await aget_document_session(request.document_id, full_vectorstore)
+            if session is None:
+                raise HTTPException(status_code=404, detail=f"Document with ID {request.document_id} not found")
+
+            # Set up initial state with the message and document ID
+            initial_state = {
+                "messages": [{"role": "user", "content": request.message}],
+                "context": {},
+                "steps": [],
+                "question": request.message,
+                "generation_count": 0,
+                "document_uuid": request.document_id,
+                "document_uuids": [request.document_id],  # Pre-populate with the document ID
+                "full_documents": session.documents,
+                "document_context": session.context,
+                "history": session.history(conversation_id),
+            }
+
+            # Invoke workflow
+            final_state = await workflow.ainvoke(initial_state)
         response_text = final_state.get("generation", "Atsiprašau, nepavyko sugeneruoti atsakymo.")
+        document_sessions.record(session, conversation_id, request.message, response_text)
         
         # Format sources
         formatted_sources = None
@@ -75,12 +105,13 @@ async def document_chat(request: ChatRequest):
                 ) for doc in final_state["full_documents"]
             ]
         
-        return ChatResponse(
+        response = ChatResponse(
             message=response_text,
             conversation_id=conversation_id,
             created_at=datetime.now(),
             sources=formatted_sources
         )
+        return attach_timings(request, response, timings)
         
     except HTTPException:
         raise
@@ -103,17 +134,12 @@ async def create_document_workflow(data: Dict[str, Any]):
         if not full_vectorstore:
             raise HTTPException(status_code=500, detail="Vector store not initialized properly")
         
-        # Use similarity_search with filter to find the document
-        results = full_vectorstore.similarity_search(
-            query="",  # Empty query since we're using filter
-            k=1,
-            filter={"$or": [{"uuid": document_id}, {"id": document_id}]}
-        )
-        
-        if not results:
+        # Opens the session that the following /document messages reuse
+        session = await aget_document_session(document_id, full_vectorstore)
+        if session is None:
             raise HTTPException(status_code=404, detail=f"Document with ID {document_id} not found")
         
-        document = results[0]
+        document = session.documents[0]
         
         # Convert LangChain document to SourceDocument format
         source_doc = SourceDocument(
@@ -0,0 +1,119 @@
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import Response
+from typing import Dict, List, Optional, Tuple
+from app.models.schemas import (
+    BatchGetDocumentsRequest, BatchGetDocumentsResponse, DocumentResponse, SourceDocument
+)
+from app.services.executor import run_blocking
+from app.vectorstore.document_cache import get_full_documents_by_uuid
+from app.vectorstore.row_index import aget_row_index
+from app.vectorstore.store import get_single_store_version, get_vectorstore
+import hashlib
+import json
+import logging
+import os
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+# Seconds browsers and proxies may reuse a document response before revalidating it
+DOCUMENTS_CACHE_MAX_AGE = int(os.environ.get("DOCUMENTS_CACHE_MAX_AGE", "300"))
+DOCUMENTS_BATCH_MAX_IDS = int(os.environ.get("DOCUMENTS_BATCH_MAX_IDS", "100"))
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match check; uses weak comparison as RFC 9110 requires for GET/HEAD"""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+def tagged_json(payload, conditional_request: Optional[Request] = None) -> Response:
+    """
+    JSON response with a strong ETag (hash of the exact body bytes). For a GET passed as
+    conditional_request, an empty 304 when the client already holds that representation.
+    """
+    body = json.dumps(jsonable_encoder(payload), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    etag = f'"{hashlib.sha256(body).hexdigest()}"'
+    headers = {"ETag": etag}
+    if conditional_request is not None:
+        headers["Cache-Control"] = f"public, max-age={DOCUMENTS_CACHE_MAX_AGE}"
+        if etag_matches(conditional_request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+async def lookup_documents(document_ids: List[str]) -> Tuple[Dict[str, DocumentResponse], List[str]]:
+    """({requested id: document}, missing ids); UUIDs and legacy ids go through the row index"""
+    full_vectorstore = get_vectorstore(store_type="full")
+    if full_vectorstore is None:
+        raise HTTPException(status_code=500, detail="Vector store not initialized properly")
+
+    row_index = await aget_row_index(full_vectorstore)
+    if row_index is None:
+        raise HTTPException(status_code=500, detail="Document index not available")
+
+    requested = {document_id: row_index.resolve(document_id) for document_id in dict.fromkeys(document_ids)}
+    found = await run_blocking(
+        get_full_documents_by_uuid,
+        full_vectorstore,
+        [uuid for uuid in requested.values() if uuid],
+        get_single_store_version(full_vectorstore),
+    )
+
+    documents, missing = {}, []
+    for document_id, uuid in requested.items():
+        if uuid not in found:
+            missing.append(document_id)
+            continue
+        documents[document_id] = DocumentResponse(
+            id=uuid,
+            documents=[SourceDocument(page_content=doc.page_content, metadata=doc.metadata or {}) for doc in found[uuid]],
+        )
+    return documents, missing
+
+
+@router.get("/documents/{document_id}", response_model=DocumentResponse)
+async def get_document(document_id: str, request: Request):
+    """
+    Every stored row of one document, by UUID or legacy id.
+    Carries a strong ETag; answers 304 to a matching If-None-Match.
+    """
+    try:
+        documents, _ = await lookup_documents([document_id])
+        if document_id not in documents:
+            raise HTTPException(status_code=404, detail=f"Document {document_id} not found")
+        return tagged_json(documents[document_id], conditional_request=request)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error fetching document {document_id}: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Error fetching document: {str(e)}")
+
+
+@router.post("/documents:batchGet", response_model=BatchGetDocumentsResponse)
+async def batch_get_documents(body: BatchGetDocumentsRequest):
+    """
+    Several documents in one store read; ids that match nothing are listed in "missing".
+    Always a 200: POST responses are not cacheable, so If-None-Match is not evaluated here.
+    The ETag lets a client compare batches, or revalidate single documents via GET.
+    """
+    try:
+        if not body.ids or len(body.ids) > DOCUMENTS_BATCH_MAX_IDS:
+            raise HTTPException(status_code=400, detail=f"ids must hold 1 to {DOCUMENTS_BATCH_MAX_IDS} document ids")
+
+        documents, missing = await lookup_documents(body.ids)
+        logger.info(f"Batch get: {len(documents)} found, {len(missing)} missing")
+        return tagged_json(BatchGetDocumentsResponse(documents=documents, missing=missing))
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error in batch document get: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Error fetching documents: {str(e)}")
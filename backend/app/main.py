@@ -1,8 +1,23 @@
+import asyncio
 import logging
-from fastapi import FastAPI
-from app.api.routes import chat, projects  # Make sure to import projects too
+from fastapi import Depends, FastAPI
+from fastapi.responses import JSONResponse, Response
+from app.api.routes import chat, documents, projects  # Make sure to import projects too
 from fastapi.middleware.cors import CORSMiddleware
-from app.vectorstore.store import get_vectorstore, VectorStore
+from app.vectorstore.store import get_vectorstore, is_vectorstore_loaded, VectorStore
+from app.workflows.registry import workflow_registry
+from app.services.answer_cache import answer_cache
+from app.services.conversation_store import conversation_store
+from app.services.document_sessions import document_sessions
+from app.vectorstore.document_cache import full_document_cache
+from app.services.project_index import refresh_project_index
+from app.vectorstore.bm25 import bm25_index_stats, refresh_bm25_index
+from app.vectorstore.row_index import refresh_row_index, row_index_stats
+from app.services.executor import run_blocking, shutdown_executor
+from app.services.readiness import readiness
+from app.services.chat_service import warm_up
+from app.services.metrics import render_metrics
+from app.services.llm_scheduler import llm_scheduler
 
 # Configure logging
 logging.basicConfig(
@@ -22,36 +37,111 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize vector store singleton on startup
-@app.on_event("startup")
-async def initialize_vectorstore():
-    logger.info("Initializing vector store system during app startup...")
-    
-    # Initialize the singleton VectorStore instance
+# Components loaded in the background after startup; the port accepts requests immediately
+readiness.register("vectorstore")
+readiness.register("project_index")
+readiness.register("bm25_index", required=False)
+readiness.register("row_index", required=False)
+readiness.register("workflows", required=False)
+
+def load_vectorstore() -> dict:
+    """Load the embedding model and both stores (blocking)"""
     vector_store = VectorStore()
-    
-    # Test the store
     store = vector_store.get_store()  # No parameters
-    
-    if store:
-        logger.info("✓ Vector store initialized successfully")
-        logger.info(f"Vector store collection count: {store._collection.count()}")
-    else:
+    if not store:
+        raise RuntimeError("Vector store initialization failed")
+    return {**vector_store.load_timings, "collection_count": store._collection.count()}
+
+def load_bm25_index() -> dict:
+    """Build the lexical index used by hybrid retrieval (blocking); retrieval falls back to dense without it"""
+    index = refresh_bm25_index()
+    return index.stats() if index else {}
+
+def load_row_index() -> dict:
+    """Map document UUIDs to Chroma row ids (blocking); lookups fall back to metadata filters without it"""
+    index = refresh_row_index()
+    return index.stats() if index else {}
+
+def load_project_index() -> dict:
+    """Precompute project metadata for /api/cities and /api/recent-projects (blocking)"""
+    index = refresh_project_index()
+    return {"projects": len(index.entries) if index else 0}
+
+async def load_components():
+    logger.info("Loading vector store system in the background...")
+    if not await readiness.load("vectorstore", load_vectorstore):
         logger.error("✗ Vector store initialization failed!")
+        readiness.skip("project_index", "vectorstore failed to load")
+        readiness.skip("bm25_index", "vectorstore failed to load")
+        readiness.skip("row_index", "vectorstore failed to load")
+        readiness.skip("workflows", "vectorstore failed to load")
+        return
+    logger.info("✓ Vector store initialized successfully")
+
+    await readiness.load("project_index", load_project_index)
+    await readiness.load("bm25_index", load_bm25_index)
+    await readiness.load("row_index", load_row_index)
+    # Warm-up only: a failure here (e.g. no Groq key yet) does not make the service unready
+    await readiness.load("workflows", warm_up)
+
+@app.on_event("startup")
+async def start_background_loading():
+    app.state.loader = asyncio.create_task(load_components())
+
+@app.on_event("shutdown")
+async def shutdown_blocking_executor():
+    loader = getattr(app.state, "loader", None)
+    if loader and not loader.done():
+        loader.cancel()
+    shutdown_executor()
+
+@app.on_event("shutdown")
+async def persist_embedding_cache():
+    if is_vectorstore_loaded():
+        VectorStore().embeddings.persist()
 
 # Include routers
-app.include_router(chat.router, prefix="/api", tags=["chat"])
-app.include_router(projects.router, prefix="/api", tags=["projects"])
+# API routes answer 503 until the vector store and project index are loaded
+app.include_router(chat.router, prefix="/api", tags=["chat"], dependencies=[Depends(readiness.require())])
+app.include_router(projects.router, prefix="/api", tags=["projects"], dependencies=[Depends(readiness.require())])
+app.include_router(documents.router, prefix="/api", tags=["documents"], dependencies=[Depends(readiness.require())])
+
+# Health check endpoints
+@app.get("/health/live")
+async def liveness():
+    """Liveness: the process is up and serving requests"""
+    return {"status": "alive"}
+
+@app.get("/health/ready")
+async def readiness_check():
+    """Readiness: per-component load state and timings; 503 until every required component is ready"""
+    report = readiness.report()
+    return JSONResponse(status_code=200 if report["ready"] else 503, content=report)
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics: node, LLM, embedding and Chroma timings, token counts and errors"""
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
 
-# Health check endpoint
 @app.get("/health")
 async def health_check():
     """Health check endpoint to verify service is running"""
-    # Check if vector store is initialized
-    vectorstore = get_vectorstore()  # No parameters
+    # Never trigger a load from here; report what is loaded so far
+    vectorstore = get_vectorstore() if is_vectorstore_loaded() else None
     
     return {
-        "status": "healthy",
+        "status": "healthy" if readiness.is_ready() else "starting",
+        "components": readiness.report()["components"],
         "vectorstore_initialized": vectorstore is not None,
-        "vectorstore_count": vectorstore._collection.count() if vectorstore else 0
-    }
\ No newline at end of file
+        "vectorstore_count": await run_blocking(vectorstore._collection.count) if vectorstore else 0,
+        "workflow_cache": workflow_registry.stats(),
+        "embedding_cache": VectorStore().embeddings.stats() if vectorstore else None,
+        "answer_cache": answer_cache.stats(),
+        "conversation_store": conversation_store.stats(),
+        "document_sessions": document_sessions.stats(),
+        "full_document_cache": full_document_cache.stats(),
+        "llm_scheduler": llm_scheduler.stats(),
+        "bm25_index": bm25_index_stats(),
+        "row_index": row_index_stats()
+    }
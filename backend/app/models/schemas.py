@@ -23,6 +23,7 @@ class ChatRequest(BaseModel):
     conversation_id: Optional[str] = None
     model_name: Optional[str] = "meta-llama/llama-4-maverick-17b-128e-instruct"
     document_id: Optional[str] = None  # Added for document focus workflow
+    include_timings: bool = False  # Return a per-stage latency and token breakdown
 
 class ChatResponse(BaseModel):
     message: str
@@ -30,6 +31,18 @@ class ChatResponse(BaseModel):
     created_at: datetime
     sources: Optional[List[SourceDocument]] = None
     summary_documents: Optional[List[SourceDocument]] = None  # Add this new field 
+    timings: Optional[Dict[str, Any]] = None  # Only when the request set include_timings
+
+class DocumentResponse(BaseModel):
+    id: str  # Canonical UUID (the request may use a legacy id)
+    documents: List[SourceDocument]  # Every row stored under the UUID
+
+class BatchGetDocumentsRequest(BaseModel):
+    ids: List[str]  # UUIDs or legacy ids, at most DOCUMENTS_BATCH_MAX_IDS
+
+class BatchGetDocumentsResponse(BaseModel):
+    documents: Dict[str, DocumentResponse]  # Keyed by the requested id
+    missing: List[str] = Field(default_factory=list)
 
 # Payment related models
 class StripeWebhookEvent(BaseModel):
@@ -0,0 +1,150 @@
+import datetime
+import itertools
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Hashable, List, Optional
+
+import numpy as np
+
+from app.models.schemas import ChatResponse
+from app.vectorstore.deadlines import get_deadline
+import logging
+
+logger = logging.getLogger(__name__)
+
+ANSWER_CACHE_ENABLED = os.environ.get("ANSWER_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+# Cosine similarity needed to reuse an answer; e5 scores are compressed near 1, so keep this high
+ANSWER_CACHE_THRESHOLD = float(os.environ.get("ANSWER_CACHE_THRESHOLD", "0.98"))
+ANSWER_CACHE_TTL_SECONDS = float(os.environ.get("ANSWER_CACHE_TTL_SECONDS", "3600"))
+ANSWER_CACHE_SIZE = int(os.environ.get("ANSWER_CACHE_SIZE", "1000"))
+
+
+@dataclass
+class CachedAnswer:
+    model_name: str
+    question: str
+    vector: np.ndarray
+    response: ChatResponse
+    created_at: float
+    # Earliest deadline among the cited projects; the answer is stale after this day
+    expires_on: Optional[datetime.date]
+
+
+def earliest_deadline(response: ChatResponse) -> Optional[datetime.date]:
+    """Earliest parseable deadline among the documents cited by a response"""
+    documents = (response.sources or []) + (response.summary_documents or [])
+    deadlines = [get_deadline(doc.metadata) for doc in documents]
+    deadlines = [deadline for deadline in deadlines if deadline is not None]
+    return min(deadlines) if deadlines else None
+
+
+class SemanticAnswerCache:
+    """
+    Cache of full chat responses looked up by query-embedding similarity.
+
+    Entries are scoped by model name and dropped when their TTL passes, when a
+    cited project's deadline passes, or (all of them) when the vector stores change.
+    """
+
+    def __init__(self, threshold: float = ANSWER_CACHE_THRESHOLD, ttl_seconds: float = ANSWER_CACHE_TTL_SECONDS, max_size: int = ANSWER_CACHE_SIZE):
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        self._entries: "OrderedDict[int, CachedAnswer]" = OrderedDict()
+        self._ids = itertools.count()
+        self._store_version: Optional[Hashable] = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def _check_store_version(self, store_version: Hashable):
+        """Drop everything if the vector stores changed since the entries were cached"""
+        if self._store_version != store_version:
+            if self._entries:
+                logger.info(f"Vector stores changed, invalidating {len(self._entries)} cached answers")
+                self.invalidations += len(self._entries)
+                self._entries.clear()
+            self._store_version = store_version
+
+    def _is_stale(self, entry: CachedAnswer, now: float, today: datetime.date) -> bool:
+        if now - entry.created_at > self.ttl_seconds:
+            return True
+        return entry.expires_on is not None and entry.expires_on < today
+
+    def lookup(self, model_name: str, vector: List[float], store_version: Hashable) -> Optional[ChatResponse]:
+        """Return the cached response most similar to vector, if it clears the threshold"""
+        query = np.asarray(vector, dtype=np.float32)
+        now = time.time()
+        today = datetime.date.today()
+
+        with self._lock:
+            self._check_store_version(store_version)
+
+            best_id, best_score = None, self.threshold
+            for entry_id, entry in list(self._entries.items()):
+                if self._is_stale(entry, now, today):
+                    del self._entries[entry_id]
+                    self.expirations += 1
+                    continue
+                if entry.model_name != model_name:
+                    continue
+                # Embeddings are normalized, so the dot product is the cosine similarity
+                score = float(np.dot(query, entry.vector))
+                if score >= best_score:
+                    best_id, best_score = entry_id, score
+
+            if best_id is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(best_id)
+            self.hits += 1
+            entry = self._entries[best_id]
+            logger.info(f"Answer cache hit (similarity {best_score:.4f}) for cached question: '{entry.question[:50]}'")
+            return entry.response
+
+    def store(self, model_name: str, question: str, vector: List[float], response: ChatResponse, store_version: Hashable):
+        """Cache a response computed against the given store version"""
+        entry = CachedAnswer(
+            model_name=model_name,
+            question=question,
+            vector=np.asarray(vector, dtype=np.float32),
+            response=response,
+            created_at=time.time(),
+            expires_on=earliest_deadline(response),
+        )
+        with self._lock:
+            self._check_store_version(store_version)
+            self._entries[next(self._ids)] = entry
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, float]:
+        """Cache statistics for health and monitoring endpoints"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": ANSWER_CACHE_ENABLED,
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
+
+
+answer_cache = SemanticAnswerCache()
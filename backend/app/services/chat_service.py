@@ -1,80 +1,305 @@
 from app.models.schemas import ChatRequest, ChatResponse, SourceDocument
-from app.workflows.workflows import create_minimal_workflow
-from app.vectorstore.store import get_vectorstore
+from app.workflows.registry import get_minimal_workflow
+from app.vectorstore.store import VectorStore, get_vectorstore, get_store_version
+from app.services.answer_cache import ANSWER_CACHE_ENABLED, answer_cache
+from app.services.executor import run_blocking
+from app.services.metrics import RequestTimings, track_request
+from app.services.llm_scheduler import llm_request_scope
+from app.services.conversation_store import CONVERSATION_FOLLOW_UPS, Conversation, conversation_store, is_follow_up
+from app.services.project_index import aget_project_index
+from app.services.query_analyzer import get_query_analyzer
+from fastapi.encoders import jsonable_encoder
 from datetime import datetime
+import json
+import time
 import uuid
 import logging
-from typing import List, Optional
+import os
+from typing import AsyncIterator, List, Optional
 
 logger = logging.getLogger(__name__)
 
-def get_chat_response(request: ChatRequest) -> ChatResponse:
+# Relevance grading mode: "per_document" (one grader call per summary), "batch" or "cross_encoder"
+GRADING_MODE = os.environ.get("GRADING_MODE", "per_document")
+
+# Nodes whose LLM output is the user-facing answer and is streamed token by token
+ANSWER_NODES = ("generate", "answer_chit_chat", "answer_follow_up")
+
+
+def _model_name(request: ChatRequest) -> str:
+    return getattr(request, 'model_name', None) or "meta-llama/llama-4-scout-17b-16e-instruct"
+
+
+def _get_chat_workflow(request: ChatRequest):
+    """Get the compiled chat workflow for this request (cached across requests)"""
+    # Get vectorstore - this should just work, no debugging needed
+    summaries_vectorstore = get_vectorstore(store_type="summary")
+    if summaries_vectorstore is None:
+        raise ValueError("Vector store not initialized properly")
+    full_vectorstore = get_vectorstore(store_type="full")
+    if full_vectorstore is None:
+        raise ValueError("Full vector store not initialized properly")
+
+    model_name = _model_name(request)
+
+    return get_minimal_workflow(
+        summaries_vectorstore=summaries_vectorstore,
+        full_vectorstore=full_vectorstore,
+        k_sum=15,
+        search_type="similarity",
+        generator_name=model_name,
+        generator_temperature=0.0,
+        helper_name="meta-llama/llama-4-maverick-17b-128e-instruct",
+        helper_temperature=0.1,
+        grading_mode=GRADING_MODE
+    )
+
+
+def _initial_state(request: ChatRequest, conversation: Optional[Conversation] = None, follow_up: bool = False) -> dict:
+    """Initial graph state for a chat request; follow-ups start with the conversation's documents"""
+    state = {
+        "messages": [{"role": "user", "content": request.message}],
+        "context": {},
+        "steps": [],
+        "question": request.message,
+        "generation_count": 0,
+        "history": conversation.history() if conversation else [],
+        "follow_up": follow_up,
+    }
+    if follow_up:
+        state.update({
+            "full_documents": conversation.full_documents,
+            "filtered_summaries": conversation.summaries,
+            "document_uuids": conversation.document_uuids,
+        })
+    return state
+
+
+async def _load_conversation(request: ChatRequest, conversation_id: str):
+    """(stored conversation or None, whether the question follows up on its documents)"""
+    if not CONVERSATION_FOLLOW_UPS:
+        return None, False
+    conversation = conversation_store.get(request.conversation_id)
+    if conversation is None or not conversation.full_documents:
+        return conversation, False
+
+    project_index = await aget_project_index()
+    cities = get_query_analyzer(project_index).analyze(request.message).cities if project_index else []
+    follow_up = is_follow_up(request.message, conversation, cities)
+    if follow_up:
+        logger.info(f"Follow-up in conversation {conversation_id}, reusing {len(conversation.full_documents)} documents")
+    return conversation, follow_up
+
+
+def _remember_turn(conversation_id: str, request: ChatRequest, response: ChatResponse, follow_up: bool = False):
+    if CONVERSATION_FOLLOW_UPS:
+        conversation_store.record(conversation_id, request.message, response, follow_up)
+
+
+def _to_source_documents(docs) -> Optional[List[SourceDocument]]:
+    """Convert LangChain documents to SourceDocument models (None when empty)"""
+    if not docs:
+        return None
+    return [
+        SourceDocument(
+            page_content=doc.page_content,
+            metadata=doc.metadata or {}
+        ) for doc in docs
+    ]
+
+
+def _build_response(final_state: dict, conversation_id: str) -> ChatResponse:
+    """Build the ChatResponse from the final workflow state"""
+    response_text = final_state.get("generation", "Atsiprašau, nepavyko sugeneruoti atsakymo.")
+
+    return ChatResponse(
+        message=response_text,
+        conversation_id=conversation_id,
+        created_at=datetime.now(),
+        sources=_to_source_documents(final_state.get("full_documents")),
+        summary_documents=_to_source_documents(final_state.get("filtered_summaries"))  # Add new field for sidebar
+    )
+
+
+def attach_timings(request: ChatRequest, response: ChatResponse, timings: RequestTimings,
+                   cached: bool = False) -> ChatResponse:
+    """Add the per-stage breakdown to the response when the request asked for it"""
+    if not request.include_timings:
+        return response
+    return response.copy(update={"timings": {**timings.as_dict(), "cached": cached}})
+
+
+def warm_up() -> dict:
+    """
+    Import and compile the default chat workflow, run one query embedding and embed the
+    intent prototypes (blocking), so the first real request does not pay for any of them
+    """
+    from app.workflows.intent_classifier import INTENT_CLASSIFIER, get_intent_classifier
+    from app.workflows.workflow_functions import InstructRetriever, format_retrieval_query, task_description
+
+    timings = {}
+    started = time.perf_counter()
+    _get_chat_workflow(ChatRequest(message=""))
+    timings["workflow_compile_s"] = round(time.perf_counter() - started, 3)
+
+    started = time.perf_counter()
+    VectorStore().embeddings.embeddings.embed_query(InstructRetriever.get_detailed_instruct(task_description, "warm-up"))
+    timings["first_embedding_s"] = round(time.perf_counter() - started, 3)
+
+    if INTENT_CLASSIFIER == "embedding":
+        started = time.perf_counter()
+        get_intent_classifier(VectorStore().embeddings, format_retrieval_query).prototypes()
+        timings["intent_prototypes_s"] = round(time.perf_counter() - started, 3)
+    return timings
+
+
+async def _embed_question(question: str) -> List[float]:
+    """
+    Embed a question the same way retrieval does, so the vector is shared with
+    the query-embedding cache and retrieval itself becomes a cache hit
+    """
+    # Imported here so loading the app does not pull in the workflow modules
+    from app.workflows.workflow_functions import InstructRetriever, task_description
+
+    formatted_query = InstructRetriever.get_detailed_instruct(task_description, question)
+    return await run_blocking(VectorStore().embeddings.embed_query, formatted_query)
+
+
+async def _lookup_cached_answer(request: ChatRequest, conversation_id: str):
+    """
+    Look the question up in the semantic answer cache.
+    Returns (cached response or None, question vector, store version); the last two are
+    reused to store the fresh answer on a miss.
+    """
+    if not ANSWER_CACHE_ENABLED:
+        return None, None, None
+
+    vector = await _embed_question(request.message)
+    store_version = get_store_version()
+    cached = answer_cache.lookup(_model_name(request), vector, store_version)
+    if cached is not None:
+        cached = cached.copy(update={"conversation_id": conversation_id, "created_at": datetime.now()})
+    return cached, vector, store_version
+
+
+def _cache_answer(request: ChatRequest, vector, store_version, response: ChatResponse, final_state: dict):
+    """
+    Cache only complete work answers: chit-chat replies, "no projects found" answers and
+    answers from a run that skipped a failed step would otherwise be served to similar questions
+    """
+    if vector is None or not response.sources or final_state.get("degraded"):
+        return
+    if final_state.get("intent") == "chit_chat":
+        return
+    answer_cache.store(_model_name(request), request.message, vector, response, store_version)
+
+
+async def get_chat_response(request: ChatRequest) -> ChatResponse:
     """Process a chat request and generate a response using the LangGraph workflow."""
     try:
         logger.info(f"Received chat request: '{request.message[:50]}...'")
-        
+
         conversation_id = request.conversation_id or str(uuid.uuid4())
-        
-        # Get vectorstore - this should just work, no debugging needed
-        summaries_vectorstore = get_vectorstore(store_type="summary")
-        if summaries_vectorstore is None:
-            raise ValueError("Vector store not initialized properly")
-        full_vectorstore = get_vectorstore(store_type="full")
-        if full_vectorstore is None:
-            raise ValueError("Full vector store not initialized properly")
-        # Create workflow
-        model_name = getattr(request, 'model_name', "meta-llama/llama-4-scout-17b-16e-instruct")
-        
-        workflow = create_minimal_workflow(
-            summaries_vectorstore=summaries_vectorstore,
-            full_vectorstore=full_vectorstore,
-            k_sum=15,
-            search_type="similarity",
-            generator_name=model_name,
-            generator_temperature=0.0,
-            helper_name="meta-llama/llama-4-maverick-17b-128e-instruct",
-            helper_temperature=0.1
-        )
-        
-        # Execute workflow
-        initial_state = {
-            "messages": [{"role": "user", "content": request.message}],
-            "context": {},
-            "steps": [],
-            "question": request.message,
-            "generation_count": 0
-        }
-        
-        final_state = workflow.invoke(initial_state)
-        response_text = final_state.get("generation", "Atsiprašau, nepavyko sugeneruoti atsakymo.")
-        
-        # Format sources
-        formatted_sources = None
-        if final_state.get("full_documents"):
-            formatted_sources = [
-                SourceDocument(
-                    page_content=doc.page_content,
-                    metadata=doc.metadata or {}
-                ) for doc in final_state["full_documents"]
-            ]
-        
-        summary_documents = None
-        if final_state.get("filtered_summaries"):
-            summary_documents = [
-                SourceDocument(
-                    page_content=doc.page_content,
-                    metadata=doc.metadata or {}
-                ) for doc in final_state["filtered_summaries"]
-            ]
-        
-        return ChatResponse(
-            message=response_text,
-            conversation_id=conversation_id,
-            created_at=datetime.now(),
-            sources=formatted_sources,
-            summary_documents=summary_documents  # Add new field for sidebar
-        )
-        
+
+        with track_request() as timings, llm_request_scope(conversation_id):
+            conversation, follow_up = await _load_conversation(request, conversation_id)
+            # A follow-up's answer depends on the conversation, so it is neither looked up nor cached
+            cached, vector, store_version = (None, None, None) if follow_up else \
+                await _lookup_cached_answer(request, conversation_id)
+            if cached is not None:
+                _remember_turn(conversation_id, request, cached)
+                return attach_timings(request, cached, timings, cached=True)
+
+            workflow = _get_chat_workflow(request)
+
+            # Execute workflow
+            final_state = await workflow.ainvoke(_initial_state(request, conversation, follow_up))
+
+            response = _build_response(final_state, conversation_id)
+            _cache_answer(request, vector, store_version, response, final_state)
+            _remember_turn(conversation_id, request, response, follow_up)
+            return attach_timings(request, response, timings)
+
     except Exception as e:
         logger.error(f"Error in get_chat_response: {str(e)}")
-        raise
\ No newline at end of file
+        raise
+
+
+def format_event(event_type: str, data: dict, ndjson: bool = False) -> str:
+    """Serialize one stream event as an SSE frame or an NDJSON line"""
+    payload = jsonable_encoder(data)
+    if ndjson:
+        return json.dumps({"event": event_type, "data": payload}, ensure_ascii=False) + "\n"
+    return f"event: {event_type}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+
+async def stream_chat_response(request: ChatRequest, ndjson: bool = False) -> AsyncIterator[str]:
+    """
+    Run the chat workflow and yield progress as it happens:
+    - "step" when a graph node finishes
+    - "summaries" with the graded summaries for the sidebar, right after grading
+    - "token" for each answer token from the generator
+    - "done" with the full ChatResponse, or "error" if the workflow failed
+    """
+    conversation_id = request.conversation_id or str(uuid.uuid4())
+    logger.info(f"Received streaming chat request: '{request.message[:50]}...'")
+
+    try:
+        with track_request() as timings, llm_request_scope(conversation_id):
+            yield format_event("start", {"conversation_id": conversation_id}, ndjson)
+
+            conversation, follow_up = await _load_conversation(request, conversation_id)
+            cached, vector, store_version = (None, None, None) if follow_up else \
+                await _lookup_cached_answer(request, conversation_id)
+            if cached is not None:
+                _remember_turn(conversation_id, request, cached)
+                yield format_event("summaries", {"summary_documents": cached.summary_documents or []}, ndjson)
+                yield format_event("token", {"text": cached.message}, ndjson)
+                yield format_event("done", attach_timings(request, cached, timings, cached=True), ndjson)
+                return
+
+            workflow = _get_chat_workflow(request)
+
+            final_state = None
+            streamed_tokens = False
+
+            async for event in workflow.astream_events(_initial_state(request, conversation, follow_up), version="v2"):
+                kind = event["event"]
+                name = event.get("name")
+                node = event.get("metadata", {}).get("langgraph_node")
+
+                if kind == "on_chat_model_stream" and node in ANSWER_NODES:
+                    token = event["data"]["chunk"].content
+                    if token:
+                        streamed_tokens = True
+                        yield format_event("token", {"text": token}, ndjson)
+
+                elif kind == "on_chain_end" and name == node and name in workflow.nodes and not name.startswith("__"):
+                    yield format_event("step", {"node": name}, ndjson)
+                    output = event["data"].get("output")
+                    # Graded summaries come from grade_summary_documents or, speculatively, classify_and_retrieve
+                    if isinstance(output, dict) and "filtered_summaries" in output:
+                        yield format_event(
+                            "summaries",
+                            {"summary_documents": _to_source_documents(output.get("filtered_summaries")) or []},
+                            ndjson
+                        )
+
+                elif kind == "on_chain_end" and not event.get("parent_ids"):
+                    # End of the root graph run carries the final state
+                    final_state = event["data"].get("output")
+
+            if not isinstance(final_state, dict):
+                raise RuntimeError("Workflow finished without a final state")
+
+            response = _build_response(final_state, conversation_id)
+            _cache_answer(request, vector, store_version, response, final_state)
+            _remember_turn(conversation_id, request, response, follow_up)
+            if not streamed_tokens:
+                # Answers that did not come from a streaming LLM call (dictionary replies, default messages)
+                yield format_event("token", {"text": response.message}, ndjson)
+            yield format_event("done", attach_timings(request, response, timings), ndjson)
+
+    except Exception as e:
+        logger.error(f"Error in stream_chat_response: {str(e)}", exc_info=True)
+        yield format_event("error", {"detail": f"Failed to process chat: {str(e)}"}, ndjson)
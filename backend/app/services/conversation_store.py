@@ -0,0 +1,193 @@
+import os
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Deque, Dict, List, Optional, Set
+
+from langchain_core.documents import Document
+
+from app.models.schemas import ChatResponse
+from app.services.project_index import get_location, normalize_city
+from app.vectorstore.bm25 import fold, searchable_text, stem, tokenize
+import logging
+
+logger = logging.getLogger(__name__)
+
+CONVERSATION_FOLLOW_UPS = os.environ.get("CONVERSATION_FOLLOW_UPS", "true").lower() in ("1", "true", "yes")
+CONVERSATION_TTL_SECONDS = float(os.environ.get("CONVERSATION_TTL_SECONDS", "1800"))
+CONVERSATION_STORE_SIZE = int(os.environ.get("CONVERSATION_STORE_SIZE", "1000"))
+CONVERSATION_MAX_TURNS = int(os.environ.get("CONVERSATION_MAX_TURNS", "6"))
+# A question with at most this many content words can be a follow-up without a reference word
+FOLLOW_UP_MAX_TOKENS = int(os.environ.get("FOLLOW_UP_MAX_TOKENS", "4"))
+
+WORD_PATTERN = re.compile(r"\w+")
+
+# First words that continue the previous question ("o kada terminas?")
+CONTINUATION_WORDS = {"o", "ir", "bet", "tai", "and", "but", "so"}
+# Words that point back at documents already shown (folded)
+REFERENCE_WORDS = {
+    "jo", "jos", "ju", "jam", "jai", "jame", "joje", "juose", "jie", "jis", "ji",
+    "sio", "sios", "siu", "sis", "sie", "si", "sita", "sito", "situ", "siame", "sioje", "siuose", "sitame",
+    "tas", "tie", "tos", "tame", "toje", "tuose", "ten",
+    "mineta", "mineto", "minetu", "minetas", "minetame", "pirmas", "pirmo", "pirmame", "antras", "antro",
+    "trecias", "trecio", "paskutinis", "paskutinio", "it", "its", "they", "them", "those", "these", "first", "last",
+}
+# Details asked about projects already found; a short question made of these needs no new search
+DETAIL_WORDS = {
+    stem(fold(word)) for word in (
+        "terminas", "terminai", "kaina", "kainuoja", "biudžetas", "adresas", "kontaktai", "telefonas",
+        "reikalavimai", "dokumentai", "užsakovas", "pateikti", "pasiūlymas", "kiek", "deadline", "price",
+        "address", "contact", "requirements",
+    )
+}
+
+
+@dataclass
+class ConversationTurn:
+    question: str
+    answer: str
+    follow_up: bool
+    created_at: float
+
+
+@dataclass
+class Conversation:
+    """Recent turns plus the documents the latest searching turn found"""
+    turns: Deque[ConversationTurn] = field(default_factory=lambda: deque(maxlen=CONVERSATION_MAX_TURNS))
+    full_documents: List[Document] = field(default_factory=list)
+    summaries: List[Document] = field(default_factory=list)
+    # Cities and BM25 tokens of those documents, for follow-up detection
+    cities: Set[str] = field(default_factory=set)
+    tokens: Set[str] = field(default_factory=set)
+    updated_at: float = field(default_factory=time.time)
+
+    @property
+    def document_uuids(self) -> List[str]:
+        return [doc.metadata.get("uuid") for doc in self.summaries if doc.metadata.get("uuid")]
+
+    def history(self) -> List[Dict[str, str]]:
+        return [{"question": turn.question, "answer": turn.answer} for turn in self.turns]
+
+    def set_documents(self, full_documents: List[Document], summaries: List[Document]):
+        self.full_documents = full_documents
+        self.summaries = summaries
+        self.cities = {
+            normalize_city(get_location(doc.metadata)).lower() for doc in summaries + full_documents
+        }
+        self.tokens = {
+            token for doc in summaries for token in tokenize(searchable_text(doc.page_content, doc.metadata))
+        }
+
+
+def _to_documents(source_documents) -> List[Document]:
+    return [Document(page_content=doc.page_content, metadata=dict(doc.metadata or {})) for doc in source_documents or []]
+
+
+def is_follow_up(question: str, conversation: Optional[Conversation], cities: List[str]) -> bool:
+    """
+    Whether a question asks about the documents the conversation already found.
+    cities are the cities named in the question (QueryAnalyzer); naming a city the
+    documents are not in always starts a new search. Otherwise it is a follow-up if it
+    starts with a continuation word, uses a reference word, or is short and only asks
+    about details or words found in the documents.
+    """
+    if conversation is None or not conversation.full_documents:
+        return False
+    if any(city.lower() not in conversation.cities for city in cities):
+        return False
+
+    words = WORD_PATTERN.findall(fold(question))
+    if not words:
+        return False
+    if words[0] in CONTINUATION_WORDS or any(word in REFERENCE_WORDS for word in words):
+        return True
+
+    tokens = tokenize(question)
+    return 0 < len(tokens) <= FOLLOW_UP_MAX_TOKENS and all(
+        token in DETAIL_WORDS or token in conversation.tokens for token in tokens
+    )
+
+
+class ConversationStore:
+    """
+    Bounded, TTL-evicted per-process store of conversations by conversation_id.
+    With several API workers a conversation is only found by the worker that served
+    its previous turn; elsewhere the question is simply handled as a new one.
+    """
+
+    def __init__(self, ttl_seconds: float = CONVERSATION_TTL_SECONDS, max_size: int = CONVERSATION_STORE_SIZE):
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        self._conversations: "OrderedDict[str, Conversation]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.follow_ups = 0
+
+    def _expire(self, now: float):
+        while self._conversations:
+            conversation_id, conversation = next(iter(self._conversations.items()))
+            if now - conversation.updated_at <= self.ttl_seconds:
+                break
+            del self._conversations[conversation_id]
+            self.expirations += 1
+
+    def get(self, conversation_id: Optional[str]) -> Optional[Conversation]:
+        if not conversation_id:
+            return None
+        with self._lock:
+            self._expire(time.time())
+            conversation = self._conversations.get(conversation_id)
+            if conversation is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return conversation
+
+    def record(self, conversation_id: str, question: str, response: ChatResponse, follow_up: bool = False):
+        """
+        Add a turn. Documents are replaced when the turn searched and found some;
+        follow-ups and chit-chat keep the previous turn's documents.
+        """
+        now = time.time()
+        with self._lock:
+            self._expire(now)
+            conversation = self._conversations.get(conversation_id)
+            if conversation is None:
+                conversation = self._conversations[conversation_id] = Conversation()
+            conversation.turns.append(ConversationTurn(question, response.message, follow_up, now))
+            if follow_up:
+                self.follow_ups += 1
+            elif response.sources:
+                conversation.set_documents(_to_documents(response.sources), _to_documents(response.summary_documents))
+            conversation.updated_at = now
+            # Most recently used last, so expiry and eviction both start from the front
+            self._conversations.move_to_end(conversation_id)
+            while len(self._conversations) > self.max_size:
+                self._conversations.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._conversations.clear()
+
+    def stats(self) -> Dict[str, float]:
+        """Store statistics for health and monitoring endpoints"""
+        with self._lock:
+            return {
+                "enabled": CONVERSATION_FOLLOW_UPS,
+                "size": len(self._conversations),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "follow_ups": self.follow_ups,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+conversation_store = ConversationStore()
@@ -0,0 +1,153 @@
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Deque, Dict, Hashable, List, Optional, Tuple
+
+from langchain_core.documents import Document
+
+from app.services.executor import run_blocking
+from app.services.metrics import time_vectorstore
+from app.vectorstore.document_cache import get_full_documents
+from app.vectorstore.row_index import current_row_index
+from app.vectorstore.store import get_single_store_version
+import logging
+
+logger = logging.getLogger(__name__)
+
+DOCUMENT_SESSION_SIZE = int(os.environ.get("DOCUMENT_SESSION_SIZE", "128"))
+DOCUMENT_SESSION_TTL_SECONDS = float(os.environ.get("DOCUMENT_SESSION_TTL_SECONDS", "1800"))
+DOCUMENT_SESSION_MAX_TURNS = int(os.environ.get("DOCUMENT_SESSION_MAX_TURNS", "4"))
+# Conversations whose Q&A history one session keeps
+DOCUMENT_SESSION_MAX_CONVERSATIONS = int(os.environ.get("DOCUMENT_SESSION_MAX_CONVERSATIONS", "32"))
+
+
+def render_document_context(documents: List[Document]) -> str:
+    """Prompt text for a document's rows, rendered once per session instead of per message"""
+    return "\n\n".join(f"Metaduomenys: {doc.metadata or {}}\n{doc.page_content}" for doc in documents)
+
+
+@dataclass
+class DocumentSession:
+    """One document's rows, their rendered prompt context and recent Q&A per conversation"""
+    document_id: str
+    documents: List[Document]
+    context: str
+    store_version: Hashable
+    last_used: float = field(default_factory=time.time)
+    turns: "OrderedDict[str, Deque[Tuple[str, str]]]" = field(default_factory=OrderedDict)
+
+    def history(self, conversation_id: Optional[str]) -> List[Dict[str, str]]:
+        return [{"question": q, "answer": a} for q, a in self.turns.get(conversation_id, ())]
+
+
+def load_document(full_vectorstore, document_id: str, store_version: Hashable) -> List[Document]:
+    """Rows stored under a document's UUID, or under its legacy "id" field (blocking)"""
+    row_index = current_row_index(store_version)
+    if row_index is not None:
+        uuid = row_index.resolve(document_id)
+        return get_full_documents(full_vectorstore, [uuid], store_version) if uuid else []
+
+    documents = get_full_documents(full_vectorstore, [document_id], store_version)
+    if documents:
+        return documents
+    with time_vectorstore("full", "get"):
+        results = full_vectorstore._collection.get(where={"id": document_id}, include=["documents", "metadatas"])
+    return [
+        Document(page_content=content, metadata=metadata or {})
+        for content, metadata in zip(results.get("documents") or [], results.get("metadatas") or [])
+    ]
+
+
+class DocumentSessionCache:
+    """
+    LRU/TTL cache of DocumentSessions by document ID, shared by /document and
+    /document-workflow. A session is dropped when the full store changes. Q&A history
+    is kept per conversation, so two people chatting about one document do not see
+    each other's questions.
+    """
+
+    def __init__(self, max_size: int = DOCUMENT_SESSION_SIZE, ttl_seconds: float = DOCUMENT_SESSION_TTL_SECONDS):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._sessions: "OrderedDict[str, DocumentSession]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, document_id: str, store_version: Hashable) -> Optional[DocumentSession]:
+        now = time.time()
+        with self._lock:
+            session = self._sessions.get(document_id)
+            if session is not None and (
+                session.store_version != store_version or now - session.last_used > self.ttl_seconds
+            ):
+                del self._sessions[document_id]
+                self.expirations += 1
+                session = None
+            if session is None:
+                self.misses += 1
+                return None
+            session.last_used = now
+            self._sessions.move_to_end(document_id)
+            self.hits += 1
+            return session
+
+    def put(self, session: DocumentSession):
+        with self._lock:
+            self._sessions[session.document_id] = session
+            self._sessions.move_to_end(session.document_id)
+            while len(self._sessions) > self.max_size:
+                self._sessions.popitem(last=False)
+                self.evictions += 1
+
+    def load(self, document_id: str, full_vectorstore, store_version: Hashable) -> Optional[DocumentSession]:
+        """Read the document and open a new session for it (blocking); None if not found"""
+        documents = load_document(full_vectorstore, document_id, store_version)
+        if not documents:
+            return None
+        session = DocumentSession(document_id, documents, render_document_context(documents), store_version)
+        self.put(session)
+        logger.info(f"Opened document session for {document_id} ({len(documents)} rows)")
+        return session
+
+    def record(self, session: DocumentSession, conversation_id: str, question: str, answer: str):
+        with self._lock:
+            turns = session.turns.get(conversation_id)
+            if turns is None:
+                turns = session.turns[conversation_id] = deque(maxlen=DOCUMENT_SESSION_MAX_TURNS)
+            turns.append((question, answer))
+            session.turns.move_to_end(conversation_id)
+            while len(session.turns) > DOCUMENT_SESSION_MAX_CONVERSATIONS:
+                session.turns.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._sessions.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """Cache statistics for health and monitoring endpoints"""
+        with self._lock:
+            return {
+                "size": len(self._sessions),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+document_sessions = DocumentSessionCache()
+
+
+async def aget_document_session(document_id: str, full_vectorstore) -> Optional[DocumentSession]:
+    """Cached session without leaving the event loop; store reads on a miss run on the executor"""
+    store_version = get_single_store_version(full_vectorstore)
+    session = document_sessions.get(document_id, store_version)
+    if session is not None:
+        return session
+    return await run_blocking(document_sessions.load, document_id, full_vectorstore, store_version)
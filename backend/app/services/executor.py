@@ -0,0 +1,28 @@
+import asyncio
+import contextvars
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Bounded pool for blocking work (Chroma queries, local embedding) so it never
+# runs on the event loop and cannot grow without limit under load
+BLOCKING_POOL_SIZE = int(os.environ.get("BLOCKING_POOL_SIZE", "8"))
+
+_executor = ThreadPoolExecutor(max_workers=BLOCKING_POOL_SIZE, thread_name_prefix="blocking")
+
+
+async def run_blocking(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """Run a blocking callable on the shared executor and await its result"""
+    loop = asyncio.get_running_loop()
+    # Like asyncio.to_thread, carry context variables (per-request timings) into the worker
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(_executor, functools.partial(context.run, func, *args, **kwargs))
+
+
+def shutdown_executor():
+    """Stop the shared executor, waiting for running jobs to finish"""
+    _executor.shutdown(wait=True)
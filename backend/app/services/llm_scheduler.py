@@ -0,0 +1,307 @@
+"""
+Process-wide scheduler for LLM calls.
+
+Every Groq call takes a slot from its model's queue before it is sent:
+- requests/min and tokens/min token buckets per model (LLM_RATE_LIMITS), so the
+  process stays under Groq's limits instead of collecting 429s and retrying
+- at most LLM_MAX_CONCURRENCY calls in flight per model
+- strict priority: answer generation before classification before grading
+- round-robin between requests within a priority, so one request's fifteen
+  grading calls cannot starve another request
+A 429 pauses the model's queue for the Retry-After period (see ScheduledChatGroq).
+"""
+import asyncio
+import contextvars
+import json
+import math
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, Deque, Dict, Hashable, Optional
+import logging
+
+from app.services.metrics import observe_llm_queue, LLM_QUEUE_DEPTH, LLM_IN_FLIGHT, LLM_RATE_LIMITED
+
+logger = logging.getLogger(__name__)
+
+# {"model name": {"rpm": 30, "tpm": 6000, "concurrency": 8}}; 0 or missing means no limit
+LLM_RATE_LIMITS: Dict[str, Dict[str, float]] = json.loads(os.environ.get("LLM_RATE_LIMITS", "{}"))
+LLM_DEFAULT_RPM = float(os.environ.get("LLM_DEFAULT_RPM", "0"))
+LLM_DEFAULT_TPM = float(os.environ.get("LLM_DEFAULT_TPM", "0"))
+LLM_MAX_CONCURRENCY = int(os.environ.get("LLM_MAX_CONCURRENCY", "16"))
+
+# Lower runs first. Keyed by the LangGraph node making the call.
+PRIORITY_HIGH, PRIORITY_NORMAL, PRIORITY_LOW = 0, 1, 2
+PRIORITY_NAMES = {PRIORITY_HIGH: "high", PRIORITY_NORMAL: "normal", PRIORITY_LOW: "low"}
+NODE_PRIORITIES = {
+    "generate": PRIORITY_HIGH,
+    "answer_chit_chat": PRIORITY_HIGH,
+    "answer_follow_up": PRIORITY_HIGH,
+    "ask_question": PRIORITY_NORMAL,  # the chit-chat classifier runs on this node's edge
+    "classify_and_retrieve": PRIORITY_NORMAL,  # ...or inside this node in speculative mode
+    "grade_summary_documents": PRIORITY_LOW,
+}
+
+_current_request: contextvars.ContextVar[Optional[Hashable]] = contextvars.ContextVar("llm_request", default=None)
+_current_node: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("llm_node", default=None)
+
+
+@contextmanager
+def llm_request_scope(request_id: Hashable):
+    """LLM calls made inside the block are queued fairly as one request"""
+    token = _current_request.set(request_id)
+    try:
+        yield
+    finally:
+        try:
+            _current_request.reset(token)
+        except ValueError:
+            # A streaming generator closed from another task after the client went away
+            pass
+
+
+@contextmanager
+def llm_node_scope(node: str):
+    """LLM calls made inside the block are prioritised as if made by node (for work run inside another node)"""
+    token = _current_node.set(node)
+    try:
+        yield
+    finally:
+        _current_node.reset(token)
+
+
+def scheduled_node(metadata_node: Optional[str]) -> Optional[str]:
+    """Node a call is prioritised as: the innermost llm_node_scope, else the LangGraph node making it"""
+    return _current_node.get() or metadata_node
+
+
+def priority_for_node(node: Optional[str]) -> int:
+    return NODE_PRIORITIES.get(node, PRIORITY_NORMAL)
+
+
+class TokenBucket:
+    """Refills continuously at capacity per minute; may go negative when usage is reconciled"""
+
+    def __init__(self, per_minute: float):
+        self.capacity = per_minute
+        self.rate = per_minute / 60.0
+        self.level = per_minute
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until amount can be taken (requests larger than the bucket wait for a full bucket)"""
+        self._refill(now)
+        needed = min(amount, self.capacity) - self.level
+        return max(0.0, needed / self.rate)
+
+    def take(self, amount: float, now: float):
+        self._refill(now)
+        self.level -= amount
+
+
+class Slot:
+    """A granted LLM call; record_usage corrects the token reservation with real usage"""
+
+    def __init__(self, queue: "ModelQueue", reserved_tokens: int):
+        self.queue = queue
+        self.reserved_tokens = reserved_tokens
+
+    def record_usage(self, total_tokens: int):
+        if self.queue.tpm is not None and total_tokens:
+            self.queue.tpm.take(total_tokens - self.reserved_tokens, time.monotonic())
+            self.reserved_tokens = total_tokens
+
+
+class _Waiter:
+    __slots__ = ("future", "tokens", "priority", "enqueued")
+
+    def __init__(self, future: asyncio.Future, tokens: int, priority: int):
+        self.future = future
+        self.tokens = tokens
+        self.priority = priority
+        self.enqueued = time.monotonic()
+
+
+class ModelQueue:
+    """Waiting calls and limits for one model; only touched from the event loop"""
+
+    def __init__(self, model: str, rpm: float, tpm: float, concurrency: int):
+        self.model = model
+        self.rpm = TokenBucket(rpm) if rpm else None
+        self.tpm = TokenBucket(tpm) if tpm else None
+        self.concurrency = concurrency
+        self.in_flight = 0
+        self.paused_until = 0.0
+        # priority -> request -> FIFO of waiters; rotation holds requests in round-robin order
+        self.waiting: Dict[int, Dict[Hashable, Deque[_Waiter]]] = {}
+        self.rotation: Dict[int, Deque[Hashable]] = {}
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self.granted = 0
+        self.rate_limited = 0
+
+    def depth(self, priority: Optional[int] = None) -> int:
+        priorities = [priority] if priority is not None else list(self.waiting)
+        return sum(len(waiters) for p in priorities for waiters in self.waiting.get(p, {}).values())
+
+    def enqueue(self, waiter: _Waiter, request_id: Hashable):
+        by_request = self.waiting.setdefault(waiter.priority, {})
+        if request_id not in by_request:
+            by_request[request_id] = deque()
+            self.rotation.setdefault(waiter.priority, deque()).append(request_id)
+        by_request[request_id].append(waiter)
+        self._update_depth(waiter.priority)
+        self.dispatch()
+
+    def remove(self, waiter: _Waiter, request_id: Hashable):
+        """Drop a cancelled waiter that was never granted"""
+        waiters = self.waiting.get(waiter.priority, {}).get(request_id)
+        if waiters and waiter in waiters:
+            waiters.remove(waiter)
+            if not waiters:
+                del self.waiting[waiter.priority][request_id]
+                self.rotation[waiter.priority].remove(request_id)
+            self._update_depth(waiter.priority)
+
+    def release(self):
+        self.in_flight -= 1
+        LLM_IN_FLIGHT.labels(self.model).set(self.in_flight)
+        self.dispatch()
+
+    def pause(self, seconds: float):
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+        self.rate_limited += 1
+        LLM_RATE_LIMITED.labels(self.model).inc()
+        self.dispatch()
+
+    def _next(self):
+        """(priority, request id, waiter) that should run next, without removing it"""
+        for priority in sorted(self.rotation):
+            rotation = self.rotation[priority]
+            if rotation:
+                request_id = rotation[0]
+                return priority, request_id, self.waiting[priority][request_id][0]
+        return None
+
+    def _wait_time(self, waiter: _Waiter, now: float) -> float:
+        wait = max(0.0, self.paused_until - now)
+        if self.rpm is not None:
+            wait = max(wait, self.rpm.wait_time(1, now))
+        if self.tpm is not None:
+            wait = max(wait, self.tpm.wait_time(waiter.tokens, now))
+        return wait
+
+    def dispatch(self):
+        """Grant slots in priority / round-robin order while limits allow"""
+        while self.in_flight < self.concurrency:
+            head = self._next()
+            if head is None:
+                return
+            priority, request_id, waiter = head
+            now = time.monotonic()
+            wait = self._wait_time(waiter, now)
+            if wait > 0:
+                self._schedule(wait)
+                return
+
+            rotation = self.rotation[priority]
+            waiters = self.waiting[priority][request_id]
+            waiters.popleft()
+            rotation.popleft()
+            if waiters:
+                rotation.append(request_id)
+            else:
+                del self.waiting[priority][request_id]
+            self._update_depth(priority)
+
+            if waiter.future.done():
+                continue  # cancelled while queued
+            if self.rpm is not None:
+                self.rpm.take(1, now)
+            if self.tpm is not None:
+                self.tpm.take(waiter.tokens, now)
+            self.in_flight += 1
+            self.granted += 1
+            LLM_IN_FLIGHT.labels(self.model).set(self.in_flight)
+            # Seconds queued; observed by the waiter, since dispatch runs in another request's context
+            waiter.future.set_result(now - waiter.enqueued)
+
+    def _schedule(self, delay: float):
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = asyncio.get_running_loop().call_later(delay, self._on_timer)
+
+    def _on_timer(self):
+        self._timer = None
+        self.dispatch()
+
+    def _update_depth(self, priority: int):
+        LLM_QUEUE_DEPTH.labels(self.model, PRIORITY_NAMES[priority]).set(self.depth(priority))
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        return {
+            "queued": self.depth(),
+            "in_flight": self.in_flight,
+            "granted": self.granted,
+            "rate_limited": self.rate_limited,
+            "paused_for_s": round(max(0.0, self.paused_until - now), 2),
+            "rpm_available": math.floor(self.rpm.level) if self.rpm else None,
+            "tpm_available": math.floor(self.tpm.level) if self.tpm else None,
+        }
+
+
+class LLMScheduler:
+    def __init__(self, limits: Dict[str, Dict[str, float]] = LLM_RATE_LIMITS):
+        self.limits = limits
+        self._queues: Dict[str, ModelQueue] = {}
+
+    def queue(self, model: str) -> ModelQueue:
+        queue = self._queues.get(model)
+        if queue is None:
+            limits = self.limits.get(model, {})
+            queue = self._queues[model] = ModelQueue(
+                model,
+                rpm=limits.get("rpm", LLM_DEFAULT_RPM),
+                tpm=limits.get("tpm", LLM_DEFAULT_TPM),
+                concurrency=int(limits.get("concurrency", LLM_MAX_CONCURRENCY)),
+            )
+        return queue
+
+    @asynccontextmanager
+    async def slot(self, model: str, tokens: int, priority: int = PRIORITY_NORMAL):
+        """Wait for this model's limits to allow a call of about tokens tokens, then hold a slot"""
+        queue = self.queue(model)
+        request_id = _current_request.get()
+        waiter = _Waiter(asyncio.get_running_loop().create_future(), tokens, priority)
+        queue.enqueue(waiter, request_id)
+        try:
+            queued_seconds = await waiter.future
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                queue.release()  # granted just as we were cancelled
+            else:
+                queue.remove(waiter, request_id)
+            raise
+        observe_llm_queue(model, PRIORITY_NAMES[priority], queued_seconds)
+
+        try:
+            yield Slot(queue, tokens)
+        finally:
+            queue.release()
+
+    def pause(self, model: str, seconds: float):
+        """Hold every call to model for seconds (after a 429)"""
+        logger.warning(f"LLM rate limited for {model}, pausing its queue for {seconds:.1f}s")
+        self.queue(model).pause(seconds)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per-model queue statistics for health and monitoring endpoints"""
+        return {model: queue.stats() for model, queue in self._queues.items()}
+
+
+llm_scheduler = LLMScheduler()
@@ -0,0 +1,283 @@
+"""
+Prometheus metrics for the chat workflows, LLM calls, embedding and Chroma queries.
+
+Everything recorded here is also added to the current request's RequestTimings
+(when one is active), which is how ChatResponse.timings gets its breakdown.
+With several uvicorn workers set PROMETHEUS_MULTIPROC_DIR so /metrics
+aggregates all of them.
+"""
+import contextvars
+import functools
+import inspect
+import os
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, REGISTRY, generate_latest
+import logging
+
+logger = logging.getLogger(__name__)
+
+# LLM calls and whole nodes can take tens of seconds; the default buckets stop at 10s
+SLOW_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 16.0, 32.0, 64.0)
+FAST_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+NODE_SECONDS = Histogram(
+    "workflow_node_seconds", "Wall time of one LangGraph node run", ["workflow", "node"], buckets=SLOW_BUCKETS
+)
+NODE_ERRORS = Counter("workflow_node_errors_total", "LangGraph node runs that raised", ["workflow", "node"])
+LLM_SECONDS = Histogram(
+    "llm_request_seconds", "Wall time of one LLM call, including its scheduler queue wait", ["model", "node"], buckets=SLOW_BUCKETS
+)
+LLM_TOKENS = Counter("llm_tokens_total", "Tokens used by LLM calls", ["model", "node", "kind"])
+LLM_ERRORS = Counter("llm_errors_total", "LLM calls that failed", ["model", "node"])
+LLM_QUEUE_SECONDS = Histogram(
+    "llm_queue_wait_seconds", "Time an LLM call waited in the scheduler queue", ["model", "priority"],
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 16.0, 32.0, 64.0)
+)
+LLM_QUEUE_DEPTH = Gauge(
+    "llm_queue_depth", "LLM calls waiting in the scheduler queue", ["model", "priority"], multiprocess_mode="livesum"
+)
+LLM_IN_FLIGHT = Gauge("llm_in_flight", "LLM calls in flight", ["model"], multiprocess_mode="livesum")
+LLM_RATE_LIMITED = Counter("llm_rate_limited_total", "429 responses that paused a model's queue", ["model"])
+EMBEDDING_SECONDS = Histogram(
+    "embedding_seconds", "Wall time of one embedding model call", ["operation"], buckets=FAST_BUCKETS
+)
+EMBEDDING_TEXTS = Counter("embedding_texts_total", "Texts embedded by the model", ["operation"])
+INTENT_DECISIONS = Counter(
+    "intent_decisions_total", "Chit-chat classifications by the part that decided them", ["source", "label"]
+)
+SPECULATION_RUNS = Counter(
+    "speculation_runs_total", "Speculative retrieval runs by outcome and the last stage they reached", ["outcome", "stage"]
+)
+SPECULATION_SAVED_SECONDS = Histogram(
+    "speculation_saved_seconds", "Critical-path time saved by running retrieval alongside classification",
+    buckets=SLOW_BUCKETS
+)
+SPECULATION_WASTED_SECONDS = Histogram(
+    "speculation_wasted_seconds", "Speculative work discarded because the question was chit-chat", buckets=SLOW_BUCKETS
+)
+VECTORSTORE_SECONDS = Histogram(
+    "vectorstore_seconds", "Wall time of one Chroma call (searches include the query embedding)",
+    ["store", "operation"], buckets=FAST_BUCKETS
+)
+
+
+class RequestTimings:
+    """Per-request breakdown, collected alongside the Prometheus metrics"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.nodes: Dict[str, float] = {}
+        self.llm_calls = 0
+        self.llm_seconds = 0.0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.models: Dict[str, int] = {}
+        self.llm_queue_seconds = 0.0
+        self.embedding_seconds = 0.0
+        self.vectorstore_seconds = 0.0
+        self.speculation: Optional[Dict[str, Any]] = None
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "total_ms": _ms(time.perf_counter() - self.started),
+            "nodes_ms": {node: _ms(seconds) for node, seconds in self.nodes.items()},
+            "llm": {
+                "calls": self.llm_calls,
+                "ms": _ms(self.llm_seconds),
+                "prompt_tokens": self.prompt_tokens,
+                "completion_tokens": self.completion_tokens,
+                "models": dict(self.models),
+                "queue_ms": _ms(self.llm_queue_seconds),
+            },
+            "embedding_ms": _ms(self.embedding_seconds),
+            "vectorstore_ms": _ms(self.vectorstore_seconds),
+            "speculation": self.speculation,
+        }
+
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 2)
+
+
+_current_timings: contextvars.ContextVar[Optional[RequestTimings]] = contextvars.ContextVar(
+    "request_timings", default=None
+)
+
+
+@contextmanager
+def track_request():
+    """Collect a RequestTimings for everything run inside this block (including graph nodes and run_blocking)"""
+    timings = RequestTimings()
+    token = _current_timings.set(timings)
+    try:
+        yield timings
+    finally:
+        try:
+            _current_timings.reset(token)
+        except ValueError:
+            # A streaming generator closed from another task after the client went away
+            pass
+
+
+def timed_node(workflow: str, node: str, func: Callable) -> Callable:
+    """Wrap a LangGraph node function (sync or async) to record its wall time and errors"""
+
+    def record(started: float):
+        elapsed = time.perf_counter() - started
+        NODE_SECONDS.labels(workflow, node).observe(elapsed)
+        timings = _current_timings.get()
+        if timings is not None:
+            timings.nodes[node] = timings.nodes.get(node, 0.0) + elapsed
+
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_node(state):
+            started = time.perf_counter()
+            try:
+                return await func(state)
+            except Exception:
+                NODE_ERRORS.labels(workflow, node).inc()
+                raise
+            finally:
+                record(started)
+        return async_node
+
+    @functools.wraps(func)
+    def node_func(state):
+        started = time.perf_counter()
+        try:
+            return func(state)
+        except Exception:
+            NODE_ERRORS.labels(workflow, node).inc()
+            raise
+        finally:
+            record(started)
+    return node_func
+
+
+def observe_llm_queue(model: str, priority: str, seconds: float):
+    LLM_QUEUE_SECONDS.labels(model, priority).observe(seconds)
+    timings = _current_timings.get()
+    if timings is not None:
+        timings.llm_queue_seconds += seconds
+
+
+def observe_embedding(operation: str, texts: int, seconds: float):
+    EMBEDDING_SECONDS.labels(operation).observe(seconds)
+    EMBEDDING_TEXTS.labels(operation).inc(texts)
+    timings = _current_timings.get()
+    if timings is not None:
+        timings.embedding_seconds += seconds
+
+
+def observe_speculation(used: bool, stage: str, classify_seconds: float, speculative_seconds: float):
+    """
+    Record one speculative run. Overlapping the two takes max(classify, speculative) instead
+    of their sum, so min(classify, speculative) is the time saved when the work is used
+    and the time thrown away when it is discarded.
+    """
+    overlap = min(classify_seconds, speculative_seconds)
+    outcome = "used" if used else "discarded"
+    SPECULATION_RUNS.labels(outcome, stage).inc()
+    (SPECULATION_SAVED_SECONDS if used else SPECULATION_WASTED_SECONDS).observe(overlap)
+    timings = _current_timings.get()
+    if timings is not None:
+        timings.speculation = {
+            "outcome": outcome,
+            "stage": stage,
+            "classify_ms": _ms(classify_seconds),
+            "speculative_ms": _ms(speculative_seconds),
+            "saved_ms" if used else "wasted_ms": _ms(overlap),
+        }
+
+
+@contextmanager
+def time_vectorstore(store: str, operation: str):
+    """Time a Chroma call made inside the block"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        VECTORSTORE_SECONDS.labels(store, operation).observe(elapsed)
+        timings = _current_timings.get()
+        if timings is not None:
+            timings.vectorstore_seconds += elapsed
+
+
+def _token_usage(response: LLMResult):
+    """(prompt, completion) tokens from usage_metadata (also set when streaming) or llm_output"""
+    for generations in response.generations:
+        for generation in generations:
+            usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if usage:
+                return usage.get("input_tokens", 0), usage.get("output_tokens", 0)
+    usage = (response.llm_output or {}).get("token_usage") or {}
+    return usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0)
+
+
+class LLMMetricsCallback(BaseCallbackHandler):
+    """Records latency, tokens and errors of every call made by the LLM it is attached to"""
+
+    # Called on the caller's task, so the request's RequestTimings is visible
+    run_inline = True
+
+    def __init__(self):
+        self._runs: Dict[UUID, tuple] = {}
+
+    def on_chat_model_start(self, serialized, messages, *, run_id: UUID, metadata: Optional[Dict] = None, **kwargs):
+        self._start(run_id, metadata)
+
+    def on_llm_start(self, serialized, prompts, *, run_id: UUID, metadata: Optional[Dict] = None, **kwargs):
+        self._start(run_id, metadata)
+
+    def _start(self, run_id: UUID, metadata: Optional[Dict]):
+        metadata = metadata or {}
+        model = metadata.get("ls_model_name") or "unknown"
+        node = metadata.get("langgraph_node") or "none"
+        self._runs[run_id] = (model, node, time.perf_counter())
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs):
+        run = self._runs.pop(run_id, None)
+        if run is None:
+            return
+        model, node, started = run
+        elapsed = time.perf_counter() - started
+        prompt_tokens, completion_tokens = _token_usage(response)
+
+        LLM_SECONDS.labels(model, node).observe(elapsed)
+        LLM_TOKENS.labels(model, node, "prompt").inc(prompt_tokens)
+        LLM_TOKENS.labels(model, node, "completion").inc(completion_tokens)
+
+        timings = _current_timings.get()
+        if timings is not None:
+            timings.llm_calls += 1
+            timings.llm_seconds += elapsed
+            timings.prompt_tokens += prompt_tokens
+            timings.completion_tokens += completion_tokens
+            timings.models[model] = timings.models.get(model, 0) + 1
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs):
+        run = self._runs.pop(run_id, None)
+        if run is not None:
+            LLM_ERRORS.labels(run[0], run[1]).inc()
+
+
+llm_metrics_callback = LLMMetricsCallback()
+
+
+def render_metrics():
+    """(body, content type) for the /metrics endpoint"""
+    registry = REGISTRY
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return generate_latest(registry), CONTENT_TYPE_LATEST
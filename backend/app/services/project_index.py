@@ -0,0 +1,198 @@
+import bisect
+import datetime
+import heapq
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Hashable, List, Optional, Set, Tuple
+
+from app.vectorstore.deadlines import get_deadline_value, parse_deadline
+from app.vectorstore.store import get_store_version, get_vectorstore
+from app.services.executor import run_blocking
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Metadata fields that may hold the project location, in lookup order
+CITY_FIELDS = ('Miestas', 'miestas', 'Vieta', 'vieta')
+
+# Deadline fields in the order /api/recent-projects has always used: the project submission
+# date before the offer date (the grader's DEADLINE_FIELDS check the offer date first)
+PROJECT_DEADLINE_FIELDS = ('Pateikti_projekta_iki', 'Pasiulyma_pateikti_iki', 'pateikti_iki')
+
+# Placeholders stored in the city fields when a summary has no location
+NON_CITY_VALUES = {
+    "nėra", "nera", "nėra duomenų", "nenurodyta", "nenurodytas", "nenurodyti", "nežinoma", "nežinomas",
+    "neaišku", "n/a", "na", "none", "null", "unknown", "-", "–", "—",
+}
+
+
+def is_city_name(city: str) -> bool:
+    """False for empty, placeholder ("Nėra", "-") and letterless city values"""
+    return bool(city) and city.strip().lower() not in NON_CITY_VALUES and any(char.isalpha() for char in city)
+
+
+def get_location(metadata: Dict[str, Any]) -> str:
+    """Raw location value from the first city field that is set"""
+    return get_location_field(metadata)[1]
+
+
+def get_location_field(metadata: Dict[str, Any]) -> Tuple[Optional[str], str]:
+    """(field, raw location value) for the first city field that is set"""
+    for field in CITY_FIELDS:
+        value = metadata.get(field)
+        if value:
+            return field, value
+    return None, ""
+
+
+def normalize_city(location: str) -> str:
+    """City name from a location such as "Vilnius, Antakalnio sen." """
+    if location and "," in location:
+        return location.split(",")[0].strip()
+    return location.strip() if location else ""
+
+
+@dataclass
+class ProjectEntry:
+    id: str
+    uuid: Optional[str]
+    title: str
+    location: str
+    location_field: Optional[str]
+    city: str
+    deadline_value: Any
+    deadline: Optional[datetime.date]
+    summary: str
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Project as returned by /api/recent-projects"""
+        return {
+            "id": self.id,
+            "title": self.title,
+            "deadline": self.deadline_value,
+            "deadline_timestamp": self.deadline.isoformat(),
+            "location": self.location,
+            "summary": self.summary,
+        }
+
+
+class ProjectIndex:
+    """
+    Precomputed view of the summary collection's project metadata.
+
+    Holds every project with its normalized city and parsed deadline, the
+    dated projects sorted by deadline, and a city -> projects map, so the
+    project endpoints never have to scan the vector store per request.
+    """
+
+    def __init__(self, entries: List[ProjectEntry], version: Hashable):
+        self.version = version
+        self.entries = entries
+        self.built_at = time.time()
+
+        # Projects with a parseable deadline, closest deadline first
+        self.by_deadline = sorted((e for e in entries if e.deadline), key=lambda e: e.deadline)
+        self._deadlines = [e.deadline for e in self.by_deadline]
+
+        self.by_city: Dict[str, List[ProjectEntry]] = {}
+        for entry in self.by_deadline:
+            if entry.city:
+                self.by_city.setdefault(entry.city.lower(), []).append(entry)
+        self._city_deadlines = {city: [e.deadline for e in entries] for city, entries in self.by_city.items()}
+
+        self.cities = sorted({e.city for e in entries if len(e.city) > 2 and is_city_name(e.city)})
+
+        # city (lowercase) -> {metadata field: raw values}, for exact-match Chroma filters
+        self.city_values: Dict[str, Dict[str, Set[str]]] = {}
+        for entry in entries:
+            if is_city_name(entry.city) and entry.location_field:
+                fields = self.city_values.setdefault(entry.city.lower(), {})
+                fields.setdefault(entry.location_field, set()).add(entry.location)
+
+    @classmethod
+    def from_collection_results(cls, results: Dict[str, Any], version: Hashable) -> "ProjectIndex":
+        """Build the index from a Chroma collection.get() result"""
+        documents = results.get('documents') or []
+        metadatas = results.get('metadatas') or []
+
+        entries = []
+        for i, doc_content in enumerate(documents):
+            metadata = (metadatas[i] if i < len(metadatas) else None) or {}
+            location_field, location = get_location_field(metadata)
+            entries.append(ProjectEntry(
+                id=metadata.get("uuid", "") or f"project-{i}",  # Fallback ID if uuid is missing
+                uuid=metadata.get("uuid"),
+                title=metadata.get("Projekto_pavadinimas", "") or metadata.get("pavadinimas", ""),
+                location=location,
+                location_field=location_field,
+                city=normalize_city(location),
+                deadline_value=get_deadline_value(metadata, PROJECT_DEADLINE_FIELDS),
+                deadline=parse_deadline(get_deadline_value(metadata, PROJECT_DEADLINE_FIELDS)),
+                summary=doc_content[:200] + "..." if len(doc_content) > 200 else doc_content,
+            ))
+        return cls(entries, version)
+
+    def recent_projects(self, today: datetime.date, city_filters: Optional[List[str]] = None, limit: int = 20) -> List[ProjectEntry]:
+        """
+        Projects whose deadline has not passed, closest deadline first.
+        city_filters are lowercase substrings matched against the project's city.
+        """
+        if not city_filters:
+            start = bisect.bisect_left(self._deadlines, today)
+            return self.by_deadline[start:start + limit]
+
+        matching = []
+        for city, entries in self.by_city.items():
+            if any(city_filter in city for city_filter in city_filters):
+                start = bisect.bisect_left(self._city_deadlines[city], today)
+                matching.append(entries[start:])
+        merged = heapq.merge(*matching, key=lambda e: e.deadline)
+        return [entry for _, entry in zip(range(limit), merged)]
+
+    def expired_count(self, today: datetime.date) -> int:
+        """Number of projects whose deadline is before today"""
+        return bisect.bisect_left(self._deadlines, today)
+
+
+_index: Optional[ProjectIndex] = None
+_lock = threading.Lock()
+
+
+def refresh_project_index(force: bool = False) -> Optional[ProjectIndex]:
+    """Rebuild the project index if the summary collection changed (blocking)"""
+    global _index
+    with _lock:
+        version = get_store_version()
+        if _index is not None and _index.version == version and not force:
+            return _index
+
+        summaries_vectorstore = get_vectorstore(store_type="summary")
+        if summaries_vectorstore is None:
+            logger.error("Vectorstore not initialized properly, cannot build project index")
+            return None
+
+        started = time.perf_counter()
+        results = summaries_vectorstore._collection.get(include=["documents", "metadatas"])
+        _index = ProjectIndex.from_collection_results(results, version)
+        logger.info(
+            f"Built project index: {len(_index.entries)} projects, {len(_index.by_deadline)} with deadlines, "
+            f"{len(_index.cities)} cities in {(time.perf_counter() - started) * 1000:.1f} ms"
+        )
+        return _index
+
+
+def get_project_index() -> Optional[ProjectIndex]:
+    """Current project index; only touches the store when it changed since the last build (blocking)"""
+    index = _index
+    if index is not None and index.version == get_store_version():
+        return index
+    return refresh_project_index()
+
+
+async def aget_project_index() -> Optional[ProjectIndex]:
+    """Async variant of get_project_index: answered inline unless a rebuild is needed"""
+    index = _index
+    if index is not None and index.version == get_store_version():
+        return index
+    return await run_blocking(refresh_project_index)
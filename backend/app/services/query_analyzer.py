@@ -0,0 +1,128 @@
+"""
+Query analysis: recognise the cities a question is about, so retrieval can filter on them.
+
+Known cities come from the project index (the same metadata fields /api/cities
+reads). Question and city names go through the BM25 tokenizer, which folds
+diacritics and strips Lithuanian endings, so "Vilniuje", "Vilniaus" and "Vilnius"
+all match. A city name directly followed by a street marker ("Vilniaus g.",
+"Šilutės pl.") names a street, not a city, and is ignored. A city whose name is
+also a common word ("Šventoji") only counts when written capitalised mid-sentence.
+Placeholder locations such as "Nėra" are never in the index's city list.
+"""
+import os
+import re
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from app.services.project_index import ProjectIndex, get_location, normalize_city
+from app.vectorstore.bm25 import fold, stem, tokenize
+import logging
+
+logger = logging.getLogger(__name__)
+
+QUERY_CITY_FILTER = os.environ.get("QUERY_CITY_FILTER", "true").lower() in ("1", "true", "yes")
+
+STREET_MARKERS = {
+    stem(fold(word)) for word in (
+        "g", "gatvė", "pl", "plentas", "pr", "prospektas", "al", "alėja", "skg", "skersgatvis",
+        "kel", "kelias", "a", "aikštė", "tak", "takas", "krant", "krantinė",
+    )
+}
+
+# Everyday words that are also place names; such a city must be mentioned capitalised
+COMMON_WORDS = {
+    stem(fold(word)) for word in (
+        "nėra", "yra", "bus", "buvo", "gali", "reikia", "kaip", "kiek", "tai", "visi", "visos", "kiti", "kitos",
+        "naujas", "nauja", "naujoji", "šventoji", "šventas", "didelis", "mažas", "geras", "pigus", "brangus",
+        "darbai", "darbas", "projektas", "projektai", "namas", "namai", "stogas", "remontas", "kelias", "ežeras",
+        "miškas", "upė", "sodas", "sodai", "laukas", "kalnas", "pušis", "beržas", "ąžuolas",
+    )
+}
+WORD_PATTERN = re.compile(r"\w+")
+SENTENCE_START = re.compile(r"(?:^|[.!?]\s*)(\w+)")
+
+
+def capitalised_mentions(question: str) -> set:
+    """Stems of words written capitalised anywhere but at the start of a sentence"""
+    sentence_starts = {match.start(1) for match in SENTENCE_START.finditer(question)}
+    return {
+        stem(fold(match.group())) for match in WORD_PATTERN.finditer(question)
+        if match.group()[:1].isupper() and match.start() not in sentence_starts
+    }
+
+
+@dataclass
+class QueryAnalysis:
+    cities: List[str] = field(default_factory=list)
+
+    def where(self, index: ProjectIndex) -> Optional[Dict[str, Any]]:
+        """Chroma filter matching the exact stored location values of the recognised cities"""
+        clauses = []
+        values_by_field: Dict[str, set] = {}
+        for city in self.cities:
+            for location_field, values in index.city_values.get(city.lower(), {}).items():
+                values_by_field.setdefault(location_field, set()).update(values)
+        for location_field, values in sorted(values_by_field.items()):
+            clauses.append({location_field: {"$in": sorted(values)}})
+        if not clauses:
+            return None
+        return clauses[0] if len(clauses) == 1 else {"$or": clauses}
+
+    def matches(self) -> Callable[[Dict[str, Any]], bool]:
+        """Metadata predicate equivalent to where(), for in-memory indexes such as BM25"""
+        cities = {city.lower() for city in self.cities}
+        return lambda metadata: normalize_city(get_location(metadata)).lower() in cities
+
+
+class QueryAnalyzer:
+    def __init__(self, index: ProjectIndex):
+        self.index = index
+        # first token -> [(all tokens, city)], longest names first so "Naujoji Akmenė" wins over "Akmenė"
+        self._patterns: Dict[str, List[Tuple[Tuple[str, ...], str]]] = {}
+        # Cities made only of common words
+        self._ambiguous: Set[str] = set()
+        for city in index.cities:
+            tokens = tuple(tokenize(city))
+            if tokens:
+                self._patterns.setdefault(tokens[0], []).append((tokens, city))
+                if all(token in COMMON_WORDS for token in tokens):
+                    self._ambiguous.add(city)
+        for patterns in self._patterns.values():
+            patterns.sort(key=lambda pattern: len(pattern[0]), reverse=True)
+
+    def analyze(self, question: str) -> QueryAnalysis:
+        tokens = tokenize(question)
+        capitalised = capitalised_mentions(question) if self._ambiguous else set()
+        cities: List[str] = []
+        i = 0
+        while i < len(tokens):
+            matched = None
+            for pattern, city in self._patterns.get(tokens[i], []):
+                end = i + len(pattern)
+                if tuple(tokens[i:end]) == pattern:
+                    matched = (end, city)
+                    break
+            if matched is None:
+                i += 1
+                continue
+            end, city = matched
+            if end < len(tokens) and tokens[end] in STREET_MARKERS:
+                logger.info(f"'{city}' in the question names a street, not a city filter")
+            elif city in self._ambiguous and not set(tokens[i:end]) <= capitalised:
+                logger.info(f"'{city}' in the question is used as a common word, not a city filter")
+            elif city not in cities:
+                cities.append(city)
+            i = end
+        return QueryAnalysis(cities=cities)
+
+
+_analyzer: Optional[QueryAnalyzer] = None
+
+
+def get_query_analyzer(index: ProjectIndex) -> QueryAnalyzer:
+    """Analyzer for this project index; rebuilt when the index is"""
+    global _analyzer
+    analyzer = _analyzer
+    if analyzer is None or analyzer.index is not index:
+        analyzer = _analyzer = QueryAnalyzer(index)
+    return analyzer
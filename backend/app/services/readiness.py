@@ -0,0 +1,109 @@
+import time
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+from fastapi import HTTPException
+from app.services.executor import run_blocking
+import logging
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+LOADING = "loading"
+READY = "ready"
+FAILED = "failed"
+
+
+@dataclass
+class Component:
+    name: str
+    # Required components gate /health/ready and the API routes; optional ones are warm-ups
+    required: bool = True
+    status: str = PENDING
+    started_at: Optional[float] = None
+    duration_s: Optional[float] = None
+    error: Optional[str] = None
+    details: Dict[str, Any] = field(default_factory=dict)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "status": self.status,
+            "required": self.required,
+            "duration_s": self.duration_s,
+            "error": self.error,
+            **({"details": self.details} if self.details else {}),
+        }
+
+
+class Readiness:
+    """
+    Load state of the components the app loads in the background after startup.
+    Liveness only needs the process; readiness needs every required component.
+    """
+
+    def __init__(self):
+        self.components: Dict[str, Component] = {}
+        self.process_started = time.time()
+        self._lock = threading.Lock()
+
+    def register(self, name: str, required: bool = True):
+        with self._lock:
+            self.components.setdefault(name, Component(name=name, required=required))
+
+    async def load(self, name: str, func: Callable[[], Any]) -> bool:
+        """Run a blocking loader on the shared executor, recording state and timing"""
+        component = self.components[name]
+        component.status = LOADING
+        component.started_at = time.time()
+        started = time.perf_counter()
+        try:
+            details = await run_blocking(func)
+        except Exception as e:
+            component.status = FAILED
+            component.error = str(e)
+            logger.error(f"Loading {name} failed: {e}", exc_info=True)
+            return False
+        finally:
+            component.duration_s = round(time.perf_counter() - started, 3)
+
+        if isinstance(details, dict):
+            component.details = details
+        component.status = READY
+        logger.info(f"{name} ready in {component.duration_s}s")
+        return True
+
+    def skip(self, name: str, reason: str):
+        """Mark a component failed without running it (a dependency did not load)"""
+        component = self.components[name]
+        component.status = FAILED
+        component.error = reason
+
+    def is_ready(self, name: Optional[str] = None) -> bool:
+        if name is not None:
+            return self.components[name].status == READY
+        return all(c.status == READY for c in self.components.values() if c.required)
+
+    def not_ready(self) -> List[str]:
+        return [c.name for c in self.components.values() if c.required and c.status != READY]
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "ready": self.is_ready(),
+            "uptime_s": round(time.time() - self.process_started, 3),
+            "components": {name: component.to_dict() for name, component in self.components.items()},
+        }
+
+    def require(self, *names: str) -> Callable[[], None]:
+        """FastAPI dependency answering 503 until the named components (default: all required) are ready"""
+        def dependency():
+            waiting = [name for name in names if not self.is_ready(name)] if names else self.not_ready()
+            if waiting:
+                raise HTTPException(
+                    status_code=503,
+                    detail=f"Service is starting, waiting for: {', '.join(waiting)}",
+                    headers={"Retry-After": "5"},
+                )
+        return dependency
+
+
+readiness = Readiness()
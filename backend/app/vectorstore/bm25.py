@@ -0,0 +1,206 @@
+"""
+Lexical BM25 index over the summary collection, fused with dense retrieval.
+
+Questions name concrete cities, streets and work types ("Šilutės pl.", "Klaipėdoje",
+"stogo remontas") that the e5 embedding often ranks below looser matches. Text is
+folded to ASCII, lowercased and stripped of common Lithuanian inflection endings,
+so "Klaipėdoje" matches "Klaipėda" and "stogų" matches "stogo". The index is built
+from the collection's documents and metadata values and rebuilt whenever the
+store version changes; results are merged with the vector results by reciprocal
+rank fusion (reciprocal_rank_fusion).
+"""
+import math
+import re
+import threading
+import time
+import unicodedata
+from collections import Counter
+from typing import Any, Callable, Dict, Hashable, List, Optional, Sequence, Tuple
+
+from langchain_core.documents import Document
+
+from app.services.executor import run_blocking
+from app.vectorstore.deadlines import DEADLINE_EPOCH_FIELD, DEADLINE_STATUS_FIELD
+from app.vectorstore.store import get_single_store_version, get_vectorstore
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Metadata that is not searchable text
+SKIPPED_FIELDS = {"uuid", "content_hash", DEADLINE_EPOCH_FIELD, DEADLINE_STATUS_FIELD}
+
+# Folded (ASCII) Lithuanian noun/adjective endings, longest first
+ENDINGS = sorted({
+    "iuose", "iams", "iems", "ioms", "uose", "iuje", "ioje", "iose", "iaus", "ais", "ams", "oms", "ems", "ose",
+    "oje", "eje", "yje", "uje", "aus", "ius", "iui", "iai", "ios", "iu", "io", "ia", "ie", "as", "is", "ys", "us",
+    "os", "es", "ai", "ei", "ui", "a", "e", "i", "o", "u", "y", "s",
+}, key=len, reverse=True)
+MIN_STEM_LENGTH = 3
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+# Question words and fillers that would otherwise match every document title
+STOPWORDS_RAW = (
+    "ir", "yra", "kokie", "kokia", "koks", "kur", "kas", "ar", "dėl", "su", "apie", "iš", "į", "iki", "kad",
+    "kada", "kuris", "kurie", "man", "mane", "noriu", "rask", "ieškau", "the", "and", "in", "of", "what", "are",
+)
+
+# Standard RRF constant; keeps one list's top ranks from dominating the fusion
+RRF_K = 60
+
+
+def fold(text: str) -> str:
+    """Lowercase and strip diacritics: "Šilutės" -> "silutes" """
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def stem(token: str) -> str:
+    """Strip one inflection ending, keeping at least MIN_STEM_LENGTH characters"""
+    if token.isdigit():
+        return token
+    for ending in ENDINGS:
+        if token.endswith(ending) and len(token) - len(ending) >= MIN_STEM_LENGTH:
+            return token[:-len(ending)]
+    return token
+
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in map(stem, TOKEN_PATTERN.findall(fold(text))) if token not in STOPWORDS]
+
+
+STOPWORDS = {stem(fold(word)) for word in STOPWORDS_RAW}
+
+
+def searchable_text(page_content: str, metadata: Dict[str, Any]) -> str:
+    """Page content plus every text metadata value (city, street, work type, ...)"""
+    values = [str(value) for key, value in metadata.items() if key not in SKIPPED_FIELDS and isinstance(value, str)]
+    return " ".join([page_content or ""] + values)
+
+
+class BM25Index:
+    """Okapi BM25 over one collection snapshot, with an inverted index for sparse scoring"""
+
+    def __init__(self, documents: List[Document], version: Hashable, k1: float = 1.5, b: float = 0.75):
+        self.documents = documents
+        self.version = version
+        self.k1 = k1
+        self.b = b
+        self.built_at = time.time()
+
+        self.lengths: List[int] = []
+        self.postings: Dict[str, List[Tuple[int, int]]] = {}
+        for i, document in enumerate(documents):
+            tokens = tokenize(searchable_text(document.page_content, document.metadata))
+            self.lengths.append(len(tokens))
+            for term, count in Counter(tokens).items():
+                self.postings.setdefault(term, []).append((i, count))
+        self.average_length = sum(self.lengths) / len(self.lengths) if self.lengths else 0.0
+
+        total = len(documents)
+        self.idf = {
+            term: math.log(1 + (total - len(postings) + 0.5) / (len(postings) + 0.5))
+            for term, postings in self.postings.items()
+        }
+        # Deadline per row for in-memory expiry filtering (None: keep)
+        self.epoch_days = [_epoch_day(document.metadata) for document in documents]
+
+    @classmethod
+    def from_collection_results(cls, results: Dict[str, Any], version: Hashable) -> "BM25Index":
+        documents = [
+            Document(page_content=content or "", metadata=metadata or {})
+            for content, metadata in zip(results.get("documents") or [], results.get("metadatas") or [])
+        ]
+        return cls(documents, version)
+
+    def search(self, query: str, k: int, min_epoch_day: Optional[int] = None,
+               predicate: Optional[Callable[[Dict[str, Any]], bool]] = None) -> List[Tuple[Document, float]]:
+        """
+        Top k (document, score) for the query. min_epoch_day drops projects whose deadline
+        passed; predicate, if given, must accept a document's metadata for it to be returned.
+        """
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(query)):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for i, count in self.postings[term]:
+                norm = self.k1 * (1 - self.b + self.b * self.lengths[i] / self.average_length)
+                scores[i] = scores.get(i, 0.0) + idf * count * (self.k1 + 1) / (count + norm)
+
+        if min_epoch_day is not None:
+            scores = {
+                i: score for i, score in scores.items()
+                if self.epoch_days[i] is None or self.epoch_days[i] >= min_epoch_day
+            }
+        if predicate is not None:
+            scores = {i: score for i, score in scores.items() if predicate(self.documents[i].metadata)}
+        top = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+        return [(self.documents[i], score) for i, score in top]
+
+    def stats(self) -> Dict[str, Any]:
+        return {"documents": len(self.documents), "terms": len(self.postings), "built_at": self.built_at}
+
+
+def _epoch_day(metadata: Dict[str, Any]) -> Optional[int]:
+    value = metadata.get(DEADLINE_EPOCH_FIELD)
+    try:
+        return int(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def document_key(document: Document) -> str:
+    return document.metadata.get("uuid") or document.page_content
+
+
+def reciprocal_rank_fusion(result_lists: Sequence[List[Document]], k: int, rrf_k: int = RRF_K) -> List[Document]:
+    """Merge ranked lists by sum of 1 / (rrf_k + rank); documents are matched by uuid"""
+    scores: Dict[str, float] = {}
+    documents: Dict[str, Document] = {}
+    for results in result_lists:
+        for rank, document in enumerate(results, start=1):
+            key = document_key(document)
+            scores[key] = scores.get(key, 0.0) + 1.0 / (rrf_k + rank)
+            documents.setdefault(key, document)
+    ranked = sorted(scores, key=scores.get, reverse=True)
+    return [documents[key] for key in ranked[:k]]
+
+
+_index: Optional[BM25Index] = None
+_lock = threading.Lock()
+
+
+def refresh_bm25_index(force: bool = False) -> Optional[BM25Index]:
+    """Rebuild the BM25 index if the summary collection changed (blocking)"""
+    global _index
+    with _lock:
+        summaries_vectorstore = get_vectorstore(store_type="summary")
+        if summaries_vectorstore is None:
+            logger.error("Vectorstore not initialized properly, cannot build BM25 index")
+            return None
+
+        version = get_single_store_version(summaries_vectorstore)
+        if _index is not None and _index.version == version and not force:
+            return _index
+
+        started = time.perf_counter()
+        results = summaries_vectorstore._collection.get(include=["documents", "metadatas"])
+        _index = BM25Index.from_collection_results(results, version)
+        logger.info(
+            f"Built BM25 index: {len(_index.documents)} documents, {len(_index.postings)} terms "
+            f"in {(time.perf_counter() - started) * 1000:.1f} ms"
+        )
+        return _index
+
+
+async def aget_bm25_index(summaries_vectorstore) -> Optional[BM25Index]:
+    """Current BM25 index, rebuilt on the executor only when the store changed"""
+    index = _index
+    if index is not None and index.version == get_single_store_version(summaries_vectorstore):
+        return index
+    return await run_blocking(refresh_bm25_index)
+
+
+def bm25_index_stats() -> Optional[Dict[str, Any]]:
+    return _index.stats() if _index is not None else None
@@ -0,0 +1,122 @@
+import datetime
+from typing import Any, Dict, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Metadata fields that hold the offer/project submission deadline, in lookup order
+DEADLINE_FIELDS = ('Pasiulyma_pateikti_iki', 'Pateikti_projekta_iki', 'pateikti_iki')
+
+DATE_FORMATS = ('%Y-%m-%d', '%d.%m.%Y', '%Y/%m/%d', '%d-%m-%Y')
+
+# Canonical numeric deadline written into collection metadata by migrate_deadlines / ingestion,
+# so expiry can be filtered inside Chroma with deadline_where()
+DEADLINE_EPOCH_FIELD = 'deadline_epoch_day'
+DEADLINE_STATUS_FIELD = 'deadline_parse_status'
+STATUS_OK = 'ok'
+STATUS_MISSING = 'missing'
+STATUS_UNPARSED = 'unparsed'
+
+EPOCH = datetime.date(1970, 1, 1)
+
+
+def to_epoch_day(date: datetime.date) -> int:
+    """Days since 1970-01-01"""
+    return (date - EPOCH).days
+
+
+def from_epoch_day(epoch_day: int) -> datetime.date:
+    return EPOCH + datetime.timedelta(days=int(epoch_day))
+
+
+def today_epoch_day() -> int:
+    return to_epoch_day(datetime.date.today())
+
+
+# Documents without a usable deadline are never treated as expired, so they get the
+# largest representable day and always pass a "$gte today" filter
+NO_DEADLINE_EPOCH_DAY = to_epoch_day(datetime.date.max)
+
+
+def parse_deadline(value: Any) -> Optional[datetime.date]:
+    """
+    Parse a deadline value such as "2025-06-02, 12 val." into a date.
+    Returns None when the value is empty or in an unknown format.
+    """
+    if not value:
+        return None
+    if isinstance(value, datetime.datetime):
+        return value.date()
+    if isinstance(value, datetime.date):
+        return value
+    if not isinstance(value, str):
+        logger.warning(f"Unknown date format: {type(value)}")
+        return None
+
+    if "," in value:
+        date_part = value.split(",")[0].strip()
+    else:
+        date_part = value.split(" ")[0].strip()
+
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.datetime.strptime(date_part, fmt).date()
+        except ValueError:
+            continue
+
+    logger.warning(f"Could not parse date: {value}")
+    return None
+
+
+def get_deadline_value(metadata: Dict[str, Any], fields: Tuple[str, ...] = DEADLINE_FIELDS) -> Any:
+    """Raw deadline value from the first of fields that is set, or None"""
+    for field in fields:
+        value = metadata.get(field)
+        if value:
+            return value
+    return None
+
+
+def get_deadline(metadata: Dict[str, Any]) -> Optional[datetime.date]:
+    """Deadline of a document from its metadata, or None if missing or unparseable"""
+    status = metadata.get(DEADLINE_STATUS_FIELD)
+    if status is not None:
+        # Migrated metadata: no string parsing needed
+        if status == STATUS_OK:
+            return from_epoch_day(metadata[DEADLINE_EPOCH_FIELD])
+        return None
+    return parse_deadline(get_deadline_value(metadata))
+
+
+def deadline_metadata(metadata: Dict[str, Any]) -> Dict[str, Any]:
+    """Numeric deadline fields for a document, computed from its raw deadline fields"""
+    value = get_deadline_value(metadata)
+    if not value:
+        return {DEADLINE_EPOCH_FIELD: NO_DEADLINE_EPOCH_DAY, DEADLINE_STATUS_FIELD: STATUS_MISSING}
+    deadline = parse_deadline(value)
+    if deadline is None:
+        return {DEADLINE_EPOCH_FIELD: NO_DEADLINE_EPOCH_DAY, DEADLINE_STATUS_FIELD: STATUS_UNPARSED}
+    return {DEADLINE_EPOCH_FIELD: to_epoch_day(deadline), DEADLINE_STATUS_FIELD: STATUS_OK}
+
+
+def is_expired(metadata: Dict[str, Any], today: Optional[datetime.date] = None) -> bool:
+    """True if the document's deadline is before today; documents without a deadline never expire"""
+    deadline = get_deadline(metadata)
+    if deadline is None:
+        return False
+    return deadline < (today or datetime.date.today())
+
+
+def has_deadline_metadata(collection) -> bool:
+    """True if every document in a Chroma collection has the numeric deadline field"""
+    total = collection.count()
+    if total == 0:
+        return True
+    migrated = collection.get(where={DEADLINE_EPOCH_FIELD: {"$gte": 0}}, include=[])
+    return len(migrated["ids"]) == total
+
+
+def deadline_where(today: Optional[datetime.date] = None) -> Dict[str, Any]:
+    """Chroma where filter that keeps only documents whose deadline has not passed"""
+    epoch_day = to_epoch_day(today) if today else today_epoch_day()
+    return {DEADLINE_EPOCH_FIELD: {"$gte": epoch_day}}
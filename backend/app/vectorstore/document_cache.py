@@ -0,0 +1,141 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Hashable, List, Optional
+from langchain_core.documents import Document
+from app.services.metrics import time_vectorstore
+from app.vectorstore.row_index import RowIndex, current_row_index
+import logging
+
+logger = logging.getLogger(__name__)
+
+FULL_DOCUMENT_CACHE_SIZE = int(os.environ.get("FULL_DOCUMENT_CACHE_SIZE", "256"))
+
+
+class FullDocumentCache:
+    """
+    Bounded LRU cache of full documents keyed by UUID.
+
+    A UUID maps to every row stored under it in the full store. All entries are
+    dropped when the store version changes, so re-ingested documents are never stale.
+    """
+
+    def __init__(self, max_size: int = FULL_DOCUMENT_CACHE_SIZE):
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, List[Document]]" = OrderedDict()
+        self._store_version: Optional[Hashable] = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _check_store_version(self, store_version: Hashable):
+        if self._store_version != store_version:
+            if self._entries:
+                logger.info(f"Full store changed, invalidating {len(self._entries)} cached documents")
+                self.invalidations += len(self._entries)
+                self._entries.clear()
+            self._store_version = store_version
+
+    def get_many(self, uuids: List[str], store_version: Hashable) -> Dict[str, List[Document]]:
+        """Cached documents for the given UUIDs; UUIDs not in the cache are left out"""
+        found = {}
+        with self._lock:
+            self._check_store_version(store_version)
+            for uuid in uuids:
+                documents = self._entries.get(uuid)
+                if documents is None:
+                    self.misses += 1
+                    continue
+                self._entries.move_to_end(uuid)
+                self.hits += 1
+                found[uuid] = documents
+        return found
+
+    def put_many(self, documents_by_uuid: Dict[str, List[Document]], store_version: Hashable):
+        with self._lock:
+            self._check_store_version(store_version)
+            for uuid, documents in documents_by_uuid.items():
+                self._entries[uuid] = documents
+                self._entries.move_to_end(uuid)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """Cache statistics for health and monitoring endpoints"""
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+full_document_cache = FullDocumentCache()
+
+
+def fetch_documents_by_uuid(collection, uuids: List[str], row_index: Optional[RowIndex] = None) -> Dict[str, List[Document]]:
+    """
+    Fetch the rows for all UUIDs in a single query (blocking): by Chroma row id when a
+    row index is given, otherwise with a metadata $in filter.
+    Returns {uuid: [Document, ...]}; UUIDs with no rows are absent.
+    """
+    if not uuids:
+        return {}
+    if row_index is not None:
+        row_ids = row_index.row_ids(uuids)
+        if not row_ids:
+            return {}
+        with time_vectorstore("full", "get_by_id"):
+            results = collection.get(ids=row_ids, include=["documents", "metadatas"])
+    else:
+        with time_vectorstore("full", "get"):
+            results = collection.get(where={"uuid": {"$in": list(uuids)}}, include=["documents", "metadatas"])
+
+    documents_by_uuid: Dict[str, List[Document]] = {}
+    for content, metadata in zip(results.get("documents") or [], results.get("metadatas") or []):
+        metadata = metadata or {}
+        documents_by_uuid.setdefault(metadata.get("uuid") or metadata.get("id"), []).append(
+            Document(page_content=content, metadata=metadata)
+        )
+    return documents_by_uuid
+
+
+def get_full_documents_by_uuid(full_vectorstore, uuids: List[str], store_version: Hashable) -> Dict[str, List[Document]]:
+    """{uuid: rows} for the UUIDs, read through the cache (blocking); missing UUIDs are logged and left out"""
+    ordered = list(dict.fromkeys(uuid for uuid in uuids if uuid))
+
+    found = full_document_cache.get_many(ordered, store_version)
+    missing = [uuid for uuid in ordered if uuid not in found]
+    if missing:
+        fetched = fetch_documents_by_uuid(full_vectorstore._collection, missing, current_row_index(store_version))
+        full_document_cache.put_many(fetched, store_version)
+        found.update(fetched)
+
+    not_found = [uuid for uuid in ordered if uuid not in found]
+    if not_found:
+        logger.warning(f"No full document found for {len(not_found)} UUIDs: {not_found}")
+    logger.info(
+        f"Resolved {len(ordered) - len(not_found)}/{len(ordered)} UUIDs "
+        f"({len(ordered) - len(missing)} from cache, {len(missing)} in one query)"
+    )
+
+    return found
+
+
+def get_full_documents(full_vectorstore, uuids: List[str], store_version: Hashable) -> List[Document]:
+    """
+    Full documents for the UUIDs in the given (relevance) order, read through the cache (blocking).
+    Duplicate UUIDs are returned once; missing UUIDs are logged and skipped.
+    """
+    found = get_full_documents_by_uuid(full_vectorstore, uuids, store_version)
+    return [document for uuid in dict.fromkeys(uuids) for document in found.get(uuid, [])]
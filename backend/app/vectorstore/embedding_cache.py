@@ -0,0 +1,148 @@
+import os
+import pickle
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, List, Optional
+from langchain_core.embeddings import Embeddings
+from app.services.metrics import observe_embedding
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_query(text: str) -> str:
+    """Cache key for a query: Unicode NFC with whitespace collapsed"""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+class CachedQueryEmbeddings(Embeddings):
+    """
+    Embeddings wrapper with a bounded LRU cache for query vectors.
+
+    Only embed_query is cached - repeated questions skip the model entirely.
+    Document embedding is passed straight through. The cache can be saved to
+    and restored from a pickle file so it survives restarts; the file records
+    model_id (backend and model) and is ignored when loaded for another embedder.
+    """
+
+    def __init__(self, embeddings: Embeddings, max_size: int = 2048, persist_path: Optional[str] = None,
+                 model_id: str = ""):
+        self.embeddings = embeddings
+        self.max_size = max_size
+        self.persist_path = persist_path
+        self.model_id = model_id
+        self._cache: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        if persist_path:
+            self.load()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        started = time.perf_counter()
+        vectors = self.embeddings.embed_documents(texts)
+        observe_embedding("documents", len(texts), time.perf_counter() - started)
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        key = normalize_query(text)
+        with self._lock:
+            vector = self._cache.get(key)
+            if vector is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return list(vector)
+            self.misses += 1
+
+        # Compute outside the lock so concurrent misses do not serialize on the model
+        started = time.perf_counter()
+        vector = tuple(self.embeddings.embed_query(text))
+        observe_embedding("query", 1, time.perf_counter() - started)
+        with self._lock:
+            self._cache[key] = vector
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_size:
+                self._cache.popitem(last=False)
+        return list(vector)
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed several queries, computing all cache misses in one model call.
+        Relies on the wrapped model embedding a query the same way as a document,
+        which holds for the sentence-transformers and ONNX e5 backends.
+        """
+        keys = [normalize_query(text) for text in texts]
+        vectors: Dict[str, tuple] = {}
+        with self._lock:
+            for key in keys:
+                vector = self._cache.get(key)
+                if vector is not None:
+                    self._cache.move_to_end(key)
+                    self.hits += 1
+                    vectors[key] = vector
+        missing = {key: text for key, text in zip(keys, texts) if key not in vectors}
+
+        if missing:
+            started = time.perf_counter()
+            computed = self.embeddings.embed_documents(list(missing.values()))
+            observe_embedding("query", len(missing), time.perf_counter() - started)
+            with self._lock:
+                self.misses += len(missing)
+                for key, vector in zip(missing, computed):
+                    vectors[key] = self._cache[key] = tuple(vector)
+                    self._cache.move_to_end(key)
+                while len(self._cache) > self.max_size:
+                    self._cache.popitem(last=False)
+        return [list(vectors[key]) for key in keys]
+
+    def stats(self) -> Dict[str, int]:
+        """Cache statistics for health and monitoring endpoints"""
+        with self._lock:
+            return {
+                "model_id": self.model_id,
+                "size": len(self._cache),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+    def load(self):
+        """Restore cached vectors from persist_path, if the file exists and was written by the same model"""
+        if not self.persist_path or not os.path.exists(self.persist_path):
+            return
+        try:
+            with open(self.persist_path, "rb") as f:
+                saved = pickle.load(f)
+            # Files from before the header was added hold a bare list of entries
+            saved_model_id = saved.get("model_id") if isinstance(saved, dict) else None
+            if saved_model_id != self.model_id:
+                logger.warning(
+                    f"Ignoring query embedding cache {self.persist_path}: written by {saved_model_id!r}, "
+                    f"current embedder is {self.model_id!r}"
+                )
+                return
+            entries = saved["entries"]
+            with self._lock:
+                for key, vector in entries[-self.max_size:]:
+                    self._cache[key] = tuple(vector)
+            logger.info(f"Loaded {len(self._cache)} cached query embeddings from {self.persist_path}")
+        except Exception as e:
+            logger.error(f"Error loading query embedding cache from {self.persist_path}: {e}")
+
+    def persist(self):
+        """Write cached vectors to persist_path (atomically, via a temporary file)"""
+        if not self.persist_path:
+            return
+        with self._lock:
+            entries = list(self._cache.items())
+        tmp_path = f"{self.persist_path}.tmp"
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.persist_path)), exist_ok=True)
+            with open(tmp_path, "wb") as f:
+                pickle.dump({"model_id": self.model_id, "entries": entries}, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self.persist_path)
+            logger.info(f"Saved {len(entries)} cached query embeddings to {self.persist_path}")
+        except Exception as e:
+            logger.error(f"Error saving query embedding cache to {self.persist_path}: {e}")
@@ -0,0 +1,350 @@
+"""
+Incremental ingestion of tender records into the summary and full-article stores.
+
+Input is JSON Lines, one tender per line:
+    {"uuid": "...", "content": "<full article text>", "metadata": {"Miestas": ..., ...},
+     "summary": "<optional summary text, defaults to metadata Dokumento_pavadinimas>"}
+
+Records are read as a stream and embedded in batches by worker processes running
+the same e5-large-instruct embedder the API uses. A record is only re-embedded when
+its content hash differs from the one stored with its UUID, so re-running over the
+same file is cheap. For every batch the full article is written before its summary,
+so retrieval never finds a summary whose full document is missing. Progress is
+checkpointed after each batch; an interrupted run resumes where it stopped.
+
+Usage (from the directory that contains docs/ and docs2/):
+    python -m app.vectorstore.ingest tenders.jsonl [--batch-size 256] [--workers 2] [--restart]
+"""
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import time
+from collections import Counter, deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import chromadb
+
+from app.vectorstore.deadlines import deadline_metadata
+from app.vectorstore.migrate_deadlines import COLLECTION_NAME, STORE_PATHS
+from app.vectorstore.store import EMBEDDING_MODEL_NAME
+import logging
+
+logger = logging.getLogger(__name__)
+
+CONTENT_HASH_FIELD = "content_hash"
+SUMMARY_TITLE_FIELD = "Dokumento_pavadinimas"
+SCAN_STATS = ("scanned", "invalid", "unchanged")
+
+
+@dataclass
+class PreparedRecord:
+    uuid: str
+    summary: str
+    content: str
+    metadata: Dict
+
+
+def read_records(path: str, start_offset: int = 0) -> Iterator[Tuple[int, Dict]]:
+    """Yield (offset after the line, record) for each JSON line, starting at a byte offset"""
+    with open(path, "rb") as f:
+        f.seek(start_offset)
+        line_number = 0
+        for line in iter(f.readline, b""):
+            line_number += 1
+            offset = f.tell()
+            if not line.strip():
+                continue
+            try:
+                yield offset, json.loads(line)
+            except json.JSONDecodeError as e:
+                logger.warning(f"Skipping malformed line {line_number} after offset {start_offset}: {e}")
+                yield offset, None
+
+
+def content_hash(summary: str, content: str, metadata: Dict) -> str:
+    """Stable hash of everything that ends up in either store for a record"""
+    payload = json.dumps({"summary": summary, "content": content, "metadata": metadata},
+                         sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def prepare_record(record: Optional[Dict]) -> Optional[PreparedRecord]:
+    """Validate a raw record and build the metadata stored with it (None if unusable)"""
+    if not isinstance(record, dict):
+        return None
+    uuid = record.get("uuid")
+    content = record.get("content")
+    raw_metadata = record.get("metadata") or {}
+    if not uuid or not content or not isinstance(raw_metadata, dict):
+        return None
+
+    # Chroma only stores scalar metadata values
+    metadata = {key: value for key, value in raw_metadata.items()
+                if isinstance(value, (str, int, float, bool))}
+    summary = record.get("summary") or metadata.get(SUMMARY_TITLE_FIELD)
+    if not summary:
+        return None
+
+    metadata["uuid"] = uuid
+    metadata.update(deadline_metadata(metadata))
+    metadata[CONTENT_HASH_FIELD] = content_hash(summary, content, metadata)
+    return PreparedRecord(uuid=uuid, summary=summary, content=content, metadata=metadata)
+
+
+def existing_rows(collection, batch_size: int = 1000) -> Dict[str, Tuple[List[str], Optional[str]]]:
+    """Map each UUID in a collection to (row ids, stored content hash)"""
+    rows: Dict[str, Tuple[List[str], Optional[str]]] = {}
+    offset = 0
+    while True:
+        batch = collection.get(include=["metadatas"], limit=batch_size, offset=offset)
+        if not batch["ids"]:
+            break
+        offset += len(batch["ids"])
+        for row_id, metadata in zip(batch["ids"], batch["metadatas"]):
+            metadata = metadata or {}
+            uuid = metadata.get("uuid")
+            if not uuid:
+                continue
+            ids, _ = rows.get(uuid, ([], None))
+            rows[uuid] = (ids + [row_id], metadata.get(CONTENT_HASH_FIELD))
+    return rows
+
+
+# Embedding model of the current worker process, loaded once by _init_worker
+_embedder = None
+
+
+def _create_embedder(model_name: str):
+    from langchain_community.embeddings import HuggingFaceEmbeddings
+    return HuggingFaceEmbeddings(
+        model_name=model_name,
+        model_kwargs={'device': 'cpu', 'trust_remote_code': False},
+        encode_kwargs={'normalize_embeddings': True}
+    )
+
+
+def _init_worker(model_name: str, torch_threads: int):
+    global _embedder
+    try:
+        import torch
+        torch.set_num_threads(torch_threads)
+    except ImportError:
+        pass
+    _embedder = _create_embedder(model_name)
+
+
+def _embed(texts: List[str]) -> List[List[float]]:
+    return _embedder.embed_documents(texts)
+
+
+class Ingestor:
+    """Embeds prepared records on a worker pool and upserts them into both stores"""
+
+    def __init__(self, summary_collection, full_collection, pool: Executor, embed_batch_size: int = 32):
+        self.summary_collection = summary_collection
+        self.full_collection = full_collection
+        self.pool = pool
+        self.embed_batch_size = embed_batch_size
+        self.summary_rows = existing_rows(summary_collection)
+        self.full_rows = existing_rows(full_collection)
+        self.stats = Counter()
+
+    def is_unchanged(self, record: PreparedRecord) -> bool:
+        """Both stores already hold this UUID with the same content hash"""
+        new_hash = record.metadata[CONTENT_HASH_FIELD]
+        summary = self.summary_rows.get(record.uuid)
+        full = self.full_rows.get(record.uuid)
+        return bool(summary and full and summary[1] == new_hash and full[1] == new_hash)
+
+    def _submit(self, texts: List[str]) -> List[Future]:
+        return [self.pool.submit(_embed, texts[i:i + self.embed_batch_size])
+                for i in range(0, len(texts), self.embed_batch_size)]
+
+    def submit(self, records: List[PreparedRecord]) -> Tuple[List[Future], List[Future]]:
+        """Start embedding the summaries and full texts of a batch"""
+        return (self._submit([record.summary for record in records]),
+                self._submit([record.content for record in records]))
+
+    @staticmethod
+    def _collect(futures: List[Future]) -> List[List[float]]:
+        return [vector for future in futures for vector in future.result()]
+
+    def _upsert(self, collection, rows: Dict, records: List[PreparedRecord], texts: List[str], embeddings):
+        """Write one row per UUID, reusing its existing row id and deleting any extra rows"""
+        ids, stale_ids = [], []
+        for record in records:
+            previous_ids = rows.get(record.uuid, ([], None))[0]
+            ids.append(previous_ids[0] if previous_ids else record.uuid)
+            stale_ids.extend(previous_ids[1:])
+
+        collection.upsert(ids=ids, embeddings=embeddings, documents=texts,
+                          metadatas=[record.metadata for record in records])
+        if stale_ids:
+            collection.delete(ids=stale_ids)
+        for row_id, record in zip(ids, records):
+            rows[record.uuid] = ([row_id], record.metadata[CONTENT_HASH_FIELD])
+
+    def write(self, records: List[PreparedRecord], futures: Tuple[List[Future], List[Future]]):
+        """Wait for a batch's embeddings and write it, full articles first"""
+        summary_vectors = self._collect(futures[0])
+        full_vectors = self._collect(futures[1])
+
+        for record in records:
+            self.stats["updated" if record.uuid in self.full_rows else "added"] += 1
+        self._upsert(self.full_collection, self.full_rows, records,
+                     [record.content for record in records], full_vectors)
+        self._upsert(self.summary_collection, self.summary_rows, records,
+                     [record.summary for record in records], summary_vectors)
+
+
+def _batches(records: Iterator[Tuple[int, Dict]], batch_size: int) -> Iterator[Tuple[int, List[Dict]]]:
+    """Group (offset, record) pairs into (offset after the batch, records)"""
+    batch, offset = [], None
+    for offset, record in records:
+        batch.append(record)
+        if len(batch) >= batch_size:
+            yield offset, batch
+            batch = []
+    if batch:
+        yield offset, batch
+
+
+def load_checkpoint(checkpoint_path: str, input_path: str) -> Tuple[int, Counter]:
+    """Byte offset and stats to resume from (0 when there is no matching checkpoint)"""
+    if not os.path.exists(checkpoint_path):
+        return 0, Counter()
+    with open(checkpoint_path) as f:
+        checkpoint = json.load(f)
+    if checkpoint.get("input") != os.path.abspath(input_path):
+        logger.warning(f"Checkpoint {checkpoint_path} belongs to {checkpoint.get('input')}, ignoring it")
+        return 0, Counter()
+    return checkpoint["offset"], Counter(checkpoint.get("stats", {}))
+
+
+def save_checkpoint(checkpoint_path: str, input_path: str, offset: int, stats: Counter):
+    tmp_path = f"{checkpoint_path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"input": os.path.abspath(input_path), "offset": offset, "stats": dict(stats)}, f)
+    os.replace(tmp_path, checkpoint_path)
+
+
+def ingest(input_path: str, summary_collection, full_collection, pool: Executor, batch_size: int = 256,
+           embed_batch_size: int = 32, checkpoint_path: Optional[str] = None) -> Dict:
+    """
+    Ingest a JSONL file into both collections and return run statistics.
+    The next batch is embedded while the previous one is being written.
+    """
+    checkpoint_path = checkpoint_path or f"{input_path}.ingest-checkpoint.json"
+    start_offset, previous_stats = load_checkpoint(checkpoint_path, input_path)
+    if start_offset:
+        logger.info(f"Resuming {input_path} from byte {start_offset} ({previous_stats.get('scanned', 0)} records done)")
+
+    ingestor = Ingestor(summary_collection, full_collection, pool, embed_batch_size)
+    logger.info(f"Existing rows: {len(ingestor.summary_rows)} summaries, {len(ingestor.full_rows)} full articles")
+
+    # Scan counts run a batch ahead of writes, so each checkpoint stores the counts as of its own batch
+    scan_stats = Counter({key: value for key, value in previous_stats.items() if key in SCAN_STATS})
+    ingestor.stats.update({key: value for key, value in previous_stats.items() if key not in SCAN_STATS})
+
+    started = time.perf_counter()
+    embedded = 0
+    in_flight: deque = deque()
+
+    def write_oldest():
+        nonlocal embedded
+        offset, records, futures, batch_scan_stats = in_flight.popleft()
+        if records:
+            ingestor.write(records, futures)
+            embedded += len(records)
+        stats = batch_scan_stats + ingestor.stats
+        save_checkpoint(checkpoint_path, input_path, offset, stats)
+        elapsed = time.perf_counter() - started
+        logger.info(
+            f"Checkpoint at byte {offset}: scanned={stats['scanned']} added={stats['added']} "
+            f"updated={stats['updated']} unchanged={stats['unchanged']} invalid={stats['invalid']} "
+            f"({embedded / elapsed:.1f} embedded docs/s)"
+        )
+
+    for offset, raw_records in _batches(read_records(input_path, start_offset), batch_size):
+        # Last occurrence of a UUID in a batch wins
+        records: Dict[str, PreparedRecord] = {}
+        for raw_record in raw_records:
+            scan_stats["scanned"] += 1
+            record = prepare_record(raw_record)
+            if record is None:
+                scan_stats["invalid"] += 1
+            elif ingestor.is_unchanged(record):
+                scan_stats["unchanged"] += 1
+            else:
+                records[record.uuid] = record
+        records = list(records.values())
+
+        in_flight.append((offset, records, ingestor.submit(records), Counter(scan_stats)))
+        if len(in_flight) > 1:
+            write_oldest()
+    while in_flight:
+        write_oldest()
+
+    elapsed = time.perf_counter() - started
+    if os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+
+    stats = scan_stats + ingestor.stats
+    return {
+        **stats,
+        "elapsed_s": round(elapsed, 2),
+        "embedded_docs_per_s": round(embedded / elapsed, 2) if elapsed else 0.0,
+        "scanned_docs_per_s": round((stats["scanned"] - previous_stats.get("scanned", 0)) / elapsed, 2) if elapsed else 0.0,
+    }
+
+
+def create_pool(workers: int) -> Executor:
+    """Embedding pool: worker processes, or one in-process thread when workers is 0"""
+    if workers <= 0:
+        return ThreadPoolExecutor(max_workers=1, initializer=_init_worker,
+                                  initargs=(EMBEDDING_MODEL_NAME, os.cpu_count() or 1))
+    torch_threads = max(1, (os.cpu_count() or 1) // workers)
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(EMBEDDING_MODEL_NAME, torch_threads),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", help="JSON Lines file with one tender record per line")
+    parser.add_argument("--batch-size", type=int, default=256, help="Records per write batch and checkpoint")
+    parser.add_argument("--embed-batch-size", type=int, default=32, help="Texts per embedding task")
+    parser.add_argument("--workers", type=int, default=2,
+                        help="Embedding worker processes, each loads its own model (0 = embed in-process)")
+    parser.add_argument("--checkpoint", help="Checkpoint file (default: <input>.ingest-checkpoint.json)")
+    parser.add_argument("--restart", action="store_true", help="Ignore any checkpoint and start from the beginning")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+
+    checkpoint_path = args.checkpoint or f"{args.input}.ingest-checkpoint.json"
+    if args.restart and os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+
+    collections = {}
+    for store_type, relative_path in STORE_PATHS.items():
+        path = os.path.join(os.getcwd(), relative_path)
+        os.makedirs(path, exist_ok=True)
+        collections[store_type] = chromadb.PersistentClient(path=path).get_or_create_collection(COLLECTION_NAME)
+
+    with create_pool(args.workers) as pool:
+        stats = ingest(args.input, collections["summary"], collections["full"], pool,
+                       batch_size=args.batch_size, embed_batch_size=args.embed_batch_size,
+                       checkpoint_path=checkpoint_path)
+    logger.info(f"Ingestion finished: {stats}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Write canonical numeric deadlines into the metadata of both Chroma collections.
+
+Every document gets deadline_epoch_day (days since 1970-01-01) and
+deadline_parse_status ("ok", "missing" or "unparsed"), computed from
+Pasiulyma_pateikti_iki / Pateikti_projekta_iki / pateikti_iki. Documents
+without a usable deadline get the largest representable day so they are
+never filtered out as expired. Safe to re-run: unchanged rows are skipped.
+
+Usage (from the directory that contains docs/ and docs2/):
+    python -m app.vectorstore.migrate_deadlines [--dry-run] [--batch-size 500]
+"""
+import argparse
+import os
+from collections import Counter
+from typing import Dict
+
+import chromadb
+
+from app.vectorstore.deadlines import DEADLINE_STATUS_FIELD, deadline_metadata
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Collection name LangChain's Chroma wrapper uses when none is given
+COLLECTION_NAME = "langchain"
+
+STORE_PATHS = {
+    "summary": os.path.join("docs2", "chroma"),
+    "full": os.path.join("docs", "chroma"),
+}
+
+
+def migrate_collection(collection, batch_size: int = 500, dry_run: bool = False) -> Dict[str, int]:
+    """Add numeric deadline fields to every document in a collection"""
+    stats = Counter()
+    offset = 0
+    while True:
+        batch = collection.get(include=["metadatas"], limit=batch_size, offset=offset)
+        ids = batch["ids"]
+        if not ids:
+            break
+        offset += len(ids)
+
+        update_ids, update_metadatas = [], []
+        for doc_id, metadata in zip(ids, batch["metadatas"]):
+            metadata = metadata or {}
+            fields = deadline_metadata(metadata)
+            stats[fields[DEADLINE_STATUS_FIELD]] += 1
+            if all(metadata.get(key) == value for key, value in fields.items()):
+                stats["unchanged"] += 1
+                continue
+            update_ids.append(doc_id)
+            update_metadatas.append({**metadata, **fields})
+
+        if update_ids and not dry_run:
+            collection.update(ids=update_ids, metadatas=update_metadatas)
+        stats["updated"] += len(update_ids)
+
+    stats["total"] = offset
+    return dict(stats)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dry-run", action="store_true", help="Report what would change without writing")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--stores", nargs="+", default=list(STORE_PATHS), choices=list(STORE_PATHS))
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+
+    for store_type in args.stores:
+        path = os.path.join(os.getcwd(), STORE_PATHS[store_type])
+        if not os.path.exists(path):
+            logger.error(f"{store_type} store does not exist at {path}, skipping")
+            continue
+        client = chromadb.PersistentClient(path=path)
+        collection = client.get_collection(COLLECTION_NAME)
+        stats = migrate_collection(collection, batch_size=args.batch_size, dry_run=args.dry_run)
+        logger.info(f"{store_type} store ({path}): {stats}{' (dry run)' if args.dry_run else ''}")
+
+
+if __name__ == "__main__":
+    main()
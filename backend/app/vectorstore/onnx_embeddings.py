@@ -0,0 +1,147 @@
+"""
+ONNX Runtime backend for the e5 embedder, with optional dynamic int8 quantization.
+
+Install requirements-onnx.txt, export once, then point the API at the output directory:
+    python -m app.vectorstore.onnx_embeddings --output models/e5-large-instruct-onnx
+    EMBEDDING_BACKEND=onnx ONNX_MODEL_DIR=models/e5-large-instruct-onnx uvicorn app.main:app
+
+The directory holds the tokenizer, model.onnx (fp32) and, unless --no-quantize is
+given, model_quantized.onnx (int8 weights), which is used when present.
+"""
+import argparse
+import os
+from typing import List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+import logging
+
+logger = logging.getLogger(__name__)
+
+FP32_MODEL_FILE = "model.onnx"
+QUANTIZED_MODEL_FILE = "model_quantized.onnx"
+
+
+class OnnxEmbeddings(Embeddings):
+    """
+    Sentence embeddings from an exported transformer run on ONNX Runtime (CPU).
+    Mean pooling over the attention mask plus L2 normalization, as for e5 with
+    sentence-transformers, so vectors are interchangeable with the fp32 model's.
+    """
+
+    def __init__(self, model_dir: str, quantized: Optional[bool] = None, batch_size: int = 16,
+                 max_length: int = 512, intra_op_threads: int = 0):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        if quantized is None:
+            quantized = os.path.exists(os.path.join(model_dir, QUANTIZED_MODEL_FILE))
+        model_path = os.path.join(model_dir, QUANTIZED_MODEL_FILE if quantized else FP32_MODEL_FILE)
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if intra_op_threads:
+            options.intra_op_num_threads = intra_op_threads
+
+        self.model_path = model_path
+        self.batch_size = batch_size
+        self.max_length = max_length
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        self.session = ort.InferenceSession(model_path, sess_options=options, providers=["CPUExecutionProvider"])
+        self._input_names = {model_input.name for model_input in self.session.get_inputs()}
+        logger.info(f"Loaded ONNX embedding model from {model_path}")
+
+    def _embed(self, texts: List[str]) -> List[List[float]]:
+        vectors = []
+        for start in range(0, len(texts), self.batch_size):
+            encoded = self.tokenizer(
+                texts[start:start + self.batch_size],
+                padding=True,
+                truncation=True,
+                max_length=self.max_length,
+                return_tensors="np",
+            )
+            inputs = {name: value.astype(np.int64) for name, value in encoded.items() if name in self._input_names}
+            hidden_state = self.session.run(None, inputs)[0]
+
+            mask = encoded["attention_mask"][..., None].astype(np.float32)
+            pooled = (hidden_state * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+            vectors.extend(pooled.tolist())
+        return vectors
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._embed(list(texts))
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed([text])[0]
+
+
+def export_onnx_model(model_name: str, output_dir: str, quantize: bool = True, opset: int = 17) -> str:
+    """
+    Export a Hugging Face encoder to ONNX and optionally add a dynamically int8-quantized copy.
+    Returns output_dir.
+    """
+    import torch
+    from transformers import AutoModel, AutoTokenizer
+
+    os.makedirs(output_dir, exist_ok=True)
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModel.from_pretrained(model_name)
+    model.eval()
+    tokenizer.save_pretrained(output_dir)
+
+    class LastHiddenState(torch.nn.Module):
+        def __init__(self, encoder):
+            super().__init__()
+            self.encoder = encoder
+
+        def forward(self, input_ids, attention_mask):
+            return self.encoder(input_ids=input_ids, attention_mask=attention_mask).last_hidden_state
+
+    sample = tokenizer(["query: export"], return_tensors="pt")
+    fp32_path = os.path.join(output_dir, FP32_MODEL_FILE)
+    logger.info(f"Exporting {model_name} to {fp32_path}")
+    with torch.no_grad():
+        torch.onnx.export(
+            LastHiddenState(model),
+            (sample["input_ids"], sample["attention_mask"]),
+            fp32_path,
+            input_names=["input_ids", "attention_mask"],
+            output_names=["last_hidden_state"],
+            dynamic_axes={
+                "input_ids": {0: "batch", 1: "sequence"},
+                "attention_mask": {0: "batch", 1: "sequence"},
+                "last_hidden_state": {0: "batch", 1: "sequence"},
+            },
+            opset_version=opset,
+            dynamo=False,
+        )
+
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        quantized_path = os.path.join(output_dir, QUANTIZED_MODEL_FILE)
+        logger.info(f"Quantizing weights to int8 into {quantized_path}")
+        # e5-large is over the 2GB protobuf limit in fp32, so tensors may live in external data files
+        quantize_dynamic(fp32_path, quantized_path, weight_type=QuantType.QInt8,
+                         use_external_data_format=os.path.getsize(fp32_path) > 2 ** 31 - 1)
+    return output_dir
+
+
+def main():
+    from app.vectorstore.store import EMBEDDING_MODEL_NAME
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default=EMBEDDING_MODEL_NAME)
+    parser.add_argument("--output", required=True, help="Directory for the tokenizer and ONNX files")
+    parser.add_argument("--no-quantize", action="store_true", help="Only export the fp32 model")
+    parser.add_argument("--opset", type=int, default=17)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    export_onnx_model(args.model, args.output, quantize=not args.no_quantize, opset=args.opset)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Client side of the vector store sidecar (see app.vectorstore.sidecar).
+
+RemoteChroma stands in for the LangChain Chroma store returned by VectorStore.get_store:
+as_retriever / similarity_search and _collection.get / count behave the same, but the
+model and the Chroma handles live once in the sidecar instead of in every API worker.
+"""
+import os
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import httpx
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore as LangChainVectorStore
+import logging
+
+logger = logging.getLogger(__name__)
+
+# unix:///path/to.sock or http://127.0.0.1:8765
+VECTORSTORE_SIDECAR_URL = os.environ.get("VECTORSTORE_SIDECAR_URL", "unix:///tmp/darbo-vectorstore.sock")
+VECTORSTORE_SIDECAR_TIMEOUT = float(os.environ.get("VECTORSTORE_SIDECAR_TIMEOUT", "30"))
+
+
+class SidecarClient:
+    """Thread-safe synchronous HTTP client for the sidecar (called from the blocking executor)"""
+
+    def __init__(self, url: str = VECTORSTORE_SIDECAR_URL, timeout: float = VECTORSTORE_SIDECAR_TIMEOUT):
+        self.url = url
+        if url.startswith("unix://"):
+            transport = httpx.HTTPTransport(uds=url[len("unix://"):])
+            base_url = "http://sidecar"
+        else:
+            transport = None
+            base_url = url
+        self._client = httpx.Client(base_url=base_url, transport=transport, timeout=timeout)
+
+    def get(self, path: str) -> Dict[str, Any]:
+        response = self._client.get(path)
+        response.raise_for_status()
+        return response.json()
+
+    def post(self, path: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        response = self._client.post(path, json=payload)
+        response.raise_for_status()
+        return response.json()
+
+    def wait_until_ready(self, timeout: float):
+        """Block until the sidecar has loaded its model and stores"""
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                if self.get("/health").get("status") == "ok":
+                    return
+            except (httpx.TransportError, httpx.HTTPStatusError) as e:
+                if time.monotonic() > deadline:
+                    raise RuntimeError(f"Vector store sidecar at {self.url} is not available: {e}") from e
+            time.sleep(0.5)
+
+
+class RemoteEmbeddings(Embeddings):
+    """Embeddings computed by the sidecar's model; query requests are micro-batched there"""
+
+    def __init__(self, client: SidecarClient):
+        self.client = client
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.client.post("/embed/documents", {"texts": list(texts)})["embeddings"]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.client.post("/embed/queries", {"texts": [text]})["embeddings"][0]
+
+
+class RemoteCollection:
+    """Read-only subset of the chromadb Collection API used by the app"""
+
+    def __init__(self, client: SidecarClient, store_type: str):
+        self.client = client
+        self.store_type = store_type
+
+    def count(self) -> int:
+        return self.client.get(f"/stores/{self.store_type}/count")["count"]
+
+    def get(self, ids: Optional[List[str]] = None, where: Optional[Dict] = None, limit: Optional[int] = None,
+            offset: Optional[int] = None, include: Optional[List[str]] = None, **kwargs) -> Dict[str, Any]:
+        payload = {"ids": ids, "where": where, "limit": limit, "offset": offset,
+                   "include": include if include is not None else ["documents", "metadatas"]}
+        return self.client.post(f"/stores/{self.store_type}/get", payload)
+
+    def update(self, *args, **kwargs):
+        raise NotImplementedError("The sidecar is read-only; write to the stores with app.vectorstore.ingest")
+
+
+class RemoteChroma(LangChainVectorStore):
+    """LangChain vector store backed by one of the sidecar's Chroma collections"""
+
+    def __init__(self, client: SidecarClient, store_type: str, embeddings: Embeddings, persist_directory: str):
+        self.client = client
+        self.store_type = store_type
+        self._embedding_function = embeddings
+        self._collection = RemoteCollection(client, store_type)
+        # Same box, same files: on-disk versions are read locally (see get_single_store_version)
+        self._persist_directory = persist_directory
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self._embedding_function
+
+    def similarity_search_with_score(self, query: str, k: int = 4, filter: Optional[Dict] = None,
+                                     **kwargs) -> List[Tuple[Document, float]]:
+        results = self.client.post(f"/stores/{self.store_type}/search", {"query": query, "k": k, "filter": filter})
+        return [
+            (Document(page_content=result["page_content"], metadata=result["metadata"]), result["score"])
+            for result in results["results"]
+        ]
+
+    def similarity_search(self, query: str, k: int = 4, filter: Optional[Dict] = None, **kwargs) -> List[Document]:
+        return [document for document, _ in self.similarity_search_with_score(query, k=k, filter=filter)]
+
+    def _select_relevance_score_fn(self):
+        # Chroma collections created by LangChain use L2 distance
+        return self._euclidean_relevance_score_fn
+
+    def add_texts(self, texts: Iterable[str], metadatas: Optional[List[dict]] = None, **kwargs) -> List[str]:
+        raise NotImplementedError("The sidecar is read-only; write to the stores with app.vectorstore.ingest")
+
+    @classmethod
+    def from_texts(cls, texts: List[str], embedding: Embeddings, metadatas: Optional[List[dict]] = None, **kwargs):
+        raise NotImplementedError("RemoteChroma connects to existing sidecar stores")
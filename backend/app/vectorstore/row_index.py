@@ -0,0 +1,96 @@
+"""
+Primary-key index over the full-document collection: document UUID -> Chroma row ids.
+
+Chroma has no index on metadata, so a `where={"uuid": ...}` get scans the metadata
+table. The index is built from one metadata-only read of the collection and turns
+document lookups into `get(ids=[...])`, Chroma's primary-key path. Documents stored
+with a legacy "id" metadata field instead of "uuid" are found through aliases.
+The index is rebuilt whenever the store version changes.
+"""
+import threading
+import time
+from typing import Any, Dict, Hashable, List, Optional
+
+from app.services.executor import run_blocking
+from app.vectorstore.store import get_single_store_version, get_vectorstore
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class RowIndex:
+    def __init__(self, results: Dict[str, Any], version: Hashable):
+        self.version = version
+        self.built_at = time.time()
+        self.rows: Dict[str, List[str]] = {}
+        self.aliases: Dict[str, str] = {}
+        for row_id, metadata in zip(results.get("ids") or [], results.get("metadatas") or []):
+            metadata = metadata or {}
+            uuid = metadata.get("uuid") or metadata.get("id")
+            if not uuid:
+                continue
+            self.rows.setdefault(uuid, []).append(row_id)
+            legacy_id = metadata.get("id")
+            if legacy_id and legacy_id != uuid:
+                self.aliases[str(legacy_id)] = uuid
+
+    def resolve(self, document_id: str) -> Optional[str]:
+        """Canonical UUID for a UUID or legacy id, None if no row has it"""
+        if document_id in self.rows:
+            return document_id
+        return self.aliases.get(document_id)
+
+    def row_ids(self, uuids: List[str]) -> List[str]:
+        return [row_id for uuid in uuids for row_id in self.rows.get(uuid, [])]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "documents": len(self.rows),
+            "rows": sum(len(rows) for rows in self.rows.values()),
+            "aliases": len(self.aliases),
+            "built_at": self.built_at,
+        }
+
+
+_index: Optional[RowIndex] = None
+_lock = threading.Lock()
+
+
+def refresh_row_index(force: bool = False) -> Optional[RowIndex]:
+    """Rebuild the row index if the full collection changed (blocking)"""
+    global _index
+    with _lock:
+        full_vectorstore = get_vectorstore(store_type="full")
+        if full_vectorstore is None:
+            logger.error("Full vector store not initialized properly, cannot build row index")
+            return None
+
+        version = get_single_store_version(full_vectorstore)
+        if _index is not None and _index.version == version and not force:
+            return _index
+
+        started = time.perf_counter()
+        results = full_vectorstore._collection.get(include=["metadatas"])
+        _index = RowIndex(results, version)
+        logger.info(
+            f"Built row index: {len(_index.rows)} documents in {(time.perf_counter() - started) * 1000:.1f} ms"
+        )
+        return _index
+
+
+def current_row_index(version: Hashable) -> Optional[RowIndex]:
+    """The row index if it is built for this store version (never builds it)"""
+    index = _index
+    return index if index is not None and index.version == version else None
+
+
+async def aget_row_index(full_vectorstore) -> Optional[RowIndex]:
+    """Current row index, rebuilt on the executor only when the store changed"""
+    index = current_row_index(get_single_store_version(full_vectorstore))
+    if index is not None:
+        return index
+    return await run_blocking(refresh_row_index)
+
+
+def row_index_stats() -> Optional[Dict[str, Any]]:
+    return _index.stats() if _index is not None else None
@@ -0,0 +1,271 @@
+"""
+Vector store sidecar: one process that owns the e5 model and both Chroma stores.
+
+With several uvicorn workers each worker would otherwise load its own copy of the
+model. Run this once per box and start the API with VECTORSTORE_MODE=remote;
+workers then reach it through app.vectorstore.remote. Concurrent query embeddings
+are collected into micro-batches so the model runs one forward pass per batch.
+
+Usage (from the directory that contains docs/ and docs2/):
+    python -m app.vectorstore.sidecar --uds /tmp/darbo-vectorstore.sock
+    python -m app.vectorstore.sidecar --port 8765
+"""
+import argparse
+import asyncio
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import Response
+from pydantic import BaseModel
+
+from app.services.executor import run_blocking
+from app.services.metrics import render_metrics, time_vectorstore
+from app.vectorstore.embedding_cache import CachedQueryEmbeddings
+from app.vectorstore.migrate_deadlines import STORE_PATHS
+from app.vectorstore.store import create_embeddings, embedding_model_id
+import logging
+
+logger = logging.getLogger(__name__)
+
+SIDECAR_MAX_BATCH_SIZE = int(os.environ.get("SIDECAR_MAX_BATCH_SIZE", "32"))
+SIDECAR_MAX_WAIT_MS = float(os.environ.get("SIDECAR_MAX_WAIT_MS", "5"))
+
+# Chroma result keys that can be returned as JSON
+RESULT_KEYS = ("ids", "documents", "metadatas", "distances", "embeddings")
+
+
+class EmbedRequest(BaseModel):
+    texts: List[str]
+
+
+class SearchRequest(BaseModel):
+    query: str
+    k: int = 4
+    filter: Optional[Dict[str, Any]] = None
+
+
+class GetRequest(BaseModel):
+    ids: Optional[List[str]] = None
+    where: Optional[Dict[str, Any]] = None
+    limit: Optional[int] = None
+    offset: Optional[int] = None
+    include: List[str] = ["documents", "metadatas"]
+
+
+class EmbeddingBatcher:
+    """
+    Collects concurrent query-embedding requests for up to max_wait_ms (or max_batch_size
+    texts) and embeds them in one model call. While a batch runs, the next one fills up.
+    """
+
+    def __init__(self, embeddings: CachedQueryEmbeddings, max_batch_size: int = SIDECAR_MAX_BATCH_SIZE,
+                 max_wait_ms: float = SIDECAR_MAX_WAIT_MS):
+        self.embeddings = embeddings
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self.batches = 0
+        self.texts = 0
+
+    def start(self):
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+
+    async def embed(self, text: str) -> List[float]:
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((text, future))
+        return await future
+
+    async def _next_batch(self):
+        batch = [await self._queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._next_batch()
+            try:
+                vectors = await run_blocking(self.embeddings.embed_queries, [text for text, _ in batch])
+            except Exception as e:
+                logger.error(f"Embedding batch of {len(batch)} failed: {e}")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            self.batches += 1
+            self.texts += len(batch)
+            for (_, future), vector in zip(batch, vectors):
+                if not future.done():
+                    future.set_result(vector)
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "batches": self.batches,
+            "texts": self.texts,
+            "mean_batch_size": round(self.texts / self.batches, 2) if self.batches else 0.0,
+            "queued": self._queue.qsize() if self._queue else 0,
+        }
+
+
+def _to_json_result(results: Dict[str, Any]) -> Dict[str, Any]:
+    """Chroma results with numpy arrays turned into lists"""
+    converted = {}
+    for key in RESULT_KEYS:
+        value = results.get(key)
+        if key == "embeddings" and value is not None:
+            value = [list(map(float, vector)) for vector in value]
+        converted[key] = value
+    return converted
+
+
+app = FastAPI(title="Darbo Asistentas vector store sidecar")
+state: Dict[str, Any] = {"ready": False}
+
+
+def _load():
+    """Load the model and both stores (blocking)"""
+    from langchain_community.vectorstores import Chroma
+
+    started = time.perf_counter()
+    base_embeddings = create_embeddings()
+    embeddings = CachedQueryEmbeddings(
+        base_embeddings,
+        max_size=int(os.environ.get("EMBEDDING_CACHE_SIZE", "2048")),
+        persist_path=os.environ.get("EMBEDDING_CACHE_PATH"),
+        model_id=embedding_model_id(base_embeddings)
+    )
+    stores = {}
+    for store_type, relative_path in STORE_PATHS.items():
+        path = os.path.join(os.getcwd(), relative_path)
+        if os.path.exists(path) and os.listdir(path):
+            stores[store_type] = Chroma(persist_directory=path, embedding_function=embeddings)
+            logger.info(f"Sidecar loaded {store_type} store with {stores[store_type]._collection.count()} documents")
+        else:
+            logger.error(f"{store_type} store does not exist at {path}")
+    logger.info(f"Sidecar ready in {time.perf_counter() - started:.1f}s")
+    return embeddings, stores
+
+
+@app.on_event("startup")
+async def startup():
+    embeddings, stores = await run_blocking(_load)
+    state.update(embeddings=embeddings, stores=stores, batcher=EmbeddingBatcher(embeddings), ready=True)
+    state["batcher"].start()
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    if state.get("ready"):
+        await state["batcher"].stop()
+        state["embeddings"].persist()
+
+
+def _store(store_type: str):
+    if not state.get("ready"):
+        raise HTTPException(status_code=503, detail="Sidecar is loading")
+    store = state["stores"].get(store_type)
+    if store is None:
+        raise HTTPException(status_code=404, detail=f"Unknown or missing store: {store_type}")
+    return store
+
+
+@app.get("/health")
+async def health():
+    if not state.get("ready"):
+        raise HTTPException(status_code=503, detail="Sidecar is loading")
+    return {"status": "ok", "stores": sorted(state["stores"]), "embedding_model": state["embeddings"].model_id}
+
+
+@app.get("/stats")
+async def stats():
+    if not state.get("ready"):
+        raise HTTPException(status_code=503, detail="Sidecar is loading")
+    return {"embedding_cache": state["embeddings"].stats(), "batcher": state["batcher"].stats()}
+
+
+@app.get("/metrics")
+async def metrics():
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
+
+@app.post("/embed/queries")
+async def embed_queries(request: EmbedRequest):
+    if not state.get("ready"):
+        raise HTTPException(status_code=503, detail="Sidecar is loading")
+    vectors = await asyncio.gather(*(state["batcher"].embed(text) for text in request.texts))
+    return {"embeddings": vectors}
+
+
+@app.post("/embed/documents")
+async def embed_documents(request: EmbedRequest):
+    if not state.get("ready"):
+        raise HTTPException(status_code=503, detail="Sidecar is loading")
+    return {"embeddings": await run_blocking(state["embeddings"].embed_documents, request.texts)}
+
+
+@app.post("/stores/{store_type}/search")
+async def search(store_type: str, request: SearchRequest):
+    store = _store(store_type)
+    vector = await state["batcher"].embed(request.query)
+    with time_vectorstore(store_type, "search"):
+        results = await run_blocking(
+            store.similarity_search_by_vector_with_relevance_scores, vector, k=request.k, filter=request.filter
+        )
+    return {"results": [
+        {"page_content": document.page_content, "metadata": document.metadata, "score": score}
+        for document, score in results
+    ]}
+
+
+@app.post("/stores/{store_type}/get")
+async def get(store_type: str, request: GetRequest):
+    store = _store(store_type)
+    with time_vectorstore(store_type, "get"):
+        results = await run_blocking(
+            store._collection.get, ids=request.ids, where=request.where, limit=request.limit,
+            offset=request.offset, include=request.include
+        )
+    return _to_json_result(results)
+
+
+@app.get("/stores/{store_type}/count")
+async def count(store_type: str):
+    store = _store(store_type)
+    return {"count": await run_blocking(store._collection.count)}
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--uds", help="Unix socket path to listen on")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    if args.uds:
+        uvicorn.run(app, uds=args.uds, log_level="warning")
+    else:
+        uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,58 @@
 import os
-from typing import Optional, List, Dict
-from langchain_community.vectorstores import Chroma
-from langchain_community.embeddings import HuggingFaceEmbeddings
-from langchain_core.retrievers import BaseRetriever
-from langchain_core.documents import Document
-from pydantic import Field
+import threading
+import time
+from typing import TYPE_CHECKING, Optional, List, Dict, Tuple
+from app.vectorstore.embedding_cache import CachedQueryEmbeddings
+from app.vectorstore.deadlines import has_deadline_metadata
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Chroma and the embedding model pull in chromadb, torch and transformers, so they are
+# imported when the store is first built rather than when the app is imported
+if TYPE_CHECKING:
+    from langchain_community.vectorstores import Chroma
+
+# Embedder shared by both stores and by the ingestion pipeline that builds them
+EMBEDDING_MODEL_NAME = "intfloat/multilingual-e5-large-instruct"
+
+# "torch" (fp32 sentence-transformers) or "onnx" (exported model, int8 if quantized)
+EMBEDDING_BACKEND = os.environ.get("EMBEDDING_BACKEND", "torch")
+ONNX_MODEL_DIR = os.environ.get("ONNX_MODEL_DIR", os.path.join("models", "e5-large-instruct-onnx"))
+
+# "local" loads the model and stores in this process; "remote" uses the shared sidecar
+# (app.vectorstore.sidecar) so several API workers share one copy
+VECTORSTORE_MODE = os.environ.get("VECTORSTORE_MODE", "local")
+
+
+def create_embeddings(backend: str = EMBEDDING_BACKEND):
+    """Build the document/query embedder for the configured backend"""
+    if backend == "onnx":
+        from app.vectorstore.onnx_embeddings import OnnxEmbeddings
+        logger.info(f"Using ONNX Runtime embeddings from {ONNX_MODEL_DIR}")
+        return OnnxEmbeddings(ONNX_MODEL_DIR)
+    if backend != "torch":
+        raise ValueError(f"Unknown embedding backend: {backend}")
+    from langchain_community.embeddings import HuggingFaceEmbeddings
+    return HuggingFaceEmbeddings(
+        model_name=EMBEDDING_MODEL_NAME,
+        model_kwargs={'device': 'cpu', 'trust_remote_code': False},
+        encode_kwargs={'normalize_embeddings': True}
+    )
+
+
+def embedding_model_id(embeddings) -> str:
+    """Backend and model that produce embeddings' vectors, recorded with the persisted query cache"""
+    model_path = getattr(embeddings, "model_path", None)
+    if model_path:  # ONNX: the fp32 and int8 files give different vectors
+        return f"onnx:{os.path.abspath(model_path)}"
+    return f"torch:{getattr(embeddings, 'model_name', EMBEDDING_MODEL_NAME)}"
 
 
 class VectorStore:
     _instance = None
+    # The model and stores are loaded in the background at startup, so construction can race with requests
+    _init_lock = threading.Lock()
     
     def __new__(cls):
         if cls._instance is None:
@@ -21,28 +61,55 @@ class VectorStore:
         return cls._instance
     
     def __init__(self):
-        if not self.initialized:
-            logger.info("Initializing dual vector store system...")
-            # Using the same embeddings for both stores
-            self.embeddings = HuggingFaceEmbeddings(
-                model_name="intfloat/multilingual-e5-large-instruct",
-                model_kwargs={'device': 'cpu', 'trust_remote_code': False},
-                encode_kwargs={'normalize_embeddings': True}
-            )
-            
-            # Paths for both vector stores
-            self.summary_store_path = os.path.join(os.getcwd(), "docs2", "chroma")  # Summaries
-            self.full_store_path = os.path.join(os.getcwd(), "docs", "chroma")      # Full articles
-            
-            logger.info(f"Summary store path: {self.summary_store_path}")
-            logger.info(f"Full articles store path: {self.full_store_path}")
-            
+        if self.initialized:
+            return
+        with self._init_lock:
+            if not self.initialized:
+                self._initialize()
+
+    def _initialize(self):
+        logger.info("Initializing dual vector store system...")
+        # Seconds spent on each part of the load, reported by the readiness endpoint
+        self.load_timings = {}
+        started = time.perf_counter()
+        if VECTORSTORE_MODE == "remote":
+            from app.vectorstore.remote import RemoteEmbeddings, SidecarClient
+            self.sidecar = SidecarClient()
+            self.sidecar.wait_until_ready(timeout=float(os.environ.get("VECTORSTORE_SIDECAR_WAIT", "300")))
+            base_embeddings = RemoteEmbeddings(self.sidecar)
+            model_id = f"remote:{self.sidecar.get('/health').get('embedding_model', 'unknown')}"
+        else:
+            base_embeddings = create_embeddings()
+            model_id = embedding_model_id(base_embeddings)
+        # Using the same embeddings for both stores, with repeated queries served from cache
+        self.embeddings = CachedQueryEmbeddings(
+            base_embeddings,
+            max_size=int(os.environ.get("EMBEDDING_CACHE_SIZE", "2048")),
+            persist_path=os.environ.get("EMBEDDING_CACHE_PATH"),
+            model_id=model_id
+        )
+        self.load_timings["embedding_model"] = round(time.perf_counter() - started, 3)
+        
+        # Paths for both vector stores
+        self.summary_store_path = os.path.join(os.getcwd(), "docs2", "chroma")  # Summaries
+        self.full_store_path = os.path.join(os.getcwd(), "docs", "chroma")      # Full articles
+        
+        logger.info(f"Summary store path: {self.summary_store_path}")
+        logger.info(f"Full articles store path: {self.full_store_path}")
+        
+        started = time.perf_counter()
+        if VECTORSTORE_MODE == "remote":
+            self._connect_stores()
+        else:
             self._load_stores()
-            self.initialized = True
-            logger.info("Dual vector store initialization completed")
+        self.load_timings["stores"] = round(time.perf_counter() - started, 3)
+        self.initialized = True
+        logger.info("Dual vector store initialization completed")
 
     def _load_stores(self):
         """Load both summary and full article vector stores"""
+        from langchain_community.vectorstores import Chroma
+
         # Load summary store
         try:
             if os.path.exists(self.summary_store_path) and os.listdir(self.summary_store_path):
@@ -77,7 +144,26 @@ class VectorStore:
             logger.error(f"Error loading full articles vector store: {str(e)}", exc_info=True)
             self.full_store = None
     
-    def get_store(self, store_type="summary") -> Optional[Chroma]:
+    def _connect_stores(self):
+        """Use the sidecar's summary and full article stores"""
+        from app.vectorstore.remote import RemoteChroma
+
+        available = self.sidecar.get("/health")["stores"]
+        logger.info(f"Using vector store sidecar at {self.sidecar.url} (stores: {available})")
+        self.summary_store = RemoteChroma(self.sidecar, "summary", self.embeddings, self.summary_store_path) if "summary" in available else None
+        self.full_store = RemoteChroma(self.sidecar, "full", self.embeddings, self.full_store_path) if "full" in available else None
+        if self.summary_store is None:
+            logger.error("Sidecar has no summary store")
+
+    def get_version(self) -> Tuple:
+        """
+        Cheap fingerprint of both stores' on-disk state.
+        Any write to a Chroma collection touches its SQLite file, so caches derived
+        from the stores compare this value to know when to invalidate.
+        """
+        return (_path_version(self.summary_store_path), _path_version(self.full_store_path))
+
+    def get_store(self, store_type="summary") -> Optional["Chroma"]:
         """Get the vector store instance"""
         if store_type == "summary":
             return self.summary_store
@@ -97,7 +183,55 @@ class VectorStore:
    
 
 # Helper functions
-def get_vectorstore(store_type="summary") -> Optional[Chroma]:
+def _path_version(path: str) -> Tuple:
+    """(mtime, size) of the SQLite database and its write-ahead log under a Chroma directory"""
+    version = []
+    for name in ("chroma.sqlite3", "chroma.sqlite3-wal"):
+        try:
+            stat = os.stat(os.path.join(path, name))
+            version.append((stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            version.append(None)
+    return tuple(version)
+
+def get_single_store_version(store: "Chroma") -> Optional[Tuple]:
+    """On-disk version of one Chroma store (None for in-memory stores)"""
+    persist_directory = getattr(store, "_persist_directory", None)
+    return _path_version(persist_directory) if persist_directory else None
+
+# id(store) -> (store version, whether every document has numeric deadline metadata)
+_deadline_filter_support: Dict[int, Tuple[Tuple, bool]] = {}
+
+def supports_deadline_filter(store: "Chroma") -> bool:
+    """
+    Whether expiry can be filtered inside Chroma for this store (blocking on first call).
+    Stores that have not been through migrate_deadlines lack the numeric field, and
+    filtering on it would drop every document.
+    """
+    persist_directory = getattr(store, "_persist_directory", None)
+    version = get_single_store_version(store)
+    cached = _deadline_filter_support.get(id(store))
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    supported = has_deadline_metadata(store._collection)
+    if not supported:
+        logger.warning(
+            f"Store at {persist_directory} has no numeric deadline metadata; "
+            f"run app.vectorstore.migrate_deadlines to filter expired projects inside Chroma"
+        )
+    _deadline_filter_support[id(store)] = (version, supported)
+    return supported
+
+def is_vectorstore_loaded() -> bool:
+    """Whether the VectorStore singleton has finished loading (never triggers a load)"""
+    return VectorStore._instance is not None and VectorStore._instance.initialized
+
+def get_vectorstore(store_type="summary") -> Optional["Chroma"]:
     """Get vectorstore instance"""
     return VectorStore().get_store(store_type)
 
+def get_store_version() -> Tuple:
+    """Get the on-disk version of both vector stores"""
+    return VectorStore().get_version()
+
@@ -1,37 +1,52 @@
 
 import os
-from langchain.schema.retriever import BaseRetriever
 from typing_extensions import TypedDict, List
-from IPython.display import Image, display
 from langchain_core.pydantic_v1 import BaseModel, Field
-from langchain.schema import Document
-from langchain.prompts import PromptTemplate,ChatPromptTemplate
+from langchain_core.prompts import PromptTemplate,ChatPromptTemplate
 import uuid
-from sentence_transformers import SentenceTransformer
-from langchain.vectorstores import Chroma
-from langchain_core.output_parsers import StrOutputParser
-from langchain.schema import Document
+from langchain_core.output_parsers import StrOutputParser, JsonOutputParser
 from dotenv import load_dotenv
 from langchain_core.documents import Document
 import logging
 from typing import Annotated
 from concurrent.futures import ThreadPoolExecutor
 import concurrent.futures
+from app.services.executor import run_blocking
+from app.services.metrics import INTENT_DECISIONS
+from app.workflows.intent_classifier import CHIT_CHAT, WORK_RELATED, is_greeting
 logger = logging.getLogger(__name__)
 
 
 
 
-def retrieval_grader_grader(llm):
+# Grading modes selectable through retrieval_grader_grader
+GRADING_MODES = ("per_document", "batch", "cross_encoder")
+
+
+def retrieval_grader_grader(llm, mode="per_document"):
     """
     Function to create a grader object using a passed LLM model.
     
     Args:
         llm: The language model to be used for grading.
+        mode: "per_document" grades one document per call and returns a GradeDocuments score,
+              "batch" grades N numbered documents in one call and returns their relevant UUIDs,
+              "cross_encoder" scores documents locally and uses the LLM only as a tie-breaker
+              for borderline scores (when CROSS_ENCODER_TIE_BREAKER is enabled).
         
     Returns:
         Callable: A pipeline function that grades relevance based on the LLM.
     """
+    if mode == "batch":
+        return batch_retrieval_grader(llm)
+    if mode == "cross_encoder":
+        from app.workflows.cross_encoder_grader import CrossEncoderGrader, CROSS_ENCODER_TIE_BREAKER
+
+        tie_breaker = retrieval_grader_grader(llm) if CROSS_ENCODER_TIE_BREAKER else None
+        return CrossEncoderGrader(tie_breaker=tie_breaker)
+    if mode != "per_document":
+        raise ValueError(f"Unknown grading mode: {mode}. Expected one of {GRADING_MODES}")
+
     class GradeDocuments(BaseModel):
         """Ar dokumentas  padės atsakyti į klausimą."""
         binary_score: str = Field(
@@ -70,33 +85,63 @@ Pavyzdziui jei klausime miestas yra tai ar dokumente jis sutampa, jei dokumento
     return retrieval_grader    
 
 
+def batch_retrieval_grader(llm):
+    """
+    Create a grader that checks many documents in a single LLM call.
+    Input documents must be rendered with format_numbered_documents; the output is
+    parsed JSON with the UUIDs of the relevant documents (see parse_relevant_uuids).
+    """
+    prompt = PromptTemplate(
+        template="""Tu esi dokumentu tikrintojas kuris žiuri ar dokumentai reikšmingi klausimui.
+Pavyzdziui jei klausime miestas yra tai ar dokumente jis sutampa, jei dokumento tipas yra tada ar dokumento tipoas sutampa,
+ jeigu paminėta darbo specifika pamineta ziuri ar ir dokumente tokia pamineta.
+ Kartais šių punktų nėra dokumente, jei kausime tai randi o dokumente ne, praleisk toki dokumentą.
+ Jei pvz adresas yra Šilutės pl.   44, Klaipėda, tai miestas yra klaipėda o gatvė yra Šilutės pl. 44.
+ Jei adresas Keramikų g. 20, Vilnius , tai miestas yra Vilnius o gatvė yra Keramikų g. 20.
 
+        Kiekvieną dokumentą vertink atskirai.
 
+        Klausimas: {question} \n
+        Numeruoti dokumentai: \n\n {documents} \n\n
+        
+        Grąžink tik tų dokumentų uuid, kurie susiję su klausimu.
+        Atsakyk tik JSON formatu be įžangos ar paaiškinimo: {{"relevant_uuids": ["uuid", ...]}}
+        Jei nė vienas dokumentas nesusijęs, grąžink {{"relevant_uuids": []}}.
+        """,
+        input_variables=['documents', 'question'],
+    )
 
-def check_chit_chat(state, llm):
-    """
-    Classifies the query as 'chit_chat' or 'work_related'.
-    Simple version without using structured output which causes Groq API issues.
-    """
-    question = state["question"]
-    steps = state["steps"]
-    steps.append("Chit Chat check")
-    logger.info(f"Checking if query is chit-chat: '{question}'")
-    
-    # Quick dictionary check first for common greetings
-    CHIT_CHAT_PATTERNS = [
-        "labas", "hi", "hello", "sveiki", "laba diena", "kaip sekasi", 
-        "how are you", "sveikas", "heyo", "hey", "hola"
-    ]
-    
-    # Check if the question contains any chit-chat patterns
-    question_lower = question.lower().strip()
-    for pattern in CHIT_CHAT_PATTERNS:
-        if pattern in question_lower or question_lower == pattern:
-            logger.info(f"Query '{question}' matched chit-chat pattern: {pattern}")
-            return "chit_chat"
-    
-    # For more complex classification, use a simpler prompt approach
+    return prompt | llm | JsonOutputParser()
+
+
+def format_numbered_documents(docs):
+    """Render documents as a numbered list with their UUIDs for the batch grader"""
+    parts = []
+    for i, doc in enumerate(docs, start=1):
+        metadata = {k: v for k, v in (doc.metadata or {}).items() if k != 'uuid'}
+        parts.append(
+            f"[{i}] uuid: {doc.metadata.get('uuid')}\n"
+            f"Metaduomenys: {metadata}\n"
+            f"{doc.page_content}"
+        )
+    return "\n\n".join(parts)
+
+
+def parse_relevant_uuids(output):
+    """Extract the set of relevant UUIDs from the batch grader output"""
+    if isinstance(output, dict):
+        output = output.get("relevant_uuids", [])
+    if not isinstance(output, list):
+        logger.warning(f"Unexpected batch grader output: {output}")
+        return set()
+    return {str(item).strip() for item in output if item}
+
+
+
+
+
+def chit_chat_llm_checker(llm):
+    """LLM chain that answers "chit_chat" or "work_related" for a question"""
     prompt = PromptTemplate(
         template="""Tu esi bendravimo expertas, kuris turi patirties ir statybose. Tu turi atskirti kada žmogus klausia apie statybas, apie dominančius objektus, projektus o kada tiesiog nori paplepeti
 
@@ -111,26 +156,60 @@ Atsakyk vienu žodžiu tik tais :  "chit_chat" arba "work_related".
 """,
         input_variables=["question"],
     )
-    
-    # Use a simple chain with string output
-    chit_chat_checker = prompt | llm | StrOutputParser()
-    
+    return prompt | llm | StrOutputParser()
+
+
+async def classify_with_llm(question, llm):
+    """Ask the LLM; defaults to work_related if the call fails"""
     try:
-        # Get the classification result
-        result = chit_chat_checker.invoke({"question": question})
+        result = await chit_chat_llm_checker(llm).ainvoke({"question": question})
         logger.info(f"LLM classification result for '{question}': {result}")
-        
-        # Clean up and normalize the result
         result = result.lower().strip()
-        
-        if "chit" in result or "chat" in result or result.startswith("chit"):
-            logger.info("Query classified as: chit_chat")
-            return "chit_chat"
-        else:
-            logger.info("Query classified as: work_related")
-            return "work_related"
-            
+        return CHIT_CHAT if "chit" in result or "chat" in result else WORK_RELATED
     except Exception as e:
         logger.error(f"Error during chit-chat classification: {e}", exc_info=True)
-        # Default to work_related on error
-        return "work_related"
\ No newline at end of file
+        return WORK_RELATED
+
+
+async def check_chit_chat(state, llm, intent_classifier=None):
+    """
+    Classifies the query as 'chit_chat' or 'work_related'.
+    Pure greetings are recognised word by word. With an intent_classifier the question is
+    then classified locally from its embedding, and the LLM is only asked when the
+    classifier finds it ambiguous (or when no classifier is configured).
+    """
+    question = state["question"]
+    steps = state["steps"]
+    steps.append("Chit Chat check")
+    logger.info(f"Checking if query is chit-chat: '{question}'")
+
+    if is_greeting(question):
+        logger.info(f"Query '{question}' is a greeting")
+        INTENT_DECISIONS.labels("greeting", CHIT_CHAT).inc()
+        return CHIT_CHAT
+
+    if intent_classifier is not None:
+        try:
+            label, gap = await run_blocking(intent_classifier.classify, question)
+        except Exception as e:
+            logger.error(f"Embedding intent classifier failed, asking the LLM: {e}", exc_info=True)
+            label, gap = None, None
+        if label is not None:
+            logger.info(f"Query classified as {label} by embedding (gap {gap:.3f})")
+            INTENT_DECISIONS.labels("embedding", label).inc()
+            return label
+        if gap is not None:
+            logger.info(f"Embedding classification ambiguous (gap {gap:.3f}), asking the LLM")
+
+    label = await classify_with_llm(question, llm)
+    logger.info(f"Query classified as: {label}")
+    INTENT_DECISIONS.labels("llm", label).inc()
+    return label
+
+
+async def route_question(state, llm, intent_classifier=None):
+    """Follow-ups to the conversation's documents skip classification; everything else goes to check_chit_chat"""
+    if state.get("follow_up"):
+        logger.info(f"Query '{state['question']}' is a follow-up to the conversation's documents")
+        return "follow_up"
+    return await check_chit_chat(state, llm, intent_classifier)
@@ -0,0 +1,68 @@
+import os
+from functools import lru_cache
+from typing import List, Optional
+from langchain_core.documents import Document
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Small multilingual cross-encoder that runs comfortably on CPU
+CROSS_ENCODER_MODEL = os.environ.get("CROSS_ENCODER_MODEL", "cross-encoder/mmarco-mMiniLMv2-L12-H384-v1")
+# Scores are in [0, 1]; documents at or above the threshold are relevant
+CROSS_ENCODER_THRESHOLD = float(os.environ.get("CROSS_ENCODER_THRESHOLD", "0.5"))
+# Scores within this distance of the threshold are borderline and go to the LLM tie-breaker
+CROSS_ENCODER_BORDERLINE_MARGIN = float(os.environ.get("CROSS_ENCODER_BORDERLINE_MARGIN", "0.1"))
+CROSS_ENCODER_TIE_BREAKER = os.environ.get("CROSS_ENCODER_TIE_BREAKER", "true").lower() in ("1", "true", "yes")
+
+# Metadata fields that carry the facts the grader checks (city, address, work type)
+SCORED_METADATA_FIELDS = ("Miestas", "Gatvė", "Kreipiamasi_dėl", "Dokumento_tipas")
+
+
+@lru_cache(maxsize=2)
+def get_cross_encoder_model(model_name: str):
+    """Load a cross-encoder once per process (sentence-transformers is imported lazily)"""
+    from sentence_transformers import CrossEncoder
+
+    logger.info(f"Loading cross-encoder model: {model_name}")
+    return CrossEncoder(model_name, max_length=512, device="cpu")
+
+
+def format_document_for_scoring(doc: Document) -> str:
+    """Text the cross-encoder sees for a summary: key metadata followed by the content"""
+    metadata = doc.metadata or {}
+    facts = [f"{field}: {metadata[field]}" for field in SCORED_METADATA_FIELDS if metadata.get(field)]
+    return "\n".join(facts + [doc.page_content])
+
+
+class CrossEncoderGrader:
+    """
+    Relevance grader that scores (question, summary) pairs locally with a cross-encoder.
+    Borderline scores can be handed to an LLM grader (tie_breaker) for a final decision.
+    """
+
+    def __init__(
+        self,
+        model_name: str = CROSS_ENCODER_MODEL,
+        threshold: float = CROSS_ENCODER_THRESHOLD,
+        borderline_margin: float = CROSS_ENCODER_BORDERLINE_MARGIN,
+        tie_breaker=None,
+    ):
+        self.model_name = model_name
+        self.threshold = threshold
+        self.borderline_margin = borderline_margin
+        self.tie_breaker = tie_breaker
+
+    def score(self, question: str, docs: List[Document]) -> List[float]:
+        """Score all documents against the question in one batched forward pass (blocking)"""
+        if not docs:
+            return []
+        model = get_cross_encoder_model(self.model_name)
+        pairs = [(question, format_document_for_scoring(doc)) for doc in docs]
+        scores = model.predict(pairs, batch_size=len(pairs), show_progress_bar=False)
+        return [float(score) for score in scores]
+
+    def classify(self, score: float) -> Optional[bool]:
+        """True if relevant, False if not, None if borderline and a tie-breaker should decide"""
+        if self.tie_breaker is not None and abs(score - self.threshold) < self.borderline_margin:
+            return None
+        return score >= self.threshold
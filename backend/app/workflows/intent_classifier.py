@@ -0,0 +1,123 @@
+import os
+import re
+import threading
+from functools import lru_cache
+from typing import Callable, Optional, Tuple
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+import logging
+
+logger = logging.getLogger(__name__)
+
+# "embedding" classifies locally and asks the LLM only for ambiguous questions; "llm" always asks the LLM
+INTENT_CLASSIFIER = os.environ.get("INTENT_CLASSIFIER", "embedding")
+# Required gap between the chit-chat and work scores; e5 similarities are compressed, so this is small
+INTENT_CONFIDENCE_MARGIN = float(os.environ.get("INTENT_CONFIDENCE_MARGIN", "0.02"))
+# Each label is scored by the mean similarity of its INTENT_TOP_K closest prototypes
+INTENT_TOP_K = int(os.environ.get("INTENT_TOP_K", "3"))
+
+CHIT_CHAT, WORK_RELATED = "chit_chat", "work_related"
+
+# A question made only of these words is a greeting; checked per word, so "Šilutės" or "hidroizoliacija" never match
+GREETING_WORDS = {
+    "labas", "labukas", "sveiki", "sveikas", "sveika", "laba", "labą", "diena", "dieną", "vakaras", "rytas",
+    "hi", "hello", "hey", "heyo", "hola", "kaip", "sekasi", "laikaisi", "how", "are", "you", "ačiū", "aciu",
+    "dėkui", "thanks", "ok", "gerai",
+}
+WORD_PATTERN = re.compile(r"\w+")
+
+CHIT_CHAT_PROTOTYPES = [
+    "Labas", "Sveiki", "Laba diena", "Labas vakaras", "Kaip sekasi?", "Kaip laikaisi?",
+    "Kas tu esi?", "Ką tu moki?", "Kaip tave vadinti?", "Ačiū už pagalbą", "Papasakok anekdotą",
+    "Kas yra Lietuvos sostinė?", "Koks šiandien oras Klaipėdoje?", "Kiek dabar valandų?",
+    "Koks tavo mėgstamiausias filmas?", "Ar tu robotas?", "Kokia šiandien diena?",
+    "Ką veiki savaitgalį?", "Kas laimėjo krepšinio rungtynes?", "Rekomenduok gerą knygą",
+    "Hello", "Hi there", "How are you?", "What can you do?", "Tell me a joke", "Thank you",
+]
+WORK_PROTOTYPES = [
+    "Kokie objektai yra Klaipėdoje?", "Ar yra stogo remonto darbų Vilniuje?", "Fasado remonto projektai Kaune",
+    "Langų keitimo darbai", "Laiptinės remontas Vilniuje", "Kokie šildymo sistemos darbai yra skelbiami?",
+    "Ar yra projektų Šilutėje?", "Balkonų remontas", "Daugiabučio renovacija Panevėžyje",
+    "Kada baigiasi pasiūlymų pateikimo terminas?", "Kokie konkursai šiuo metu aktyvūs?",
+    "Rask hidroizoliacijos darbus", "Pastato apšiltinimo projektai", "Elektros instaliacijos keitimas Šiauliuose",
+    "Kur reikia pakeisti vandentiekio vamzdžius?", "Kokie darbai Šilutės pl. 44?",
+    "Ar yra kiemo sutvarkymo konkursų?", "Liftų modernizavimo darbai", "Kiek kainuoja stogo dangos keitimas?",
+    "Kokie dokumentai reikalingi pasiūlymui?", "Which tenders are open in Vilnius?",
+    "Roof repair projects in Klaipėda", "Show me renovation tenders",
+]
+
+
+def is_greeting(question: str) -> bool:
+    words = WORD_PATTERN.findall(question.lower())
+    return bool(words) and all(word in GREETING_WORDS for word in words)
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+class EmbeddingIntentClassifier:
+    """
+    Chit-chat vs work question classifier that compares the question's embedding with
+    labelled prototype questions. Returns None when the two labels score too close,
+    so the caller can fall back to the LLM.
+
+    format_query is applied to the question and the prototypes alike; passing the
+    retrieval instruction format makes the question vector the one retrieval and the
+    answer cache look up anyway, so classification is usually a query-cache hit.
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        format_query: Callable[[str], str] = lambda text: text,
+        margin: float = INTENT_CONFIDENCE_MARGIN,
+        top_k: int = INTENT_TOP_K,
+    ):
+        self.embeddings = embeddings
+        self.format_query = format_query
+        self.margin = margin
+        self.top_k = top_k
+        self._prototypes: Optional[Tuple[np.ndarray, np.ndarray]] = None
+        self._lock = threading.Lock()
+
+    def prototypes(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Normalized (chit-chat, work) prototype matrices, embedded on first use (blocking)"""
+        with self._lock:
+            if self._prototypes is None:
+                texts = [self.format_query(text) for text in CHIT_CHAT_PROTOTYPES + WORK_PROTOTYPES]
+                vectors = _normalize(np.asarray(self.embeddings.embed_documents(texts), dtype=np.float32))
+                split = len(CHIT_CHAT_PROTOTYPES)
+                self._prototypes = (vectors[:split], vectors[split:])
+                logger.info(f"Embedded {len(texts)} intent prototypes")
+            return self._prototypes
+
+    def scores(self, question: str) -> Tuple[float, float]:
+        """(chit-chat, work) scores for the question (blocking)"""
+        chit_chat, work = self.prototypes()
+        vector = _normalize(np.asarray(self.embeddings.embed_query(self.format_query(question)), dtype=np.float32))
+
+        def label_score(prototypes: np.ndarray) -> float:
+            similarities = np.sort(prototypes @ vector)[::-1]
+            return float(similarities[:self.top_k].mean())
+
+        return label_score(chit_chat), label_score(work)
+
+    def classify(self, question: str) -> Tuple[Optional[str], float]:
+        """(label or None if ambiguous, chit-chat score minus work score)"""
+        chit_chat, work = self.scores(question)
+        gap = chit_chat - work
+        if gap >= self.margin:
+            return CHIT_CHAT, gap
+        if gap <= -self.margin:
+            return WORK_RELATED, gap
+        return None, gap
+
+
+@lru_cache(maxsize=2)
+def get_intent_classifier(embeddings: Embeddings, format_query: Callable[[str], str]) -> EmbeddingIntentClassifier:
+    """One classifier (and one set of prototype vectors) per embedder"""
+    return EmbeddingIntentClassifier(embeddings, format_query)
+
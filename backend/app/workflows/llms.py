@@ -0,0 +1,130 @@
+import asyncio
+from functools import lru_cache
+from typing import Any, AsyncIterator, List, Optional
+
+import groq
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
+from langchain_core.runnables.config import var_child_runnable_config
+from langchain_groq import ChatGroq
+from app.services.metrics import llm_metrics_callback
+from app.services.llm_scheduler import llm_scheduler, priority_for_node, scheduled_node
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Errors worth another attempt; 429s also pause the model's queue for Retry-After
+RETRYABLE_ERRORS = (groq.RateLimitError, groq.APIConnectionError, groq.InternalServerError)
+# Tokens reserved for the completion until the real usage is known
+EXPECTED_COMPLETION_TOKENS = 256
+
+
+def estimate_tokens(messages: List[BaseMessage]) -> int:
+    """Rough prompt size (about 4 characters per token) for the tokens/min bucket"""
+    return sum(len(str(message.content)) for message in messages) // 4 + 1
+
+
+def retry_after(error: Exception, attempt: int) -> float:
+    """Seconds to wait before retrying: Retry-After on 429s, exponential backoff otherwise"""
+    response = getattr(error, "response", None)
+    if response is not None:
+        try:
+            return float(response.headers.get("retry-after"))
+        except (TypeError, ValueError):
+            pass
+    return min(0.5 * 2 ** attempt, 8.0)
+
+
+class ScheduledChatGroq(ChatGroq):
+    """
+    ChatGroq whose async calls wait for a slot from the process-wide LLM scheduler.
+    The scheduler owns retries (scheduler_retries), so a 429 pauses the whole model
+    queue instead of every caller backing off on its own. Sync calls are not scheduled.
+    """
+
+    scheduler_retries: int = 3
+
+    def _slot(self, messages: List[BaseMessage], run_manager: Optional[AsyncCallbackManagerForLLMRun]):
+        # Streaming calls get no run manager; the caller's runnable config carries the same metadata
+        config = var_child_runnable_config.get() or {}
+        metadata = run_manager.metadata if run_manager else config.get("metadata", {})
+        node = scheduled_node((metadata or {}).get("langgraph_node"))
+        tokens = estimate_tokens(messages) + min(self.max_tokens or EXPECTED_COMPLETION_TOKENS,
+                                                 EXPECTED_COMPLETION_TOKENS)
+        return llm_scheduler.slot(self.model_name, tokens, priority_for_node(node))
+
+    async def _backoff(self, error: Exception, attempt: int):
+        delay = retry_after(error, attempt)
+        if isinstance(error, groq.RateLimitError):
+            llm_scheduler.pause(self.model_name, delay)
+        else:
+            logger.warning(f"LLM call to {self.model_name} failed ({error}), retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        if self.streaming:
+            # ChatGroq streams through _astream, which takes the slot
+            return await super()._agenerate(messages, stop=stop, run_manager=run_manager, **kwargs)
+
+        for attempt in range(self.scheduler_retries + 1):
+            try:
+                async with self._slot(messages, run_manager) as slot:
+                    result = await super()._agenerate(messages, stop=stop, run_manager=run_manager, **kwargs)
+                    slot.record_usage((result.llm_output or {}).get("token_usage", {}).get("total_tokens", 0))
+                    return result
+            except RETRYABLE_ERRORS as e:
+                if attempt == self.scheduler_retries:
+                    raise
+                await self._backoff(e, attempt)
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        for attempt in range(self.scheduler_retries + 1):
+            started = False
+            try:
+                async with self._slot(messages, run_manager) as slot:
+                    async for chunk in super()._astream(messages, stop=stop, run_manager=run_manager, **kwargs):
+                        started = True
+                        usage = getattr(chunk.message, "usage_metadata", None)
+                        if usage:
+                            slot.record_usage(usage.get("total_tokens", 0))
+                        yield chunk
+                    return
+            except RETRYABLE_ERRORS as e:
+                # Tokens already reached the caller; a retry would repeat them
+                if started or attempt == self.scheduler_retries:
+                    raise
+                await self._backoff(e, attempt)
+
+
+@lru_cache(maxsize=32)
+def get_llm(model_name: str, temperature: float, max_tokens: int, max_retries: int = 3) -> ChatGroq:
+    """
+    Return a shared ChatGroq client for the given settings.
+
+    Clients hold their own HTTP connection pool, so creating one per request
+    throws away keep-alive connections. They are safe to share between requests.
+    Calls go through the process-wide LLM scheduler (app.services.llm_scheduler).
+    """
+    logger.info(f"Creating ChatGroq client: model={model_name}, temperature={temperature}, max_tokens={max_tokens}")
+    return ScheduledChatGroq(
+        model=model_name,
+        temperature=temperature,
+        max_tokens=max_tokens,
+        # Retries are done by the scheduler, not inside the Groq client
+        max_retries=0,
+        scheduler_retries=max_retries,
+        callbacks=[llm_metrics_callback],
+    )
@@ -0,0 +1,114 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class WorkflowRegistry:
+    """
+    LRU cache of compiled LangGraph workflows.
+
+    Compiling a graph is pure CPU work that depends only on its configuration,
+    so each configuration is compiled once and reused by every request.
+    """
+
+    def __init__(self, max_size: int = 16):
+        self.max_size = max_size
+        self._workflows: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_or_create(self, key: Hashable, factory: Callable[[], Any]) -> Any:
+        """Return the workflow cached under key, compiling it with factory on a miss"""
+        with self._lock:
+            workflow = self._workflows.get(key)
+            if workflow is not None:
+                self._workflows.move_to_end(key)
+                self.hits += 1
+                return workflow
+
+            self.misses += 1
+            logger.info(f"Compiling workflow for key: {key}")
+            workflow = factory()
+            self._workflows[key] = workflow
+
+            while len(self._workflows) > self.max_size:
+                evicted_key, _ = self._workflows.popitem(last=False)
+                self.evictions += 1
+                logger.info(f"Evicted workflow for key: {evicted_key}")
+
+            return workflow
+
+    def clear(self):
+        """Drop all cached workflows (e.g. after the vector stores are reloaded)"""
+        with self._lock:
+            self._workflows.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """Cache statistics for health and monitoring endpoints"""
+        with self._lock:
+            return {
+                "size": len(self._workflows),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+workflow_registry = WorkflowRegistry(max_size=int(os.environ.get("WORKFLOW_CACHE_SIZE", "16")))
+
+
+def get_minimal_workflow(full_vectorstore, summaries_vectorstore, k_sum, search_type, generator_name, generator_temperature, helper_name, helper_temperature, grading_mode="per_document"):
+    """Get the compiled chat workflow for this configuration from the registry"""
+    from app.workflows.workflows import create_minimal_workflow
+
+    key = (
+        "minimal",
+        id(full_vectorstore),
+        id(summaries_vectorstore),
+        k_sum,
+        search_type,
+        generator_name,
+        generator_temperature,
+        helper_name,
+        helper_temperature,
+        grading_mode,
+    )
+    return workflow_registry.get_or_create(
+        key,
+        lambda: create_minimal_workflow(
+            full_vectorstore=full_vectorstore,
+            summaries_vectorstore=summaries_vectorstore,
+            k_sum=k_sum,
+            search_type=search_type,
+            generator_name=generator_name,
+            generator_temperature=generator_temperature,
+            helper_name=helper_name,
+            helper_temperature=helper_temperature,
+            grading_mode=grading_mode,
+        ),
+    )
+
+
+def get_direct_document_workflow(full_vectorstore, generator_name, generator_temperature):
+    """
+    Get the compiled document-focused workflow from the registry.
+    The document UUID is not part of the key - pass it in the initial state as "document_uuid".
+    """
+    from app.workflows.workflows import create_direct_document_workflow
+
+    key = ("direct_document", id(full_vectorstore), generator_name, generator_temperature)
+    return workflow_registry.get_or_create(
+        key,
+        lambda: create_direct_document_workflow(
+            full_vectorstore=full_vectorstore,
+            generator_name=generator_name,
+            generator_temperature=generator_temperature,
+        ),
+    )
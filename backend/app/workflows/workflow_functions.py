@@ -1,26 +1,39 @@
 import os
-from langchain.schema.retriever import BaseRetriever
+from langchain_core.retrievers import BaseRetriever
 from typing_extensions import TypedDict, List
-from IPython.display import Image, display
 from langchain_core.pydantic_v1 import BaseModel, Field
-from langchain.prompts import PromptTemplate,ChatPromptTemplate
+from langchain_core.prompts import PromptTemplate,ChatPromptTemplate
 import uuid
-from langchain_groq import ChatGroq
-from sentence_transformers import SentenceTransformer
-from langchain.vectorstores import Chroma
-from langchain_community.embeddings import HuggingFaceEmbeddings
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.output_parsers import JsonOutputParser
-from langchain.schema import Document
 from dotenv import load_dotenv
 from langchain_core.documents import Document
+import asyncio
+import datetime
+import time
 import logging
 from typing import Annotated
-from concurrent.futures import ThreadPoolExecutor
-import concurrent.futures
-from app.workflows.checkers import retrieval_grader_grader,check_chit_chat
+from app.workflows.checkers import retrieval_grader_grader,check_chit_chat, format_numbered_documents, parse_relevant_uuids
+from app.services.executor import run_blocking
+from app.vectorstore.deadlines import get_deadline, deadline_where
+from app.vectorstore.store import supports_deadline_filter, get_single_store_version
+from app.vectorstore.document_cache import get_full_documents
+from app.services.project_index import aget_project_index
+from app.services.metrics import observe_speculation, time_vectorstore
+from app.services.llm_scheduler import llm_node_scope
+from app.vectorstore.bm25 import aget_bm25_index, reciprocal_rank_fusion
+from app.vectorstore.deadlines import today_epoch_day
+from app.services.query_analyzer import QUERY_CITY_FILTER, QueryAnalysis, get_query_analyzer
 logger = logging.getLogger(__name__)
 
+# Fuse dense results with BM25 (app.vectorstore.bm25) in retrieve_summaries
+HYBRID_RETRIEVAL = os.environ.get("HYBRID_RETRIEVAL", "true").lower() in ("1", "true", "yes")
+# Summaries kept after fusion (at most k); fusion ranks better than either list alone, so fewer go to grading
+HYBRID_FUSED_K = int(os.environ.get("HYBRID_FUSED_K", "10"))
+# Start summary retrieval (and grading) while the chit-chat check is still running (classify_and_retrieve)
+SPECULATIVE_EXECUTION = os.environ.get("SPECULATIVE_EXECUTION", "false").lower() in ("1", "true", "yes")
+SPECULATIVE_GRADING = os.environ.get("SPECULATIVE_GRADING", "true").lower() in ("1", "true", "yes")
+
 task_description="Atrask aktualiausius objektus iš duombazės, jei miestas ar tipas , ar darbo pobūdis paminėti, užtikrink kad jie būtu gražinti kaip tinkamiausi"
 
 class InstructRetriever(BaseRetriever):
@@ -40,6 +53,11 @@ class InstructRetriever(BaseRetriever):
         return self.base_retriever.invoke(formatted_query)
 
 
+def format_retrieval_query(question: str) -> str:
+    """A question as the summary retriever embeds it (shared with the query-embedding cache)"""
+    return InstructRetriever.get_detailed_instruct(task_description, question)
+
+
 def QA_chain(llm):
     """
     Creates a question-answering chain using the provided language model.
@@ -80,7 +98,113 @@ def QA_chain(llm):
 
 
 
-def retrieve_full_documents(state, full_vectorstore):
+def follow_up_chain(llm):
+    """QA chain for follow-up questions: the conversation so far plus the documents it found"""
+    prompt = PromptTemplate(
+        template="""You are an assistant that helps answer questions about construction or environmental works based on the provided documents about specific projects.
+    This is a follow-up question in an ongoing conversation. The conversation so far:
+
+    {history}
+
+    Answer the follow-up question {question} using only the documents found earlier in the conversation: {documents}.
+    Resolve references such as "it", "that project" or "the first one" from the conversation above.
+    If the answer cannot be found in the documents, say so clearly.
+    Do not ask additional questions or repeat yourself in the answer.
+
+    Always answer in the same language the question was asked.
+
+    Answer:
+        """,
+        input_variables=["history", "question", "documents"],
+    )
+    return prompt | llm | StrOutputParser()
+
+
+def format_history(history):
+    return "\n\n".join(f"Klausimas: {turn['question']}\nAtsakymas: {turn['answer']}" for turn in history or [])
+
+
+async def answer_follow_up(state, follow_up_chain):
+    """
+    Answer a follow-up from the documents the conversation already retrieved,
+    skipping retrieval and grading (the documents are put in the initial state by chat_service)
+    """
+    question = state["question"]
+    documents = state.get("full_documents", [])
+    steps = state["steps"]
+    steps.append("answer_follow_up")
+    logger.info(f"Answering follow-up '{question}' from {len(documents)} conversation documents")
+
+    generation = await follow_up_chain.ainvoke({
+        "history": format_history(state.get("history")),
+        "question": question,
+        "documents": documents,
+    })
+    return {
+        "full_documents": documents,
+        "filtered_summaries": state.get("filtered_summaries", []),
+        "generation": generation,
+        "steps": steps,
+        "generation_count": state.get("generation_count", 0) + 1,
+    }
+
+
+def document_QA_chain(llm):
+    """QA chain for the document-focused chat: one document, plus the previous questions about it"""
+    prompt = PromptTemplate(
+        template="""You are an assistant that helps answer questions about a specific construction or environmental works project.
+    You must respond in the same language the question is asked.
+
+    Previous questions about this document and your answers:
+
+    {history}
+
+    Answer the question {question} thoroughly yet concisely, using only the information from this document:
+
+    {documents}
+
+    If the answer cannot be found in the document, say so clearly.
+    Do not ask additional questions or repeat yourself in the answer.
+
+    Always answer in the same language the question was asked.
+
+    Answer:
+        """,
+        input_variables=["history", "question", "documents"],
+    )
+    return prompt | llm | StrOutputParser()
+
+
+async def generate_document_answer(state, QA_chain):
+    """
+    Answer a question about one document. Uses the session's pre-rendered document_context
+    when chat passed one in, otherwise the full documents retrieved by UUID.
+    """
+    question = state["question"]
+    documents = state.get("full_documents", [])
+    steps = state["steps"]
+    steps.append("generate_answer")
+
+    if not documents:
+        logger.info("Document not found, returning default message")
+        generation = "Nėra galiojančių projektų, pagal šią užklausą"
+    else:
+        generation = await QA_chain.ainvoke({
+            "history": format_history(state.get("history")) or "-",
+            "question": question,
+            "documents": state.get("document_context") or documents,
+        })
+
+    return {
+        "full_documents": documents,
+        "question": question,
+        "generation": generation,
+        "steps": steps,
+        "generation_count": state.get("generation_count", 0) + 1,
+    }
+
+
+async def retrieve_full_documents(state, full_vectorstore):
     """
     Retrieve full documents using UUIDs from the summary grading step
     """
@@ -102,27 +226,13 @@ def retrieve_full_documents(state, full_vectorstore):
     
     logger.info(f"Retrieving {len(document_uuids)} full documents by UUID")
     
-    # Get documents by UUID from the full vectorstore
-    retrieved_docs = []
-    for uuid in document_uuids:
-        try:
-            # Get documents with this UUID - result is a dict, not an object
-            results = full_vectorstore._collection.get(where={"uuid": uuid})
-            
-            if results and 'documents' in results and len(results['documents']) > 0:
-                # Convert to Document objects
-                for i, doc_content in enumerate(results['documents']):
-                    metadata = results['metadatas'][i] if i < len(results['metadatas']) else {}
-                    doc = Document(
-                        page_content=doc_content,
-                        metadata=metadata
-                    )
-                    retrieved_docs.append(doc)
-                    logger.info(f"Retrieved document with UUID: {uuid}")
-            else:
-                logger.warning(f"No document found with UUID: {uuid}")
-        except Exception as e:
-            logger.error(f"Error retrieving document with UUID {uuid}: {e}")
+    # One $in query for every UUID not already in the hot-document cache, in relevance order
+    try:
+        store_version = get_single_store_version(full_vectorstore)
+        retrieved_docs = await run_blocking(get_full_documents, full_vectorstore, document_uuids, store_version)
+    except Exception as e:
+        logger.error(f"Error retrieving documents by UUID: {e}")
+        return {"full_documents": [], "degraded": True, "steps": steps}
     
     logger.info(f"Retrieved {len(retrieved_docs)} documents by UUID")
     
@@ -135,11 +245,14 @@ def retrieve_full_documents(state, full_vectorstore):
     
 
 
-def grade_summary_documents(state, retrieval_grader):
+async def grade_summary_documents(state, retrieval_grader, max_concurrency=10, grading_mode="per_document", batch_size=15):
     """
     Grade summary documents and return UUIDs of relevant documents for later retrieval
     Also keep the filtered summary documents for display in the sidebar
-    Process documents in batches of three for improved efficiency
+    Grader calls run concurrently on the event loop, at most max_concurrency at a time
+    In "batch" mode one grader call covers up to batch_size documents for the same question
+    In "cross_encoder" mode retrieval_grader is a CrossEncoderGrader that scores each question's
+    documents in one local forward pass; only borderline scores reach its LLM tie-breaker
     """
     import datetime
     
@@ -156,56 +269,109 @@ def grade_summary_documents(state, retrieval_grader):
     
     # First filter out expired documents
     def is_not_expired(doc):
-        """Check if document is not expired based on Pasiulyma_pateikti_iki date"""
-       
-        pateikti_iki = doc.metadata.get('Pasiulyma_pateikti_iki') or doc.metadata.get('pateikti_iki')
-        
-        if not pateikti_iki:
-            return True  
+        """Check if document is not expired based on its deadline metadata"""
+        deadline = get_deadline(doc.metadata)
+        if deadline is None:
+            return True  # Keep documents without a (parseable) deadline
         
-        try:
-            
-            if isinstance(pateikti_iki, str):
-                
-                if "," in pateikti_iki:
-                    date_part = pateikti_iki.split(",")[0].strip()
-                else:
-                    date_part = pateikti_iki.split(" ")[0].strip()
-                
-                
-                for fmt in ('%Y-%m-%d', '%d.%m.%Y', '%Y/%m/%d', '%d-%m-%Y'):
-                    try:
-                        expiration_date = datetime.datetime.strptime(date_part, fmt).date()
-                        break
-                    except ValueError:
-                        continue
-                else:
-                    
-                    logger.warning(f"Could not parse date: {pateikti_iki}")
-                    return True
-            elif isinstance(pateikti_iki, (datetime.date, datetime.datetime)):
-                expiration_date = pateikti_iki if isinstance(pateikti_iki, datetime.date) else pateikti_iki.date()
-            else:
-                logger.warning(f"Unknown date format: {type(pateikti_iki)}")
-                return True
-            
-            
-            is_valid = today <= expiration_date
-            if not is_valid:
-                logger.info(f"Document expired: date = {pateikti_iki} is older than today ({today}), skipping")
-            else:
-                logger.info(f"Document valid: date = {pateikti_iki} is valid for today ({today}), keeping")
-            
-            return is_valid
-        except Exception as e:
-            logger.error(f"Error parsing date: {e}")
-            return True  # On error, include document
+        is_valid = today <= deadline
+        if not is_valid:
+            logger.info(f"Document expired: deadline {deadline} is older than today ({today}), skipping")
+        else:
+            logger.info(f"Document valid: deadline {deadline} is valid for today ({today}), keeping")
+        return is_valid
     
     
-    def batch_documents(docs_list, batch_size=3):
-        """Split documents list into batches of specified size"""
-        for i in range(0, len(docs_list), batch_size):
-            yield docs_list[i:i + batch_size]
+    semaphore = asyncio.Semaphore(max_concurrency)
+    # Grader calls that failed; their documents are dropped, so the answer is marked degraded
+    failures = 0
+
+    async def grade_document(q, doc, grader=retrieval_grader):
+        """Helper function to grade a single question-document pair"""
+        nonlocal failures
+        async with semaphore:
+            try:
+                score = await grader.ainvoke({"question": q, "documents": doc})
+                logger.info(f"Grader output for document: {score}")
+                
+                # Extract the grade
+                grade = getattr(score, 'binary_score', None)
+                if grade and grade.lower() in ["yes", "true", "1", 'taip']:
+                    # Extract UUID from document metadata
+                    doc_uuid = doc.metadata.get('uuid')
+                    if doc_uuid:
+                        return (doc_uuid, doc)
+                    logger.warning(f"Document has no UUID in metadata: {doc.metadata}")
+            except Exception as e:
+                failures += 1
+                logger.error(f"Error grading document: {e}")
+            return None
+
+    async def grade_batch(q, doc_batch):
+        """Helper function to grade several documents for one question in a single call"""
+        nonlocal failures
+        async with semaphore:
+            try:
+                output = await retrieval_grader.ainvoke({"question": q, "documents": format_numbered_documents(doc_batch)})
+                logger.info(f"Batch grader output for {len(doc_batch)} documents: {output}")
+                relevant_uuids = parse_relevant_uuids(output)
+            except Exception as e:
+                failures += 1
+                logger.error(f"Error grading batch of {len(doc_batch)} documents: {e}")
+                return []
+        return [(doc.metadata['uuid'], doc) for doc in doc_batch if doc.metadata['uuid'] in relevant_uuids]
+
+    async def grade_cross_encoder(q, docs):
+        """Helper function to score one question's documents locally, breaking ties with the LLM"""
+        nonlocal failures
+        try:
+            scores = await run_blocking(retrieval_grader.score, q, docs)
+        except Exception as e:
+            failures += 1
+            logger.error(f"Error scoring {len(docs)} documents with cross-encoder: {e}")
+            return []
+
+        decisions = [retrieval_grader.classify(score) for score in scores]
+        borderline = [i for i, decision in enumerate(decisions) if decision is None]
+        logger.info(
+            f"Cross-encoder scores: {[round(score, 3) for score in scores]}, "
+            f"{len(borderline)} borderline sent to LLM tie-breaker"
+        )
+        if borderline:
+            tie_breaks = await asyncio.gather(
+                *(grade_document(q, docs[i], grader=retrieval_grader.tie_breaker) for i in borderline)
+            )
+            for i, result in zip(borderline, tie_breaks):
+                decisions[i] = result is not None
+
+        return [(doc.metadata['uuid'], doc) for doc, relevant in zip(docs, decisions) if relevant]
+
+    async def grade_pairs(pairs):
+        """Grade (question, document) pairs with the configured mode, keeping retrieval order"""
+        if grading_mode not in ("batch", "cross_encoder"):
+            results = await asyncio.gather(*(grade_document(q, doc) for q, doc in pairs))
+            return [result for result in results if result is not None]
+
+        docs_by_question = {}
+        for q, doc in pairs:
+            if not doc.metadata.get('uuid'):
+                logger.warning(f"Document has no UUID in metadata: {doc.metadata}")
+                continue
+            docs_by_question.setdefault(q, []).append(doc)
+
+        if grading_mode == "cross_encoder":
+            question_results = await asyncio.gather(
+                *(grade_cross_encoder(q, docs) for q, docs in docs_by_question.items())
+            )
+            return [result for results in question_results for result in results]
+
+        batches = [
+            (q, docs[i:i + batch_size])
+            for q, docs in docs_by_question.items()
+            for i in range(0, len(docs), batch_size)
+        ]
+        batch_results = await asyncio.gather(*(grade_batch(q, doc_batch) for q, doc_batch in batches))
+        return [result for results in batch_results for result in results]
     
     
     if decomposed_documents is None:
@@ -213,182 +379,173 @@ def grade_summary_documents(state, retrieval_grader):
         valid_docs = [doc for doc in documents if is_not_expired(doc)]
         logger.info(f"Date filtering: {len(valid_docs)}/{len(documents)} documents remain after checking expiration dates")
         
-        def process_document_batch(q, doc_batch):
-            """Helper function to grade a batch of documents"""
-            results = []
-            
-            for doc in doc_batch:
-                try:
-                    
-                    score = retrieval_grader.invoke({"question": q, "documents": doc})
-                    logger.info(f"Grader output for document: {score}")
-                    
-                    
-                    grade = getattr(score, 'binary_score', None)
-                    if grade and grade.lower() in ["yes", "true", "1", 'taip']:
-                        # Extract UUID from document metadata
-                        doc_uuid = doc.metadata.get('uuid')
-                        if doc_uuid:
-                            results.append((doc_uuid, doc))  
-                        else:
-                            logger.warning(f"Document has no UUID in metadata: {doc.metadata}")
-                except Exception as e:
-                    logger.error(f"Error grading document: {e}")
-            
-            return results
+        for uuid, doc in await grade_pairs([(question, doc) for doc in valid_docs]):
+            filtered_doc_uuids.append(uuid)
+            filtered_summaries.append(doc)
         
-        # Process documents in batches of 3
-        with ThreadPoolExecutor(max_workers=10) as executor:
-            
-            future_to_batch = {}
-            for doc_batch in batch_documents(valid_docs, 3):
-                future = executor.submit(process_document_batch, question, doc_batch)
-                future_to_batch[future] = doc_batch
-            
-         
-            for future in concurrent.futures.as_completed(future_to_batch):
-                batch_results = future.result()
-                for uuid, doc in batch_results:
-                    filtered_doc_uuids.append(uuid)
-                    filtered_summaries.append(doc)  
+        if len(filtered_doc_uuids) < 4:
+            search = "Yes"
             
-            if len(filtered_doc_uuids) < 4:
-                search = "Yes"
-                
-            logger.info(f"Final decision - Perform web search: {search}")
-            logger.info(f"Filtered document UUIDs count: {len(filtered_doc_uuids)}")
-            logger.info(f"Filtered summaries count: {len(filtered_summaries)}")
+        logger.info(f"Final decision - Perform web search: {search}")
+        logger.info(f"Filtered document UUIDs count: {len(filtered_doc_uuids)}")
+        logger.info(f"Filtered summaries count: {len(filtered_summaries)}")
     
     else:
         
         valid_decomposed = {q: d for q, d in decomposed_documents.items() if is_not_expired(d)}
         logger.info(f"Date filtering: {len(valid_decomposed)}/{len(decomposed_documents)} decomposed documents remain")
         
-        def process_document_batch(items_batch):
-            """Helper function to grade a batch of question-document pairs"""
-            results = []
-            
-            for q, doc in items_batch:
-                try:
-                    
-                    score = retrieval_grader.invoke({"question": q, "documents": doc})
-                    logger.info(f"Grader output for document: {score}")
-                    
-                    # Extract the grade
-                    grade = getattr(score, 'binary_score', None)
-                    if grade and grade.lower() in ["yes", "true", "1", 'taip']:
-                        # Extract UUID from document metadata
-                        doc_uuid = doc.metadata.get('uuid')
-                        if doc_uuid:
-                            results.append((doc_uuid, doc))
-                        else:
-                            logger.warning(f"Document has no UUID in metadata: {doc.metadata}")
-                except Exception as e:
-                    logger.error(f"Error grading document: {e}")
-            
-            return results
+        for uuid, doc in await grade_pairs(list(valid_decomposed.items())):
+            filtered_doc_uuids.append(uuid)
+            filtered_summaries.append(doc)
         
-
-        items_list = list(valid_decomposed.items())
-        
-        with ThreadPoolExecutor(max_workers=10) as executor:
-            # Create batches of items and submit each batch
-            future_to_batch = {}
-            for i in range(0, len(items_list), 3):  # Process in batches of 3
-                batch = items_list[i:i + 3]
-                future = executor.submit(process_document_batch, batch)
-                future_to_batch[future] = batch
-            
-            for future in concurrent.futures.as_completed(future_to_batch):
-                batch_results = future.result()
-                for uuid, doc in batch_results:
-                    filtered_doc_uuids.append(uuid)
-                    filtered_summaries.append(doc)
-            
-            logger.info(f"Final decision - Perform web search: {search}")
-            logger.info(f"Filtered decomposed document UUIDs count: {len(filtered_doc_uuids)}")
-            logger.info(f"Filtered summaries count: {len(filtered_summaries)}")
+        logger.info(f"Final decision - Perform web search: {search}")
+        logger.info(f"Filtered decomposed document UUIDs count: {len(filtered_doc_uuids)}")
+        logger.info(f"Filtered summaries count: {len(filtered_summaries)}")
 
     return {
         "document_uuids": filtered_doc_uuids,  # Return UUIDs instead of full documents
         "question": question,
         "search": search,
         "steps": steps,
-        "filtered_summaries": filtered_summaries  # Include the filtered summary documents
+        "filtered_summaries": filtered_summaries,  # Include the filtered summary documents
+        "degraded": state.get("degraded", False) or failures > 0
     }
 
 
 
-def retrieve_summaries(state, summaries_vectorstore, k, search_type):
+async def live_projects_filter(summaries_vectorstore):
+    """
+    Chroma filter that excludes expired projects, and how many expired projects the whole
+    store holds (from the project index; not how many this query's candidates lost).
+    Returns (None, 0) when the store has no numeric deadline metadata yet.
+    """
+    if not await run_blocking(supports_deadline_filter, summaries_vectorstore):
+        return None, 0
+
+    today = datetime.date.today()
+    project_index = await aget_project_index()
+    expired_in_store = project_index.expired_count(today) if project_index else 0
+    return deadline_where(today), expired_in_store
+
+
+async def analyze_question(question):
+    """Cities named in the question and the Chroma filter restricting retrieval to them"""
+    if not QUERY_CITY_FILTER:
+        return QueryAnalysis(), None
+    project_index = await aget_project_index()
+    if project_index is None:
+        return QueryAnalysis(), None
+    analysis = get_query_analyzer(project_index).analyze(question)
+    return analysis, analysis.where(project_index)
+
+
+def combine_filters(*filters):
+    """AND together the given Chroma where filters, skipping None"""
+    filters = [f for f in filters if f is not None]
+    if not filters:
+        return None
+    return filters[0] if len(filters) == 1 else {"$and": filters}
+
+
+async def retrieve_summaries(state, summaries_vectorstore, k, search_type):
     """
     Retrieve documents based on the processed question.
+    Expired projects are filtered out inside the vector query, so all k results are live.
+    Cities named in the question restrict the query to those cities; if that finds
+    nothing the search is repeated without the city filter.
+    With HYBRID_RETRIEVAL the dense results are fused with BM25 results for the user's own
+    wording (same k, same filters) and only the top HYBRID_FUSED_K fused results are graded.
+    Embedding and the Chroma query are blocking, so they run on the shared executor.
     """
     steps = state["steps"]
     sub_questions = state.get("sub_questions")
     processed_question = state.get("processed_question")
     question = state["question"]
 
-    if sub_questions is None:
-        if processed_question is not None:
-            basic_retriever = summaries_vectorstore.as_retriever(
-                search_type=search_type,
-                search_kwargs={"k": k}
-            )
-            
+    deadline_filter, expired_in_store = await live_projects_filter(summaries_vectorstore)
+    if deadline_filter is not None:
+        logger.info(f"Retrieving summaries with the live-projects filter ({expired_in_store} expired projects in the store)")
 
-            instruct_retriever = InstructRetriever(
-                base_retriever=basic_retriever,
-                task_description=task_description
-            )
-            documents = instruct_retriever.invoke(processed_question)
+    analysis, city_filter = await analyze_question(question)
+    if analysis.cities:
+        logger.info(f"Question names cities {analysis.cities}, filtering retrieval to them")
 
-            steps.append("retrieve_documents")
-            return {
-                "documents": documents,
-                "steps": steps
-            }
-        else:
-            basic_retriever = summaries_vectorstore.as_retriever(
-                search_type=search_type,
-                search_kwargs={"k": k}
-            )
+    def summaries_retriever(k, search_filter):
+        search_kwargs = {"k": k}
+        if search_filter is not None:
+            search_kwargs["filter"] = search_filter
+        return summaries_vectorstore.as_retriever(
+            search_type=search_type,
+            search_kwargs=search_kwargs
+        )
+
+    def search(retriever, query):
+        with time_vectorstore("summary", "search"):
+            return retriever.invoke(query)
+
+    bm25_index = await aget_bm25_index(summaries_vectorstore) if HYBRID_RETRIEVAL else None
+    min_epoch_day = today_epoch_day() if deadline_filter is not None else None
+
+    async def hybrid_search(retriever, query, lexical_query, k, fused_k, predicate):
+        """
+        Dense results for query, fused by reciprocal rank with BM25 results for lexical_query
+        (the unrewritten question) and cut to fused_k when enabled
+        """
+        dense = await run_blocking(search, retriever, query)
+        if bm25_index is None:
+            return dense
+        with time_vectorstore("summary", "bm25"):
+            lexical = [
+                document for document, _ in
+                bm25_index.search(lexical_query, k, min_epoch_day=min_epoch_day, predicate=predicate)
+            ]
+        fused = reciprocal_rank_fusion([dense, lexical], min(k, fused_k))
+        logger.info(f"Hybrid retrieval: {len(dense)} dense + {len(lexical)} BM25 results fused into {len(fused)}")
+        return fused
+
+    async def retrieve(city_filter, predicate):
+        search_filter = combine_filters(deadline_filter, city_filter)
+        if sub_questions is None:
             instruct_retriever = InstructRetriever(
-                base_retriever=basic_retriever,
+                base_retriever=summaries_retriever(k, search_filter),
                 task_description=task_description
             )
-            documents = instruct_retriever.invoke(question)
+            query = processed_question if processed_question is not None else question
+            return await hybrid_search(instruct_retriever, query, question, k, HYBRID_FUSED_K, predicate)
 
-            steps.append("retrieve_documents")
-            return {
-                "documents": documents,
-                "steps": steps
-            }
-    else:
         documents = []
         import math
-        
-        k = math.ceil(k / 2)
-        retriever = summaries_vectorstore.as_retriever(
-            search_type=search_type,
-            search_kwargs={"k": k}
-        )
-        
+
+        sub_k = math.ceil(k / 2)
+        sub_fused_k = math.ceil(HYBRID_FUSED_K / 2)
+        retriever = summaries_retriever(sub_k, search_filter)
+
         for q in sub_questions:
             # Ensure each sub-question is a string
             if not isinstance(q, str):
                 raise TypeError(f"Each sub-question must be a string, got {type(q)} for question: {q}")
-            
-            document = retriever.invoke(q)
-            documents.extend(document)  
 
-        steps.append("retrieve_documents")
-        return {
-            "documents": documents,
-            "steps": steps
-        }
+            # Sub-questions are already in the user's words, so BM25 scores them as they are
+            document = await hybrid_search(retriever, q, q, sub_k, sub_fused_k, predicate)
+            documents.extend(document)
+        return documents
 
+    documents = await retrieve(city_filter, analysis.matches() if city_filter is not None else None)
+    if not documents and city_filter is not None:
+        logger.info(f"No live projects in {analysis.cities}, retrying retrieval without the city filter")
+        documents = await retrieve(None, None)
 
-def generate(state, QA_chain):
+    steps.append("retrieve_documents")
+    return {
+        "documents": documents,
+        "expired_in_store": expired_in_store,
+        "query_cities": analysis.cities,
+        "steps": steps
+    }
+
+
+async def generate(state, QA_chain):
     """
     Generate answer based on documents or return default message if no documents
     """
@@ -404,7 +561,7 @@ def generate(state, QA_chain):
         generation = "Nėra galiojančių projektų, pagal šią užklausą"
     else:
         logger.info(f"Generating answer using {len(documents)} documents")
-        generation = QA_chain.invoke({"documents": documents, "question": question})
+        generation = await QA_chain.ainvoke({"documents": documents, "question": question})
     
     generation_count += 1
         
@@ -433,7 +590,7 @@ def ask_question(state):
     steps.append("question_asked")
     return {"question": question, "steps": steps,"generation_count": generations_count}
         
-def answer_chit_chat(state, llm):
+async def answer_chit_chat(state, llm):
     """
     Generates a simple response for chit-chat queries.
     """
@@ -453,6 +610,7 @@ def answer_chit_chat(state, llm):
         "how are you?": "I'm doing well, thank you! How can I assist you?",
     }
     
+    degraded = False
     # Try to find direct match in dictionary
     question_lower = question.lower().strip()
     response = CHIT_CHAT_RESPONSES.get(question_lower)
@@ -475,10 +633,11 @@ Your response:""",
         chit_chat_chain = prompt | llm | StrOutputParser()
         
         try:
-            response = chit_chat_chain.invoke({"question": question})
+            response = await chit_chat_chain.ainvoke({"question": question})
         except Exception as e:
             logger.error(f"Error generating chit-chat response: {e}", exc_info=True)
             response = "Atsiprašau, įvyko klaida. Kuo galėčiau padėti?"
+            degraded = True
     
     logger.info(f"Generated chit-chat response: '{response}'")
     
@@ -487,10 +646,67 @@ Your response:""",
         "question": question,
         "generation": response,
         "steps": steps,
-        "documents": [] # Empty documents for chit-chat
-    }        
-    
-
-
+        "documents": [], # Empty documents for chit-chat
+        "degraded": degraded
+    }
 
 
+async def classify_and_retrieve(state, llm, intent_classifier, summaries_vectorstore, k, search_type,
+                                retrieval_grader=None, grading_mode="per_document"):
+    """
+    Speculative replacement for the check_chit_chat edge followed by retrieve_summaries:
+    the chit-chat check and summary retrieval run concurrently, and with a retrieval_grader
+    the speculative branch goes on to grade the retrieved summaries too.
+    If the question is chit-chat the speculative branch is cancelled (an embedding or
+    Chroma call already on the executor still finishes) and its results are dropped.
+    "intent" in the returned state routes the graph: chit_chat, work_related
+    (retrieved, still needs grading) or graded.
+    """
+    steps = state["steps"]
+    started = time.perf_counter()
+    stage = "retrieve"
+    # The speculative branch gets its own step list, merged only if its work is used
+    speculative_state = {**state, "steps": []}
+
+    async def speculate():
+        nonlocal stage
+        # (result, seconds) timed here: a done-callback may not have run yet when the task is awaited
+        result = await retrieve_summaries(speculative_state, summaries_vectorstore, k, search_type)
+        if retrieval_grader is not None:
+            stage = "grade"
+            with llm_node_scope("grade_summary_documents"):
+                graded = await grade_summary_documents(
+                    {**speculative_state, **result}, retrieval_grader, grading_mode=grading_mode
+                )
+            result = {**result, **graded}
+        return result, time.perf_counter() - started
+
+    speculation = asyncio.create_task(speculate())
+
+    try:
+        intent = await check_chit_chat(state, llm, intent_classifier)
+    except BaseException:
+        speculation.cancel()
+        raise
+    classify_seconds = time.perf_counter() - started
+
+    if intent == "chit_chat":
+        speculation.cancel()
+        try:
+            await speculation
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logger.info(f"Discarded speculative retrieval had failed: {e}")
+        # Time the speculative branch ran before it was cancelled (or finished)
+        observe_speculation(False, stage, classify_seconds, time.perf_counter() - started)
+        logger.info(f"Chit-chat question, discarded speculative {stage} after {classify_seconds:.3f}s")
+        return {"intent": "chit_chat", "steps": steps}
+
+    result, speculative_seconds = await speculation
+    observe_speculation(True, stage, classify_seconds, speculative_seconds)
+    logger.info(
+        f"Speculative {stage} finished in {speculative_seconds:.3f}s, classification in {classify_seconds:.3f}s"
+    )
+    steps.extend(result["steps"])
+    return {**result, "intent": "graded" if retrieval_grader is not None else "work_related", "steps": steps}
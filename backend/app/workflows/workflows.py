@@ -1,18 +1,15 @@
 import os
-from langchain.schema.retriever import BaseRetriever
 from typing_extensions import TypedDict, List
-from IPython.display import Image, display
-from langchain_core.pydantic_v1 import BaseModel, Field
 
 from langgraph.graph import START, END, StateGraph
 
 import uuid
-from langchain_groq import ChatGroq
+from app.workflows.llms import get_llm
 
-from langchain.schema import Document
 from dotenv import load_dotenv
 from langchain_core.documents import Document
 import logging
+from functools import partial
 from typing import Annotated
 from concurrent.futures import ThreadPoolExecutor
 import concurrent.futures
@@ -26,8 +23,18 @@ from app.workflows.workflow_functions import (
     ask_question,
     answer_chit_chat,
     QA_chain, 
+    format_retrieval_query,
+    classify_and_retrieve,
+    follow_up_chain,
+    answer_follow_up,
+    document_QA_chain,
+    generate_document_answer,
+    SPECULATIVE_EXECUTION,
+    SPECULATIVE_GRADING,
 )
-from app.workflows.checkers import check_chit_chat,  retrieval_grader_grader
+from app.workflows.checkers import route_question,  retrieval_grader_grader
+from app.services.metrics import timed_node
+from app.workflows.intent_classifier import INTENT_CLASSIFIER, get_intent_classifier
 
 
 
@@ -47,7 +54,7 @@ task_description="Atrask aktualiausius objektus iš duombazės, jei miestas ar t
 
 
 
-def create_minimal_workflow(full_vectorstore, summaries_vectorstore,  k_sum, search_type, generator_name, generator_temperature, helper_name, helper_temperature):
+def create_minimal_workflow(full_vectorstore, summaries_vectorstore,  k_sum, search_type, generator_name, generator_temperature, helper_name, helper_temperature, grading_mode="per_document"):
     
     class GraphState(TypedDict):
         """
@@ -72,69 +79,93 @@ def create_minimal_workflow(full_vectorstore, summaries_vectorstore,  k_sum, sea
         document_uuids: List[str]
         full_documents: List[str]
         filtered_summaries: List[str]
+        expired_in_store: int  # Expired projects in the whole store, not per query
+        query_cities: List[str]
+        intent: str
+        follow_up: bool
+        history: List[dict]
+        degraded: bool  # A failed step was skipped (e.g. a grader call); the answer is not cached
         
 
     
-    llm = ChatGroq(
-            model=generator_name,  
-           temperature=generator_temperature,
-            max_tokens=1000,
-            max_retries=3,
-
-        )
-    llm_checker = ChatGroq(
-            model=helper_name,
-            temperature=helper_temperature,
-            max_tokens=400,
-            max_retries=3,
-       )
-
-    llm_question_enricher = ChatGroq(
-            model=helper_name,
-            temperature=helper_temperature,
-            max_tokens=400,
-            max_retries=3,
-       )   
-
-
-
-        
-
-    
-
+    # Clients are shared between workflows and requests
+    llm = get_llm(generator_name, generator_temperature, 1000)
+    # Batch grading returns a list of UUIDs, which needs more room than a yes/no
+    llm_checker = get_llm(helper_name, helper_temperature, 1000 if grading_mode == "batch" else 400)
+
+    # Chains are built once per compiled graph instead of on every node call
+    retrieval_grader = retrieval_grader_grader(llm_checker, mode=grading_mode)
+    qa_chain = QA_chain(llm)
+    # Local chit-chat classification from the query embedding; the LLM only settles ambiguous questions
+    intent_classifier = None
+    if INTENT_CLASSIFIER == "embedding":
+        intent_classifier = get_intent_classifier(summaries_vectorstore.embeddings, format_retrieval_query)
 
     workflow = StateGraph(GraphState)
+
+    def add_node(name, func):
+        # Every node records its wall time and errors (app.services.metrics)
+        workflow.add_node(name, timed_node("chat", name, func))
     
-    # Define the nodes
-    workflow.add_node("ask_question", lambda state: ask_question(state))  
-    workflow.add_node("answer_chit_chat", lambda state: answer_chit_chat(state, llm))
-    workflow.add_node("retrieve_summaries", lambda state: retrieve_summaries(state, summaries_vectorstore,k_sum, search_type))
-    workflow.add_node(
+    # Define the nodes - async nodes are bound with partial so LangGraph awaits them under ainvoke
+    add_node("ask_question", lambda state: ask_question(state))  
+    add_node("answer_chit_chat", partial(answer_chit_chat, llm=llm))
+    add_node("answer_follow_up", partial(answer_follow_up, follow_up_chain=follow_up_chain(llm)))
+    add_node(
     "grade_summary_documents",
-    lambda state: grade_summary_documents(state, retrieval_grader_grader(llm_checker))
+    partial(grade_summary_documents, retrieval_grader=retrieval_grader, grading_mode=grading_mode)
 )
 
-    workflow.add_node("retrieve_full_documents", lambda state: retrieve_full_documents(state, full_vectorstore))
-    workflow.add_node("generate", lambda state: generate(state, QA_chain(llm)))
+    add_node("retrieve_full_documents", partial(retrieve_full_documents, full_vectorstore=full_vectorstore))
+    add_node("generate", partial(generate, QA_chain=qa_chain))
     
 
     # Build graph
     workflow.set_entry_point("ask_question")
-    workflow.add_conditional_edges(
-        "ask_question", # Coming FROM check_chit_chat node 
-        lambda state: check_chit_chat(state, llm), # Function directly returns "chit_chat" or "work_related"
-        {
-            "chit_chat": "answer_chit_chat", # If chit_chat, go to answer node
-            "work_related": "retrieve_summaries" # If work_related, start normal workflow
-        }
-    )
-    
+    if SPECULATIVE_EXECUTION:
+        # Retrieval (and grading) start alongside the chit-chat check and are dropped for chit-chat
+        add_node("classify_and_retrieve", partial(
+            classify_and_retrieve,
+            llm=llm,
+            intent_classifier=intent_classifier,
+            summaries_vectorstore=summaries_vectorstore,
+            k=k_sum,
+            search_type=search_type,
+            retrieval_grader=retrieval_grader if SPECULATIVE_GRADING else None,
+            grading_mode=grading_mode,
+        ))
+        workflow.add_conditional_edges(
+            "ask_question",
+            lambda state: "follow_up" if state.get("follow_up") else "new_question",
+            {"follow_up": "answer_follow_up", "new_question": "classify_and_retrieve"}
+        )
+        workflow.add_conditional_edges(
+            "classify_and_retrieve",
+            lambda state: state["intent"],
+            {
+                "chit_chat": "answer_chit_chat",
+                "work_related": "grade_summary_documents",
+                "graded": "retrieve_full_documents",
+            }
+        )
+    else:
+        add_node("retrieve_summaries", partial(retrieve_summaries, summaries_vectorstore=summaries_vectorstore, k=k_sum, search_type=search_type))
+        workflow.add_conditional_edges(
+            "ask_question", # Coming FROM check_chit_chat node 
+            partial(route_question, llm=llm, intent_classifier=intent_classifier), # Function directly returns "follow_up", "chit_chat" or "work_related"
+            {
+                "follow_up": "answer_follow_up", # Follow-ups are answered from the conversation's documents
+                "chit_chat": "answer_chit_chat", # If chit_chat, go to answer node
+                "work_related": "retrieve_summaries" # If work_related, start normal workflow
+            }
+        )
+        workflow.add_edge("retrieve_summaries", "grade_summary_documents")
     
-    workflow.add_edge("retrieve_summaries", "grade_summary_documents")
     workflow.add_edge("grade_summary_documents", "retrieve_full_documents")
     workflow.add_edge("retrieve_full_documents", "generate")
     
     workflow.add_edge("generate", END)
+    workflow.add_edge("answer_follow_up", END)
 
     
     custom_graph = workflow.compile()
@@ -144,7 +175,7 @@ def create_minimal_workflow(full_vectorstore, summaries_vectorstore,  k_sum, sea
 
 
 
-def create_direct_document_workflow(full_vectorstore, generator_name, generator_temperature, document_uuid):
+def create_direct_document_workflow(full_vectorstore, generator_name, generator_temperature):
     
     class GraphState(TypedDict):
         """
@@ -153,6 +184,7 @@ def create_direct_document_workflow(full_vectorstore, generator_name, generator_
             question: question
             generation: LLM generation
             documents: list of documents
+            document_uuid: the document to focus on, passed in per request
             document_uuids: List containing the specific document UUID to focus on
         """
         question: Annotated[str, "Single"]
@@ -165,19 +197,18 @@ def create_direct_document_workflow(full_vectorstore, generator_name, generator_
         decomposed_documents: dict[str, List[str]] 
         processed_question: Annotated[str, "Single"]
         sub_questions: List[str]
+        document_uuid: str
         document_uuids: List[str]
         full_documents: List[str]
         filtered_summaries: List[str]
+        document_context: str
+        history: List[dict]
     
     # Initialize LLM with the specified parameters
-    llm = ChatGroq(
-        model=generator_name,  
-        temperature=generator_temperature,
-        max_tokens=1000,
-        max_retries=3,
-    )
+    llm = get_llm(generator_name, generator_temperature, 1000)
+    qa_chain = document_QA_chain(llm)
 
-    # Function to initialize the state with the document UUID
+    # Function to initialize the state with the document UUID from the request
     def initialize_state(state):
         # Initialize all required fields to prevent KeyErrors
         if "document_uuids" not in state or state["document_uuids"] is None:
@@ -193,23 +224,33 @@ def create_direct_document_workflow(full_vectorstore, generator_name, generator_
         if "filtered_summaries" not in state:
             state["filtered_summaries"] = []
         
-        # Add the document UUID passed as parameter
-        state["document_uuids"].append(document_uuid)
+        # Add the document UUID passed in with the initial state
+        document_uuid = state.get("document_uuid")
+        if document_uuid and document_uuid not in state["document_uuids"]:
+            state["document_uuids"].append(document_uuid)
         logger.info(f"Initialized document focus workflow with UUID: {document_uuid}")
         return state
 
     workflow = StateGraph(GraphState)
+
+    def add_node(name, func):
+        workflow.add_node(name, timed_node("document", name, func))
     
     # Define the nodes
-    workflow.add_node("initialize", initialize_state)  
-    workflow.add_node("ask_question", lambda state: ask_question(state))  
-    workflow.add_node("retrieve_full_documents", lambda state: retrieve_full_documents(state, full_vectorstore))
-    workflow.add_node("generate", lambda state: generate(state, QA_chain(llm)))
+    add_node("initialize", initialize_state)  
+    add_node("ask_question", lambda state: ask_question(state))  
+    add_node("retrieve_full_documents", partial(retrieve_full_documents, full_vectorstore=full_vectorstore))
+    add_node("generate", partial(generate_document_answer, QA_chain=qa_chain))
     
     # Build graph
     workflow.set_entry_point("initialize")
     workflow.add_edge("initialize", "ask_question")
-    workflow.add_edge("ask_question", "retrieve_full_documents")
+    # A document session (app.services.document_sessions) passes the document in, so no store read is needed
+    workflow.add_conditional_edges(
+        "ask_question",
+        lambda state: "generate" if state.get("full_documents") else "retrieve_full_documents",
+        {"generate": "generate", "retrieve_full_documents": "retrieve_full_documents"}
+    )
     workflow.add_edge("retrieve_full_documents", "generate")
     workflow.add_edge("generate", END)
     
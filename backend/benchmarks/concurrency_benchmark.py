@@ -0,0 +1,129 @@
+"""
+Concurrency benchmark: latency of cheap endpoints while chats are in flight.
+
+Probes /health and /api/cities at a fixed interval, first with no other load
+(baseline) and then while N /api/chat requests are kept in flight. If the
+chat path blocks the event loop, the probe p99 under load jumps to the
+length of a Groq/Chroma call; if it is non-blocking it stays flat.
+
+Usage (against a running backend):
+    python -m benchmarks.concurrency_benchmark --base-url http://localhost:8000 --chats 8 --duration 30
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from typing import Dict, List
+
+import httpx
+
+PROBE_PATHS = ["/health", "/api/cities"]
+CHAT_MESSAGES = [
+    "Kokie objektai yra Klaipėdoje?",
+    "Ar yra stogo remonto darbų Vilniuje?",
+    "Kada baigiasi pasiūlymų pateikimas fasado remontui?",
+    "Kokie langų keitimo projektai yra aktualūs?",
+]
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of a list of values"""
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def summarize(latencies: List[float]) -> Dict[str, float]:
+    """Latency summary in milliseconds"""
+    return {
+        "count": len(latencies),
+        "mean_ms": round(statistics.mean(latencies) * 1000, 2) if latencies else float("nan"),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "max_ms": round(max(latencies) * 1000, 2) if latencies else float("nan"),
+    }
+
+
+async def probe(client: httpx.AsyncClient, path: str, interval: float, stop: asyncio.Event, latencies: List[float]):
+    """Hit path every interval seconds until stop is set, recording latencies"""
+    while not stop.is_set():
+        started = time.perf_counter()
+        try:
+            response = await client.get(path)
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - started)
+        except httpx.HTTPError as e:
+            print(f"Probe {path} failed: {e}")
+        await asyncio.sleep(interval)
+
+
+async def chat_worker(client: httpx.AsyncClient, worker_id: int, stop: asyncio.Event, latencies: List[float]):
+    """Keep one chat request in flight until stop is set"""
+    i = worker_id
+    while not stop.is_set():
+        message = CHAT_MESSAGES[i % len(CHAT_MESSAGES)]
+        i += 1
+        started = time.perf_counter()
+        try:
+            response = await client.post("/api/chat", json={"message": message}, timeout=300)
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - started)
+        except httpx.HTTPError as e:
+            print(f"Chat worker {worker_id} failed: {e}")
+            await asyncio.sleep(1)
+
+
+async def run_phase(base_url: str, chats: int, duration: float, interval: float) -> Dict[str, Dict[str, float]]:
+    """Run probes for duration seconds with the given number of concurrent chats"""
+    stop = asyncio.Event()
+    probe_latencies = {path: [] for path in PROBE_PATHS}
+    chat_latencies: List[float] = []
+
+    limits = httpx.Limits(max_connections=chats + len(PROBE_PATHS) + 4)
+    async with httpx.AsyncClient(base_url=base_url, timeout=60, limits=limits) as client:
+        tasks = [
+            asyncio.create_task(probe(client, path, interval, stop, probe_latencies[path]))
+            for path in PROBE_PATHS
+        ]
+        tasks += [
+            asyncio.create_task(chat_worker(client, worker_id, stop, chat_latencies))
+            for worker_id in range(chats)
+        ]
+        await asyncio.sleep(duration)
+        stop.set()
+        # Probes finish quickly; in-flight chats are cancelled rather than awaited
+        for task in tasks[len(PROBE_PATHS):]:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    result = {path: summarize(latencies) for path, latencies in probe_latencies.items()}
+    if chats:
+        result["/api/chat"] = summarize(chat_latencies)
+    return result
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--chats", type=int, default=8, help="Number of chat requests kept in flight")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds per phase")
+    parser.add_argument("--interval", type=float, default=0.05, help="Seconds between probe requests")
+    args = parser.parse_args()
+
+    print(f"Baseline phase ({args.duration}s, no chats)...")
+    baseline = await run_phase(args.base_url, 0, args.duration, args.interval)
+    print(f"Load phase ({args.duration}s, {args.chats} chats in flight)...")
+    loaded = await run_phase(args.base_url, args.chats, args.duration, args.interval)
+
+    print(json.dumps({"baseline": baseline, "under_load": loaded}, indent=2))
+    for path in PROBE_PATHS:
+        ratio = loaded[path]["p99_ms"] / baseline[path]["p99_ms"] if baseline[path]["p99_ms"] else float("nan")
+        print(f"{path}: p99 baseline={baseline[path]['p99_ms']}ms under load={loaded[path]['p99_ms']}ms ({ratio:.1f}x)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,147 @@
+"""
+Embedding backend benchmark: fp32 PyTorch vs ONNX Runtime (int8 or fp32) query embeddings.
+
+Each backend is loaded in its own fresh process, which reports load time, resident
+memory added by the model and per-query embedding latency. Retrieval agreement is
+measured on the stored collections: for every question the top-k rows returned for
+the ONNX query vector are compared with those for the fp32 vector (stored document
+vectors are left as they are, exactly as the API would use them).
+
+Export the ONNX model first (see app.vectorstore.onnx_embeddings), then run
+(from backend/, with docs/ and docs2/ in the working directory):
+    python -m benchmarks.embedding_backend_benchmark --onnx-dir models/e5-large-instruct-onnx --k 15
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import resource
+import statistics
+import time
+from typing import Dict, List
+
+QUESTIONS = [
+    "Kokie objektai yra Klaipėdoje?",
+    "Ar yra stogo remonto darbų Vilniuje?",
+    "Fasado remonto projektai Kaune",
+    "Langų keitimo darbai Klaipėdoje",
+    "Laiptinės remontas Vilniuje",
+    "Kokie šildymo sistemos darbai yra skelbiami?",
+    "Ar yra projektų Šilutėje?",
+    "Balkonų remontas",
+    "Kada baigiasi pasiūlymų pateikimas fasado remontui?",
+    "Kokie langų keitimo projektai yra aktualūs?",
+]
+
+COLLECTIONS = {
+    "summary": os.path.join("docs2", "chroma"),
+    "full": os.path.join("docs", "chroma"),
+}
+
+
+def rss_mb() -> float:
+    """Current resident set size of this process in MB"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # Peak RSS (KB on Linux) where /proc is not available
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def measure_backend(backend: str, onnx_dir: str, repeat: int, queue):
+    """Runs in a child process: load one backend and time query embeddings"""
+    import app.vectorstore.store as store
+    from app.workflows.workflow_functions import InstructRetriever, task_description
+
+    store.ONNX_MODEL_DIR = onnx_dir
+    queries = [InstructRetriever.get_detailed_instruct(task_description, q) for q in QUESTIONS]
+
+    rss_before = rss_mb()
+    started = time.perf_counter()
+    embeddings = store.create_embeddings(backend)
+    load_s = time.perf_counter() - started
+    embeddings.embed_query(queries[0])  # warm-up
+    rss_loaded = rss_mb()
+
+    latencies = []
+    for _ in range(repeat):
+        for query in queries:
+            started = time.perf_counter()
+            embeddings.embed_query(query)
+            latencies.append((time.perf_counter() - started) * 1000)
+    vectors = [embeddings.embed_query(query) for query in queries]
+
+    queue.put({
+        "backend": backend,
+        "model": getattr(embeddings, "model_path", store.EMBEDDING_MODEL_NAME),
+        "load_s": round(load_s, 2),
+        "rss_model_mb": round(rss_loaded - rss_before, 1),
+        "rss_total_mb": round(rss_mb(), 1),
+        "query_ms_p50": round(statistics.median(latencies), 2),
+        "query_ms_p95": round(percentile(latencies, 95), 2),
+        "query_ms_mean": round(statistics.fmean(latencies), 2),
+        "vectors": vectors,
+    })
+
+
+def run_in_fresh_process(backend: str, onnx_dir: str, repeat: int) -> Dict:
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    process = context.Process(target=measure_backend, args=(backend, onnx_dir, repeat, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def top_k_agreement(reference: List[List[float]], candidate: List[List[float]], k: int) -> Dict:
+    """Mean top-k overlap between queries with the reference and candidate vectors, per collection"""
+    import chromadb
+    import numpy as np
+
+    report = {
+        "mean_cosine_to_fp32": round(float(np.mean([
+            np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b)) for a, b in zip(reference, candidate)
+        ])), 5)
+    }
+    for name, path in COLLECTIONS.items():
+        collection = chromadb.PersistentClient(path=os.path.join(os.getcwd(), path)).get_collection("langchain")
+        n_results = min(k, collection.count())
+        expected = collection.query(query_embeddings=reference, n_results=n_results, include=[])["ids"]
+        actual = collection.query(query_embeddings=candidate, n_results=n_results, include=[])["ids"]
+        overlaps = [len(set(e) & set(a)) / n_results for e, a in zip(expected, actual)]
+        top1 = [bool(e) and bool(a) and e[0] == a[0] for e, a in zip(expected, actual)]
+        report[name] = {
+            f"top{n_results}_overlap_mean": round(statistics.fmean(overlaps), 3),
+            f"top{n_results}_overlap_min": round(min(overlaps), 3),
+            "top1_agreement": round(sum(top1) / len(top1), 3),
+        }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--onnx-dir", default=os.path.join("models", "e5-large-instruct-onnx"))
+    parser.add_argument("--k", type=int, default=15, help="Rows compared per query (k_sum in the chat workflow)")
+    parser.add_argument("--repeat", type=int, default=5, help="Passes over the question set for latency")
+    args = parser.parse_args()
+
+    results = {backend: run_in_fresh_process(backend, args.onnx_dir, args.repeat) for backend in ("torch", "onnx")}
+    reference = results["torch"].pop("vectors")
+    candidate = results["onnx"].pop("vectors")
+    results["onnx"]["agreement_vs_fp32"] = top_k_agreement(reference, candidate, args.k)
+    print(json.dumps(results, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
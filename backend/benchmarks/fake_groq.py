@@ -0,0 +1,223 @@
+"""
+Fake Groq: a local stand-in for Groq's OpenAI-compatible chat completions API.
+
+Answers the prompts the workflow sends without calling Groq:
+  - relevance grading (tool call GradeDocuments, and the batch grader's JSON)
+    decided deterministically from hash(question, document uuid), so per-document
+    and batch grading agree and runs are reproducible
+  - the chit-chat classifier ("work_related")
+  - everything else gets a filler answer of --answer-tokens tokens
+Latency is time-to-first-token drawn from a log-normal distribution plus
+completion tokens at --tokens-per-s; streaming is supported. 429s can be injected
+at random (--error-429-rate) or by an RPM limit (--rpm), with Retry-After set the
+way Groq does, so client retries are exercised.
+
+Usage:
+    python -m benchmarks.fake_groq --port 9000 --ttft-ms 250 --tokens-per-s 400
+    GROQ_API_BASE=http://127.0.0.1:9000 GROQ_API_KEY=fake uvicorn app.main:app
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import random
+import re
+import time
+import uuid
+from collections import Counter, deque
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+UUID_PATTERN = re.compile(r"uuid'?:\s*'?([0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12})")
+QUESTION_PATTERN = re.compile(r"Klausimas:\s*(.*?)\s*\n")
+CLASSIFIER_MARKER = '"chit_chat" arba "work_related"'
+BATCH_MARKER = "relevant_uuids"
+
+config = argparse.Namespace(
+    ttft_ms=250.0, ttft_sigma=0.4, tokens_per_s=400.0, error_429_rate=0.0, rpm=0,
+    relevant_ratio=0.5, answer_tokens=150, seed=0,
+)
+stats = Counter()
+rng = random.Random(0)
+request_times: deque = deque()
+
+app = FastAPI(title="Fake Groq")
+
+
+def is_relevant(question: str, key: str) -> bool:
+    """Deterministic grading decision for a (question, document) pair"""
+    digest = hashlib.sha256(f"{question}\x00{key}".encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") / 2 ** 64 < config.relevant_ratio
+
+
+def count_tokens(text: str) -> int:
+    # Rough BPE estimate; only used for usage numbers and latency
+    return max(1, math.ceil(len(text) / 4))
+
+
+def prompt_text(messages: List[Dict[str, Any]]) -> str:
+    parts = []
+    for message in messages:
+        content = message.get("content")
+        if isinstance(content, list):
+            content = " ".join(part.get("text", "") for part in content if isinstance(part, dict))
+        parts.append(content or "")
+    return "\n".join(parts)
+
+
+def build_answer(body: Dict[str, Any]) -> Dict[str, Any]:
+    """Decide what to answer: {"kind", "content", "tool_call"}"""
+    prompt = prompt_text(body.get("messages", []))
+    match = QUESTION_PATTERN.search(prompt)
+    question = match.group(1) if match else ""
+
+    tools = body.get("tools") or []
+    if tools:
+        uuids = UUID_PATTERN.findall(prompt)
+        relevant = is_relevant(question, uuids[0] if uuids else prompt)
+        name = tools[0]["function"]["name"]
+        return {"kind": "grade", "content": None,
+                "tool_call": {"name": name, "arguments": json.dumps({"binary_score": "yes" if relevant else "no"})}}
+
+    if BATCH_MARKER in prompt and UUID_PATTERN.search(prompt):
+        uuids = list(dict.fromkeys(UUID_PATTERN.findall(prompt)))
+        selected = [doc_uuid for doc_uuid in uuids if is_relevant(question, doc_uuid)]
+        return {"kind": "batch_grade", "content": json.dumps({"relevant_uuids": selected}), "tool_call": None}
+
+    if CLASSIFIER_MARKER in prompt:
+        return {"kind": "classify", "content": "work_related", "tool_call": None}
+
+    words = ["Pagal", "pateiktus", "dokumentus", "projektas", "apima", "darbus", "objekte", "terminas"]
+    content = " ".join(words[i % len(words)] for i in range(config.answer_tokens))
+    return {"kind": "answer", "content": content, "tool_call": None}
+
+
+def rate_limited() -> Optional[JSONResponse]:
+    """A Groq-style 429 when the RPM limit is hit or a random 429 is injected"""
+    now = time.monotonic()
+    while request_times and now - request_times[0] > 60:
+        request_times.popleft()
+    over_limit = config.rpm and len(request_times) >= config.rpm
+    if not over_limit:
+        request_times.append(now)
+    if over_limit or rng.random() < config.error_429_rate:
+        stats["rate_limited"] += 1
+        retry_after = max(1, math.ceil(60 - (now - request_times[0]))) if over_limit else 1
+        return JSONResponse(
+            status_code=429,
+            headers={"retry-after": str(retry_after)},
+            content={"error": {"message": "Rate limit reached (fake)", "type": "requests",
+                               "code": "rate_limit_exceeded"}},
+        )
+    return None
+
+
+def completion_latency(completion_tokens: int) -> Tuple[float, float]:
+    """(time to first token, generation time) in seconds"""
+    ttft = rng.lognormvariate(math.log(config.ttft_ms / 1000.0), config.ttft_sigma)
+    return ttft, completion_tokens / config.tokens_per_s
+
+
+@app.post("/openai/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    stats["requests"] += 1
+    limited = rate_limited()
+    if limited is not None:
+        return limited
+
+    answer = build_answer(body)
+    stats[answer["kind"]] += 1
+    prompt_tokens = count_tokens(prompt_text(body.get("messages", [])))
+    output = answer["content"] if answer["content"] is not None else answer["tool_call"]["arguments"]
+    completion_tokens = count_tokens(output)
+    stats["prompt_tokens"] += prompt_tokens
+    stats["completion_tokens"] += completion_tokens
+    usage = {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+             "total_tokens": prompt_tokens + completion_tokens}
+
+    completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+    created = int(time.time())
+    model = body.get("model", "fake")
+    tool_calls = None
+    if answer["tool_call"]:
+        tool_calls = [{"index": 0, "id": f"call_{uuid.uuid4().hex[:12]}", "type": "function",
+                       "function": answer["tool_call"]}]
+    finish_reason = "tool_calls" if tool_calls else "stop"
+    ttft, generation = completion_latency(completion_tokens)
+
+    if not body.get("stream"):
+        await asyncio.sleep(ttft + generation)
+        message = {"role": "assistant", "content": answer["content"]}
+        if tool_calls:
+            message["tool_calls"] = [{k: v for k, v in call.items() if k != "index"} for call in tool_calls]
+        return {
+            "id": completion_id, "object": "chat.completion", "created": created, "model": model,
+            "choices": [{"index": 0, "message": message, "finish_reason": finish_reason, "logprobs": None}],
+            "usage": usage, "system_fingerprint": "fake_groq", "x_groq": {"id": f"req_{completion_id}"},
+        }
+
+    async def events():
+        def chunk(delta, finish=None, extra=None):
+            payload = {"id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                       "choices": [{"index": 0, "delta": delta, "finish_reason": finish, "logprobs": None}],
+                       "system_fingerprint": "fake_groq"}
+            payload.update(extra or {})
+            return f"data: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+        await asyncio.sleep(ttft)
+        yield chunk({"role": "assistant", "content": ""})
+        if tool_calls:
+            await asyncio.sleep(generation)
+            yield chunk({"tool_calls": tool_calls})
+        else:
+            words = answer["content"].split(" ")
+            delay = generation / max(1, len(words))
+            for i, word in enumerate(words):
+                await asyncio.sleep(delay)
+                yield chunk({"content": word if i == 0 else f" {word}"})
+        yield chunk({}, finish_reason, {"x_groq": {"id": f"req_{completion_id}", "usage": usage}})
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+@app.get("/stats")
+async def get_stats():
+    return dict(stats)
+
+
+@app.post("/stats/reset")
+async def reset_stats():
+    stats.clear()
+    return {"reset": True}
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--ttft-ms", type=float, default=config.ttft_ms, help="Median time to first token")
+    parser.add_argument("--ttft-sigma", type=float, default=config.ttft_sigma, help="Log-normal sigma of TTFT")
+    parser.add_argument("--tokens-per-s", type=float, default=config.tokens_per_s, help="Completion token rate")
+    parser.add_argument("--error-429-rate", type=float, default=config.error_429_rate,
+                        help="Probability of answering any request with 429")
+    parser.add_argument("--rpm", type=int, default=config.rpm, help="Requests per minute before 429s (0 = no limit)")
+    parser.add_argument("--relevant-ratio", type=float, default=config.relevant_ratio,
+                        help="Share of documents graded relevant")
+    parser.add_argument("--answer-tokens", type=int, default=config.answer_tokens)
+    parser.add_argument("--seed", type=int, default=config.seed, help="Seed for latency and 429 sampling")
+    args = parser.parse_args()
+
+    vars(config).update({key: value for key, value in vars(args).items() if key in vars(config)})
+    rng.seed(args.seed)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+Grading benchmark: per-document vs batch vs cross-encoder relevance grading.
+
+For a fixed question set, retrieves the top-k summaries once and grades them with
+each selected mode of grade_summary_documents, reporting wall-clock latency, LLM
+calls, prompt/completion tokens and how often each mode agrees with the
+per-document grader. LLM modes call the real Groq API (GROQ_API_KEY must be set).
+
+Usage (from backend/, with docs/ and docs2/ in the working directory):
+    python -m benchmarks.grading_benchmark --k 15 --repeat 1 --modes per_document batch cross_encoder
+"""
+import argparse
+import asyncio
+import json
+import time
+from typing import Dict, List
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.documents import Document
+from langchain_groq import ChatGroq
+
+from app.vectorstore.store import get_vectorstore
+from app.workflows.checkers import GRADING_MODES, retrieval_grader_grader
+from app.workflows.workflow_functions import grade_summary_documents, retrieve_summaries
+
+QUESTIONS = [
+    "Kokie objektai yra Klaipėdoje?",
+    "Ar yra stogo remonto darbų Vilniuje?",
+    "Fasado remonto projektai Kaune",
+    "Langų keitimo darbai Klaipėdoje",
+    "Laiptinės remontas Vilniuje",
+    "Kokie šildymo sistemos darbai yra skelbiami?",
+    "Ar yra projektų Šilutėje?",
+    "Balkonų remontas",
+]
+
+DEADLINE_FIELDS = ("Pasiulyma_pateikti_iki", "Pateikti_projekta_iki", "pateikti_iki")
+
+
+class TokenCounter(BaseCallbackHandler):
+    """Counts LLM calls and token usage reported by ChatGroq"""
+
+    def __init__(self):
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+    def on_llm_end(self, response, **kwargs):
+        self.calls += 1
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        self.prompt_tokens += usage.get("prompt_tokens", 0)
+        self.completion_tokens += usage.get("completion_tokens", 0)
+
+
+async def grade(question: str, documents: List[Document], mode: str, model: str) -> Dict:
+    """Grade documents for question with a fresh, instrumented grader"""
+    counter = TokenCounter()
+    llm = ChatGroq(
+        model=model,
+        temperature=0.1,
+        max_tokens=1000 if mode == "batch" else 400,
+        max_retries=3,
+        callbacks=[counter],
+    )
+    state = {"question": question, "documents": documents, "steps": []}
+
+    started = time.perf_counter()
+    result = await grade_summary_documents(state, retrieval_grader_grader(llm, mode=mode), grading_mode=mode)
+    elapsed = time.perf_counter() - started
+
+    return {
+        "latency_s": elapsed,
+        "calls": counter.calls,
+        "prompt_tokens": counter.prompt_tokens,
+        "completion_tokens": counter.completion_tokens,
+        "relevant": set(result["document_uuids"]),
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--k", type=int, default=15, help="Summaries retrieved per question")
+    parser.add_argument("--model", default="meta-llama/llama-4-maverick-17b-128e-instruct")
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per question and mode")
+    parser.add_argument("--modes", nargs="+", default=["per_document", "batch"], choices=GRADING_MODES,
+                        help="Grading modes to compare; per_document is always run as the reference")
+    parser.add_argument("--ignore-deadlines", action="store_true",
+                        help="Strip deadline metadata so expired summaries are graded too")
+    args = parser.parse_args()
+
+    summaries_vectorstore = get_vectorstore(store_type="summary")
+    modes = ["per_document"] + [mode for mode in args.modes if mode != "per_document"]
+    totals = {mode: {"latency_s": 0.0, "calls": 0, "prompt_tokens": 0, "completion_tokens": 0}
+              for mode in modes}
+    agreement = {mode: {"graded": 0, "agreed": 0, "both": 0, "reference": 0, "selected": 0}
+                 for mode in modes[1:]}
+
+    for question in QUESTIONS:
+        retrieved = await retrieve_summaries({"question": question, "steps": []}, summaries_vectorstore, args.k, "similarity")
+        documents = retrieved["documents"]
+        if args.ignore_deadlines:
+            documents = [
+                Document(page_content=doc.page_content,
+                         metadata={k: v for k, v in doc.metadata.items() if k not in DEADLINE_FIELDS})
+                for doc in documents
+            ]
+        universe = {doc.metadata.get("uuid") for doc in documents if doc.metadata.get("uuid")}
+
+        for _ in range(args.repeat):
+            results = {}
+            for mode in totals:
+                results[mode] = await grade(question, documents, mode, args.model)
+                for key in ("latency_s", "calls", "prompt_tokens", "completion_tokens"):
+                    totals[mode][key] += results[mode][key]
+
+            reference = results["per_document"]["relevant"]
+            for mode, counts in agreement.items():
+                selected = results[mode]["relevant"]
+                counts["graded"] += len(universe)
+                counts["agreed"] += len(universe) - len(reference ^ selected)
+                counts["both"] += len(reference & selected)
+                counts["reference"] += len(reference)
+                counts["selected"] += len(selected)
+            print(f"{question!r}: " + ", ".join(
+                f"{mode}={len(results[mode]['relevant'])} ({results[mode]['latency_s']:.3f}s)" for mode in modes
+            ))
+
+    runs = len(QUESTIONS) * args.repeat
+    report = {
+        mode: {
+            "mean_latency_s": round(values["latency_s"] / runs, 3),
+            "calls_per_question": round(values["calls"] / runs, 2),
+            "prompt_tokens_per_question": round(values["prompt_tokens"] / runs, 1),
+            "completion_tokens_per_question": round(values["completion_tokens"] / runs, 1),
+        }
+        for mode, values in totals.items()
+    }
+    for mode, counts in agreement.items():
+        report[mode]["agreement_vs_per_document"] = {
+            "documents_graded": counts["graded"],
+            "decision_agreement": round(counts["agreed"] / counts["graded"], 3) if counts["graded"] else None,
+            "precision": round(counts["both"] / counts["selected"], 3) if counts["selected"] else None,
+            "recall": round(counts["both"] / counts["reference"], 3) if counts["reference"] else None,
+        }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
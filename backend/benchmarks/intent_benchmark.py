@@ -0,0 +1,163 @@
+"""
+Intent benchmark: chit-chat classification latency and accuracy on a labelled question set.
+
+Modes:
+  legacy     the previous classifier: substring greeting patterns, then the LLM
+  llm        whole-word greeting check, then the LLM (INTENT_CLASSIFIER=llm)
+  embedding  whole-word greeting check, then the embedding classifier with no LLM
+             fallback (ambiguous questions take the closer label)
+  hybrid     whole-word greeting check, embedding classifier, LLM only when ambiguous
+             (the default, INTENT_CLASSIFIER=embedding)
+
+Every question is embedded fresh (no query-cache hit), so embedding latencies are the
+worst case; in the API the vector is usually already cached by the answer cache lookup.
+LLM modes call the real Groq API (GROQ_API_KEY must be set, or point GROQ_API_BASE
+at benchmarks.fake_groq, which always answers work_related).
+
+Usage (from backend/):
+    python -m benchmarks.intent_benchmark --modes legacy llm embedding hybrid
+    python -m benchmarks.intent_benchmark --modes embedding --margin 0.03
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from typing import Dict, List
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from app.vectorstore.embedding_cache import CachedQueryEmbeddings
+from app.vectorstore.store import EMBEDDING_BACKEND, create_embeddings
+from app.workflows.checkers import check_chit_chat, classify_with_llm
+from app.workflows.intent_classifier import CHIT_CHAT, WORK_RELATED, EmbeddingIntentClassifier, is_greeting
+from app.workflows.llms import get_llm
+from app.workflows.workflow_functions import format_retrieval_query
+
+MODES = ("legacy", "llm", "embedding", "hybrid")
+
+# Not taken from the classifier's prototypes; includes words that contain "hi"/"hey"
+LABELLED_QUESTIONS = [
+    ("Labas!", CHIT_CHAT),
+    ("Sveiki, kaip sekasi?", CHIT_CHAT),
+    ("Labas rytas", CHIT_CHAT),
+    ("Kaip tau einasi šiandien?", CHIT_CHAT),
+    ("Ar gali papasakoti juokelį?", CHIT_CHAT),
+    ("Kuo tu vardu?", CHIT_CHAT),
+    ("Kokia bus rytoj orų prognozė Vilniuje?", CHIT_CHAT),
+    ("Kas parašė Anykščių šilelį?", CHIT_CHAT),
+    ("Kiek gyventojų turi Kaunas?", CHIT_CHAT),
+    ("Ar mėgsti muziką?", CHIT_CHAT),
+    ("Ką rekomenduotum pažiūrėti vakare?", CHIT_CHAT),
+    ("Hey, what's up?", CHIT_CHAT),
+    ("Who are you?", CHIT_CHAT),
+    ("Ačiū, viso gero", CHIT_CHAT),
+    ("Kokia tavo nuomonė apie dirbtinį intelektą?", CHIT_CHAT),
+    ("Kas laimėjo Eurovizijos konkursą?", CHIT_CHAT),
+    ("Kokie objektai yra Vilniuje?", WORK_RELATED),
+    ("Ar yra hidroizoliacijos darbų Kaune?", WORK_RELATED),
+    ("Chemijos laboratorijos patalpų remontas", WORK_RELATED),
+    ("Architektūrinio apšvietimo įrengimo konkursai", WORK_RELATED),
+    ("Šilutės pl. daugiabučio stogo remontas", WORK_RELATED),
+    ("Reikia šildymo mazgo keitimo darbų Klaipėdoje", WORK_RELATED),
+    ("Kokie projektai baigiasi šį mėnesį?", WORK_RELATED),
+    ("Ar yra fasado šiltinimo užsakymų Alytuje?", WORK_RELATED),
+    ("Rūsio hidroizoliacija ir drenažas", WORK_RELATED),
+    ("Kas užsako laiptinių dažymą?", WORK_RELATED),
+    ("Kiek laiko liko pateikti pasiūlymą stogo remontui?", WORK_RELATED),
+    ("Vėdinimo sistemos įrengimas mokykloje", WORK_RELATED),
+    ("Show me heating system tenders in Kaunas", WORK_RELATED),
+    ("Balkonų stiklinimo darbai Marijampolėje", WORK_RELATED),
+    ("Ar yra šaligatvio trinkelių klojimo darbų?", WORK_RELATED),
+    ("Kokie reikalavimai rangovui renovacijos konkurse?", WORK_RELATED),
+]
+
+# The substring patterns of the previous classifier
+LEGACY_PATTERNS = [
+    "labas", "hi", "hello", "sveiki", "laba diena", "kaip sekasi",
+    "how are you", "sveikas", "heyo", "hey", "hola"
+]
+
+
+class CallCounter(BaseCallbackHandler):
+    def __init__(self):
+        self.calls = 0
+
+    def on_llm_end(self, response, **kwargs):
+        self.calls += 1
+
+
+async def legacy_classify(question: str, llm) -> str:
+    question_lower = question.lower().strip()
+    if any(pattern in question_lower for pattern in LEGACY_PATTERNS):
+        return CHIT_CHAT
+    return await classify_with_llm(question, llm)
+
+
+async def classify(mode: str, question: str, llm, classifier: EmbeddingIntentClassifier) -> str:
+    if mode == "legacy":
+        return await legacy_classify(question, llm)
+    if mode == "embedding":
+        if is_greeting(question):
+            return CHIT_CHAT
+        _, gap = classifier.classify(question)
+        return CHIT_CHAT if gap > 0 else WORK_RELATED
+    state = {"question": question, "steps": []}
+    return await check_chit_chat(state, llm, classifier if mode == "hybrid" else None)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modes", nargs="+", default=list(MODES), choices=MODES)
+    parser.add_argument("--model", default="meta-llama/llama-4-maverick-17b-128e-instruct")
+    parser.add_argument("--backend", default=EMBEDDING_BACKEND, help="Embedding backend: torch or onnx")
+    parser.add_argument("--margin", type=float, help="Override INTENT_CONFIDENCE_MARGIN")
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per question and mode")
+    args = parser.parse_args()
+
+    counter = CallCounter()
+    llm = get_llm(args.model, 0.1, 1000).with_config(callbacks=[counter])
+
+    # max_size=0 keeps nothing, so every question pays for its embedding
+    embeddings = CachedQueryEmbeddings(create_embeddings(args.backend), max_size=0)
+    classifier = EmbeddingIntentClassifier(embeddings, format_retrieval_query)
+    if args.margin is not None:
+        classifier.margin = args.margin
+    started = time.perf_counter()
+    classifier.prototypes()
+    print(f"Embedded intent prototypes in {time.perf_counter() - started:.2f}s")
+
+    report: Dict[str, Dict] = {}
+    for mode in args.modes:
+        latencies: List[float] = []
+        correct = 0
+        errors = []
+        counter.calls = 0
+        for _ in range(args.repeat):
+            for question, expected in LABELLED_QUESTIONS:
+                started = time.perf_counter()
+                label = await classify(mode, question, llm, classifier)
+                latencies.append(time.perf_counter() - started)
+                if label == expected:
+                    correct += 1
+                else:
+                    errors.append({"question": question, "expected": expected, "got": label})
+
+        runs = len(LABELLED_QUESTIONS) * args.repeat
+        latencies.sort()
+        report[mode] = {
+            "accuracy": round(correct / runs, 3),
+            "mean_ms": round(statistics.mean(latencies) * 1000, 1),
+            "p50_ms": round(latencies[len(latencies) // 2] * 1000, 1),
+            "p95_ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000, 1),
+            "llm_calls_per_question": round(counter.calls / runs, 2),
+            "misclassified": errors[:len(LABELLED_QUESTIONS)],
+        }
+        print(f"{mode}: accuracy={report[mode]['accuracy']} mean={report[mode]['mean_ms']}ms "
+              f"llm_calls/question={report[mode]['llm_calls_per_question']}")
+
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
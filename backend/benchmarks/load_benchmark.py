@@ -0,0 +1,240 @@
+"""
+Load benchmark: open-loop traffic against the chat, document and project endpoints.
+
+Requests arrive at --rps (Poisson arrivals by default) for --duration seconds,
+split across endpoints by --mix. Reports achieved rate, throughput, p50/p95/p99
+latency and errors per endpoint. Chat requests go through /api/chat/stream
+(NDJSON) so each workflow step's completion time is observed: the report has a
+per-stage breakdown and time to first answer token. Use --chat-endpoint plain to
+hit /api/chat instead.
+
+Run the backend against the fake Groq server to measure offline:
+    python -m benchmarks.fake_groq --port 9000 &
+    GROQ_API_BASE=http://127.0.0.1:9000 GROQ_API_KEY=fake uvicorn app.main:app &
+    python -m benchmarks.load_benchmark --rps 5 --duration 60 --fake-groq-url http://127.0.0.1:9000
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional
+
+import httpx
+
+from benchmarks.concurrency_benchmark import summarize
+
+CHAT_MESSAGES = [
+    "Kokie objektai yra Klaipėdoje?",
+    "Ar yra stogo remonto darbų Vilniuje?",
+    "Fasado remonto projektai Kaune",
+    "Langų keitimo darbai Klaipėdoje",
+    "Laiptinės remontas Vilniuje",
+    "Kokie šildymo sistemos darbai yra skelbiami?",
+]
+DOCUMENT_MESSAGES = [
+    "Kada baigiasi pasiūlymų pateikimas?",
+    "Kokie darbai numatyti?",
+    "Kas yra užsakovas?",
+]
+ENDPOINTS = ("chat", "document", "cities", "recent")
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, Counter] = defaultdict(Counter)
+        self.stages: Dict[str, List[float]] = defaultdict(list)
+        self.first_token: List[float] = []
+        self.skipped = Counter()
+        self.document_ids: List[str] = []
+
+    def ok(self, endpoint: str, latency: float):
+        self.latencies[endpoint].append(latency)
+
+    def error(self, endpoint: str, reason: str):
+        self.errors[endpoint][reason] += 1
+
+    def learn_documents(self, summary_documents):
+        for document in summary_documents or []:
+            doc_uuid = (document.get("metadata") or {}).get("uuid")
+            if doc_uuid and doc_uuid not in self.document_ids:
+                self.document_ids.append(doc_uuid)
+
+
+async def chat_stream(client: httpx.AsyncClient, recorder: Recorder, message: str):
+    started = time.perf_counter()
+    previous = started
+    stage_times = {}
+    async with client.stream("POST", "/api/chat/stream", json={"message": message},
+                             headers={"Accept": "application/x-ndjson"}) as response:
+        if response.status_code != 200:
+            recorder.error("chat", str(response.status_code))
+            return
+        async for line in response.aiter_lines():
+            if not line:
+                continue
+            event = json.loads(line)
+            now = time.perf_counter()
+            if event["event"] == "step":
+                stage_times[event["data"]["node"]] = now - previous
+                previous = now
+            elif event["event"] == "token" and "__first_token__" not in stage_times:
+                stage_times["__first_token__"] = now - started
+            elif event["event"] == "done":
+                recorder.ok("chat", now - started)
+                recorder.learn_documents(event["data"].get("summary_documents"))
+                for stage, seconds in stage_times.items():
+                    if stage == "__first_token__":
+                        recorder.first_token.append(seconds)
+                    else:
+                        recorder.stages[stage].append(seconds)
+                return
+            elif event["event"] == "error":
+                recorder.error("chat", "stream_error")
+                return
+    recorder.error("chat", "incomplete_stream")
+
+
+async def send(client: httpx.AsyncClient, recorder: Recorder, endpoint: str, args, rng: random.Random, number: int):
+    started = time.perf_counter()
+    message = rng.choice(CHAT_MESSAGES)
+    if args.unique_messages:
+        # Defeat the answer and embedding caches so every chat runs the full workflow
+        message = f"{message} (#{number})"
+    try:
+        if endpoint == "chat" and args.chat_endpoint == "stream":
+            await chat_stream(client, recorder, message)
+            return
+        if endpoint == "chat":
+            response = await client.post("/api/chat", json={"message": message})
+            if response.status_code == 200:
+                recorder.learn_documents(response.json().get("summary_documents"))
+        elif endpoint == "document":
+            response = await client.post("/api/document", json={
+                "message": rng.choice(DOCUMENT_MESSAGES), "document_id": rng.choice(recorder.document_ids)
+            })
+        elif endpoint == "cities":
+            response = await client.get("/api/cities")
+        else:
+            response = await client.get("/api/recent-projects")
+
+        if response.status_code == 200:
+            recorder.ok(endpoint, time.perf_counter() - started)
+        else:
+            recorder.error(endpoint, str(response.status_code))
+    except httpx.HTTPError as e:
+        recorder.error(endpoint, type(e).__name__)
+
+
+async def seed_document_ids(client: httpx.AsyncClient, recorder: Recorder, document_ids: Optional[List[str]]):
+    """Document ids for /api/document: given, from recent projects, or learned from chat answers"""
+    if document_ids:
+        recorder.document_ids.extend(document_ids)
+        return
+    try:
+        response = await client.get("/api/recent-projects")
+        # "id" is the project's UUID; projects stored without one get a "project-<n>" placeholder
+        recorder.document_ids.extend(
+            p["id"] for p in response.json().get("projects", []) if p.get("id") and not p["id"].startswith("project-")
+        )
+    except (httpx.HTTPError, ValueError, KeyError):
+        pass
+
+
+def parse_mix(value: str) -> Dict[str, float]:
+    mix = {}
+    for part in value.split(","):
+        name, weight = part.split("=")
+        if name not in ENDPOINTS:
+            raise argparse.ArgumentTypeError(f"Unknown endpoint {name}, expected one of {ENDPOINTS}")
+        mix[name] = float(weight)
+    return mix
+
+
+async def run(args) -> Dict:
+    rng = random.Random(args.seed)
+    recorder = Recorder()
+    limits = httpx.Limits(max_connections=args.max_in_flight + 8)
+    in_flight = set()
+    arrivals = Counter()
+
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits) as client:
+        await seed_document_ids(client, recorder, args.document_ids)
+        endpoints, weights = zip(*args.mix.items())
+
+        started = time.perf_counter()
+        next_arrival = started
+        while next_arrival - started < args.duration:
+            await asyncio.sleep(max(0.0, next_arrival - time.perf_counter()))
+            endpoint = rng.choices(endpoints, weights)[0]
+            if endpoint == "document" and not recorder.document_ids:
+                recorder.skipped["document_no_ids"] += 1
+            elif len(in_flight) >= args.max_in_flight:
+                recorder.skipped["max_in_flight"] += 1
+            else:
+                arrivals[endpoint] += 1
+                task = asyncio.create_task(send(client, recorder, endpoint, args, rng, sum(arrivals.values())))
+                in_flight.add(task)
+                task.add_done_callback(in_flight.discard)
+            interval = rng.expovariate(args.rps) if args.arrival == "poisson" else 1.0 / args.rps
+            next_arrival += interval
+
+        send_window = time.perf_counter() - started
+        if in_flight:
+            await asyncio.wait(in_flight, timeout=args.timeout)
+        elapsed = time.perf_counter() - started
+
+        fake_groq_stats = None
+        if args.fake_groq_url:
+            try:
+                fake_groq_stats = httpx.get(f"{args.fake_groq_url}/stats").json()
+            except httpx.HTTPError as e:
+                fake_groq_stats = {"error": str(e)}
+
+    completed = sum(len(latencies) for latencies in recorder.latencies.values())
+    report = {
+        "target_rps": args.rps,
+        "achieved_rps": round(sum(arrivals.values()) / send_window, 2),
+        "throughput_rps": round(completed / elapsed, 2),
+        "elapsed_s": round(elapsed, 1),
+        "skipped": dict(recorder.skipped),
+        "endpoints": {
+            endpoint: {
+                "sent": arrivals[endpoint],
+                "errors": dict(recorder.errors[endpoint]),
+                **summarize(recorder.latencies[endpoint]),
+            }
+            for endpoint in args.mix if arrivals[endpoint]
+        },
+    }
+    if recorder.stages:
+        report["chat_stages"] = {stage: summarize(values) for stage, values in recorder.stages.items()}
+        report["chat_first_token"] = summarize(recorder.first_token)
+    if fake_groq_stats is not None:
+        report["fake_groq"] = fake_groq_stats
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--rps", type=float, default=2.0, help="Target request rate across all endpoints")
+    parser.add_argument("--duration", type=float, default=60.0, help="Seconds to send traffic")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("chat=0.6,document=0.2,cities=0.1,recent=0.1"))
+    parser.add_argument("--arrival", choices=["poisson", "uniform"], default="poisson")
+    parser.add_argument("--chat-endpoint", choices=["stream", "plain"], default="stream")
+    parser.add_argument("--unique-messages", action="store_true", help="Make every chat message distinct")
+    parser.add_argument("--document-ids", nargs="*", help="Document UUIDs for /api/document")
+    parser.add_argument("--max-in-flight", type=int, default=200, help="Arrivals beyond this are skipped")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--fake-groq-url", help="Fetch request/token/429 counts from the fake Groq server")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Startup benchmark: how long until the API is importable, live and ready.
+
+For each run a fresh uvicorn process is started and polled:
+  - import_s: time to import app.main in a clean interpreter (and which heavy
+    modules that import pulls in - ideally none)
+  - live_s: process start until /health/live answers (port usable)
+  - ready_s: process start until /health/ready answers 200
+  - per-component load timings reported by /health/ready
+Track the JSON output across releases to catch cold-start regressions.
+
+Usage (from backend/, with docs/ and docs2/ in the working directory):
+    python -m benchmarks.startup_benchmark --runs 3
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional
+
+import httpx
+
+HEAVY_MODULES = ["torch", "transformers", "sentence_transformers", "chromadb", "langgraph",
+                 "langchain_groq", "langchain_community", "IPython"]
+
+IMPORT_PROBE = f"""
+import json, sys, time
+started = time.perf_counter()
+import app.main
+elapsed = time.perf_counter() - started
+print(json.dumps({{"import_s": elapsed, "heavy_modules": [m for m in {HEAVY_MODULES!r} if m in sys.modules]}}))
+"""
+
+
+def measure_import() -> Dict:
+    output = subprocess.run([sys.executable, "-c", IMPORT_PROBE], capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for(client: httpx.Client, url: str, started: float, timeout: float) -> Optional[float]:
+    """
+    Seconds since started until url answers 200, or None on timeout or once a
+    required component reports that it failed to load
+    """
+    while time.perf_counter() - started < timeout:
+        try:
+            response = client.get(url)
+            if response.status_code == 200:
+                return time.perf_counter() - started
+            components = response.json().get("components", {}) if response.status_code == 503 else {}
+            if any(c["required"] and c["status"] == "failed" for c in components.values()):
+                return None
+        except httpx.TransportError:
+            pass
+        time.sleep(0.05)
+    return None
+
+
+def measure_server(timeout: float) -> Dict:
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        env={**os.environ, "PYTHONUNBUFFERED": "1"},
+    )
+    try:
+        with httpx.Client(timeout=5.0) as client:
+            live_s = wait_for(client, f"{base_url}/health/live", started, timeout)
+            ready_s = wait_for(client, f"{base_url}/health/ready", started, timeout)
+            components = client.get(f"{base_url}/health/ready").json()["components"] if live_s else {}
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+    return {"live_s": live_s, "ready_s": ready_s, "components": components}
+
+
+def median(values: List[Optional[float]]) -> Optional[float]:
+    values = [value for value in values if value is not None]
+    return round(statistics.median(values), 3) if values else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--timeout", type=float, default=300.0, help="Seconds to wait for readiness per run")
+    args = parser.parse_args()
+
+    imports = [measure_import() for _ in range(args.runs)]
+    servers = []
+    for run in range(args.runs):
+        servers.append(measure_server(args.timeout))
+        print(f"run {run + 1}: import={imports[run]['import_s']:.3f}s live={servers[-1]['live_s']} ready={servers[-1]['ready_s']}")
+
+    component_names = {name for server in servers for name in server["components"]}
+    report = {
+        "runs": args.runs,
+        "import_s": median([result["import_s"] for result in imports]),
+        "heavy_modules_on_import": imports[-1]["heavy_modules"],
+        "live_s": median([server["live_s"] for server in servers]),
+        "ready_s": median([server["ready_s"] for server in servers]),
+        "components_s": {
+            name: median([server["components"].get(name, {}).get("duration_s") for server in servers])
+            for name in sorted(component_names)
+        },
+        "last_run_components": servers[-1]["components"],
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()